@@ -0,0 +1,387 @@
+"""Offline end-to-end benchmark of the GraphRAG pipeline.
+
+Runs loading, extraction, entity resolution, storage, community summaries,
+entity-index building and querying against a deterministic fake chat model
+and the in-process graph store, so results need neither Gemini nor Neo4j and
+can be compared across commits.
+
+Usage:
+    python benchmark.py --chunks 1000 10000 100000 --output benchmark.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+from communities import update_communities
+from config import ALLOWED_NODES, ALLOWED_RELATIONSHIPS, EXTRACTION_MAX_CONCURRENCY
+from document_loader import load_and_split_documents
+from entity_index import update_entity_index
+from entity_resolution import resolve_entities
+from graph_extraction import extract_graph_from_documents
+from graph_query import query_graph
+from graph_store import InMemoryGraphStore
+from instrumentation import MetricsCallbackHandler, metrics, set_instrumentation_enabled
+from llm_setup import estimate_tokens
+from graph_storage import store_knowledge_graph
+
+# Capitalized word runs, which is how synthetic entity names are written
+_NAME_PATTERN = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*")
+_CHUNK_TAG = re.compile(r"^\[chunk (c\d+)\]$", re.MULTILINE)
+_FILLER = "the graph shows that these entities are connected through several documented relations".split()
+
+
+def _stable_hash(text: str) -> int:
+    """Hash that, unlike ``hash``, does not change between processes."""
+    value = 0
+    for char in text:
+        value = (value * 31 + ord(char)) & 0xFFFFFFFF
+    return value
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model that answers the pipeline's prompts locally.
+
+    Extraction prompts get JSON relationships between the capitalized names
+    in the text, entity prompts get the names in the question, and answer
+    prompts get ``answer_words`` words of filler. Every call sleeps for
+    ``latency`` seconds to stand in for the network round trip.
+    """
+
+    model: str = "fake-benchmark"
+    temperature: float = 0.0
+    latency: float = 0.0
+    relationships_per_chunk: int = 4
+    answer_words: int = 50
+    call_latencies: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _relationships(self, text: str) -> list[dict]:
+        names = list(dict.fromkeys(_NAME_PATTERN.findall(text)))
+        if len(names) < 2:
+            return []
+        relationships = []
+        for i in range(min(self.relationships_per_chunk, len(names) * (len(names) - 1))):
+            head = names[i % len(names)]
+            tail = names[(i + 1 + i // len(names)) % len(names)]
+            if head == tail:
+                continue
+            relationships.append({
+                "head": head,
+                "head_type": ALLOWED_NODES[_stable_hash(head) % len(ALLOWED_NODES)],
+                "relation": ALLOWED_RELATIONSHIPS[_stable_hash(head + tail) % len(ALLOWED_RELATIONSHIPS)],
+                "tail": tail,
+                "tail_type": ALLOWED_NODES[_stable_hash(tail) % len(ALLOWED_NODES)],
+            })
+        return relationships
+
+    def _respond(self, text: str) -> str:
+        if "from each of the following texts" in text:
+            body = text.split("\n\n", 1)[1]
+            tags = list(_CHUNK_TAG.finditer(body))
+            chunks = []
+            for i, tag in enumerate(tags):
+                end = tags[i + 1].start() if i + 1 < len(tags) else len(body)
+                chunks.append({
+                    "id": tag.group(1),
+                    "relationships": self._relationships(body[tag.end():end]),
+                })
+            return json.dumps({"chunks": chunks})
+        if "from the following text" in text:
+            return json.dumps(self._relationships(text.split("\n\n", 1)[1]))
+        if "List the key entities" in text:
+            question = re.search(r"Question: (.*)", text)
+            return "\n".join(_NAME_PATTERN.findall(question.group(1) if question else ""))
+        return " ".join(_FILLER[i % len(_FILLER)] for i in range(self.answer_words))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "".join(str(message.content) for message in messages)
+        content = self._respond(str(messages[-1].content))
+        usage = {
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        self.call_latencies.append(time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(
+            message=AIMessage(content=content, usage_metadata=usage)
+        )])
+
+
+_SYLLABLES = ["ka", "lo", "ver", "min", "tha", "ro", "sel", "du", "na", "bri", "os", "pel", "ta", "gan", "er", "vi"]
+
+
+def _make_names(count: int, rng: random.Random) -> list[str]:
+    names = set()
+    while len(names) < count:
+        words = [
+            "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+            for _ in range(2)
+        ]
+        names.add(" ".join(words))
+    return sorted(names)
+
+
+def make_synthetic_corpus(num_chunks: int, path: str, seed: int = 0) -> list[str]:
+    """Write a corpus whose paragraphs each become one chunk when split by characters.
+
+    Args:
+        num_chunks: Number of paragraphs to write
+        path: File to write the corpus to
+        seed: Random seed, so every run produces the same corpus
+
+    Returns:
+        list[str]: The entity names used in the corpus
+    """
+    rng = random.Random(seed)
+    names = _make_names(max(50, num_chunks // 5), rng)
+    templates = [
+        "{0} worked with {1} at {2}.",
+        "{0} was born near {1} and later moved to {2}.",
+        "{0} developed a theory with {1}, which {2} tested.",
+        "{0} won an award for work on {1} alongside {2}.",
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(num_chunks):
+            sentence = rng.choice(templates).format(*rng.sample(names, 3))
+            f.write(sentence + " " + rng.choice(templates).format(*rng.sample(names, 3)) + "\n\n")
+    return names
+
+
+def _percentiles(samples: list[float]) -> dict:
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def _run_stage(stats: dict, name: str, func, count, latencies, trace_memory: bool, verbose: bool):
+    """Run one stage and record its duration, throughput, latencies and peak memory."""
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    first_sample = len(latencies)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output:
+        result = func()
+    elapsed = time.perf_counter() - start
+    items = count(result)
+    stats[name] = {
+        "seconds": elapsed,
+        "items": items,
+        "items_per_second": items / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": _percentiles(latencies[first_sample:]),
+    }
+    if trace_memory:
+        stats[name]["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(
+    num_chunks: int,
+    llm_latency: float = 0.0,
+    relationships_per_chunk: int = 4,
+    answer_words: int = 50,
+    num_questions: int = 20,
+    max_concurrency: int = EXTRACTION_MAX_CONCURRENCY,
+    chunks_per_request: int = 1,
+    trace_memory: bool = True,
+    instrument: bool = False,
+    verbose: bool = False,
+    seed: int = 0
+) -> dict:
+    """Benchmark every pipeline stage on a synthetic corpus.
+
+    Args:
+        num_chunks: Number of chunks in the synthetic corpus
+        llm_latency: Seconds each fake LLM call takes
+        relationships_per_chunk: Relationships the fake model extracts per chunk
+        answer_words: Length of the fake model's answers
+        num_questions: Number of questions answered in the query stage
+        max_concurrency: Maximum number of extraction requests in flight
+        chunks_per_request: Number of chunks packed into each extraction request
+        trace_memory: Record peak memory per stage (slows the run down)
+        instrument: Also record and return the pipeline's own metrics
+        verbose: Show the pipeline's own progress output
+        seed: Random seed for the corpus and questions
+
+    Returns:
+        dict: Run settings and, per stage, seconds, items, items per second,
+        latency percentiles and peak memory
+    """
+    llm = FakeChatModel(
+        latency=llm_latency,
+        relationships_per_chunk=relationships_per_chunk,
+        answer_words=answer_words,
+        callbacks=[MetricsCallbackHandler()],
+    )
+    graph = InMemoryGraphStore()
+    set_instrumentation_enabled(instrument)
+    metrics.reset()
+    stages = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "corpus.txt")
+            names = make_synthetic_corpus(num_chunks, path, seed)
+            texts = _run_stage(
+                stages, "load",
+                lambda: load_and_split_documents(path, chunking_mode="characters"),
+                len, [], trace_memory, verbose
+            )
+        graph_documents = _run_stage(
+            stages, "extract",
+            lambda: extract_graph_from_documents(
+                texts, llm,
+                max_concurrency=max_concurrency,
+                chunks_per_request=chunks_per_request,
+                requests_per_minute=None,
+                tokens_per_minute=None
+            ),
+            len, llm.call_latencies, trace_memory, verbose
+        )
+        graph_documents, _ = _run_stage(
+            stages, "resolve", lambda: resolve_entities(graph_documents),
+            lambda result: len(result[0]), [], trace_memory, verbose
+        )
+        _run_stage(
+            stages, "store", lambda: store_knowledge_graph(graph_documents, graph=graph),
+            lambda _: len(graph_documents), [], trace_memory, verbose
+        )
+        _run_stage(
+            stages, "communities", lambda: update_communities(graph, llm),
+            lambda result: result["communities"], [], trace_memory, verbose
+        )
+        _run_stage(
+            stages, "entity_index", lambda: update_entity_index(graph),
+            lambda result: result["added"], [], trace_memory, verbose
+        )
+
+        rng = random.Random(seed)
+        questions = [f"What is known about {rng.choice(names)}?" for _ in range(num_questions)]
+        question_latencies = []
+
+        def answer_all() -> list[str]:
+            answers = []
+            for question in questions:
+                start = time.perf_counter()
+                answers.append(query_graph(question, graph, llm))
+                question_latencies.append(time.perf_counter() - start)
+            return answers
+
+        _run_stage(stages, "query", answer_all, len, question_latencies, trace_memory, verbose)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    result = {
+        "chunks": num_chunks,
+        "settings": {
+            "llm_latency": llm_latency,
+            "relationships_per_chunk": relationships_per_chunk,
+            "answer_words": answer_words,
+            "questions": num_questions,
+            "max_concurrency": max_concurrency,
+            "chunks_per_request": chunks_per_request,
+            "trace_memory": trace_memory,
+            "instrument": instrument,
+            "seed": seed,
+        },
+        "graph": graph.count(),
+        "stages": stages,
+    }
+    if instrument:
+        report = metrics.report()
+        result["metrics"] = {"counters": report["counters"], "histograms": report["histograms"]}
+    return result
+
+
+def main():
+    """Run the benchmark from the command line and print or save the JSON report."""
+    parser = argparse.ArgumentParser(description="Offline GraphRAG pipeline benchmark")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Corpus sizes to benchmark, in chunks")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call")
+    parser.add_argument("--relationships", type=int, default=4, help="Relationships extracted per chunk")
+    parser.add_argument("--answer-words", type=int, default=50, help="Words per fake answer")
+    parser.add_argument("--questions", type=int, default=20, help="Questions answered per run")
+    parser.add_argument("--concurrency", type=int, default=EXTRACTION_MAX_CONCURRENCY,
+                        help="Extraction requests in flight")
+    parser.add_argument("--chunks-per-request", type=int, default=1, help="Chunks packed per extraction request")
+    parser.add_argument("--no-memory", action="store_true", help="Skip peak memory tracing")
+    parser.add_argument("--metrics", action="store_true", help="Include the pipeline's own metrics")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [
+            run_benchmark(
+                num_chunks,
+                llm_latency=args.llm_latency,
+                relationships_per_chunk=args.relationships,
+                answer_words=args.answer_words,
+                num_questions=args.questions,
+                max_concurrency=args.concurrency,
+                chunks_per_request=args.chunks_per_request,
+                trace_memory=not args.no_memory,
+                instrument=args.metrics,
+                verbose=args.verbose,
+            )
+            for num_chunks in args.chunks
+        ],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
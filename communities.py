@@ -0,0 +1,196 @@
+"""Community detection and summaries for global questions.
+
+After storage the entity graph is partitioned with label propagation, and
+every community gets an LLM-written title and summary. A community is
+identified by a hash of its members, so a summary is only written again when
+the community's membership changes.
+"""
+import hashlib
+import random
+import re
+import time
+from collections import defaultdict
+
+from config import (
+    COMMUNITY_MIN_SIZE,
+    COMMUNITY_MAX_ITERATIONS,
+    COMMUNITY_PROMPT_MAX_TRIPLES,
+    COMMUNITY_SUMMARY_MAX_CONCURRENCY,
+)
+from graph_storage import as_graph_store
+from instrumentation import metrics, traced
+from llm_setup import message_text
+
+
+def detect_communities(
+    edges: list[tuple[str, str, str]],
+    max_iterations: int = COMMUNITY_MAX_ITERATIONS,
+    seed: int = 0
+) -> list[list[str]]:
+    """Partition a graph with label propagation.
+
+    Every node starts in its own community and repeatedly joins the one most
+    of its neighbors belong to, weighted by the number of relationships
+    between them, until no node moves. Nodes are visited in a shuffled order
+    seeded by ``seed``, so the same graph always gives the same partition.
+
+    Args:
+        edges: (source id, type, target id) tuples; direction is ignored
+        max_iterations: Maximum number of passes over all nodes
+        seed: Random seed for the visiting order
+
+    Returns:
+        list[list[str]]: Sorted member ids of each community, largest first
+    """
+    ids = sorted({node for source, _, target in edges for node in (source, target)}, key=str)
+    index = {node: i for i, node in enumerate(ids)}
+    weights = [defaultdict(int) for _ in ids]
+    for source, _, target in edges:
+        a, b = index[source], index[target]
+        if a != b:
+            weights[a][b] += 1
+            weights[b][a] += 1
+
+    labels = list(range(len(ids)))
+    order = list(range(len(ids)))
+    rng = random.Random(seed)
+    for _ in range(max_iterations):
+        rng.shuffle(order)
+        changed = False
+        for node in order:
+            if not weights[node]:
+                continue
+            votes = defaultdict(int)
+            for neighbor, weight in weights[node].items():
+                votes[labels[neighbor]] += weight
+            best = max(votes.values())
+            if votes.get(labels[node]) == best:
+                continue
+            labels[node] = min(label for label, count in votes.items() if count == best)
+            changed = True
+        if not changed:
+            break
+
+    members = defaultdict(list)
+    for node, label in enumerate(labels):
+        members[label].append(str(ids[node]))
+    return sorted((sorted(group) for group in members.values()), key=lambda group: (-len(group), group))
+
+
+def community_id(members: list[str]) -> str:
+    """Stable id of a community, derived from its sorted members."""
+    return hashlib.sha256("\n".join(sorted(members)).encode("utf-8")).hexdigest()[:16]
+
+
+def _build_summary_prompt(members: list[str], triples: list[str]) -> str:
+    """Build the prompt asking the LLM to summarize one community."""
+    relationships = "\n".join(triples)
+    return f"""Summarize the following group of closely connected entities from a knowledge graph.
+
+Entities: {", ".join(members)}
+
+Relationships (head -[TYPE]-> tail):
+{relationships}
+
+Reply with a short title on the first line, then one paragraph describing what connects these entities and the most important facts about them."""
+
+
+def _parse_summary(response: str, members: list[str]) -> tuple[str, str]:
+    """Split a summary response into its title line and summary text."""
+    lines = [line.strip() for line in response.strip().split("\n") if line.strip()]
+    if not lines:
+        return ", ".join(members[:3]), ""
+    title = re.sub(r"^(?:#+|\*+)?\s*(?:title\s*:\s*)?", "", lines[0], flags=re.IGNORECASE).strip("* ")
+    summary = " ".join(lines[1:]) or lines[0]
+    return title or ", ".join(members[:3]), summary
+
+
+@traced("communities")
+def update_communities(
+    graph,
+    llm,
+    min_size: int = COMMUNITY_MIN_SIZE,
+    max_concurrency: int = COMMUNITY_SUMMARY_MAX_CONCURRENCY,
+    max_triples: int = COMMUNITY_PROMPT_MAX_TRIPLES
+) -> dict:
+    """Detect communities and summarize the ones whose membership changed.
+
+    Communities smaller than ``min_size`` are left out. Summaries of
+    communities that still exist with the same members are kept as they are,
+    new communities are summarized with batched LLM calls, and summaries of
+    communities that no longer exist are deleted.
+
+    Args:
+        graph: Neo4j graph instance or graph store
+        llm: LLM instance for the summaries
+        min_size: Minimum number of entities in a summarized community
+        max_concurrency: Maximum number of summary requests in flight
+        max_triples: Maximum number of relationships shown per summary prompt
+
+    Returns:
+        dict: Numbers of ``communities``, ``summarized``, ``reused``, ``removed``
+        and ``failed`` communities, and ``seconds`` taken
+    """
+    start = time.perf_counter()
+    store = as_graph_store(graph)
+    edges = store.edge_list()
+    communities = {
+        community_id(members): members
+        for members in detect_communities(edges)
+        if len(members) >= min_size
+    }
+    existing = store.get_communities()
+    new_ids = [cid for cid in communities if cid not in existing]
+    removed = [cid for cid in existing if cid not in communities]
+
+    # Relationships inside each new community, with members ranked by degree
+    community_of = {member: cid for cid in new_ids for member in communities[cid]}
+    triples = defaultdict(list)
+    degree = defaultdict(int)
+    for source, rel_type, target in edges:
+        cid = community_of.get(str(source))
+        if cid is not None and cid == community_of.get(str(target)):
+            degree[str(source)] += 1
+            degree[str(target)] += 1
+            if len(triples[cid]) < max_triples:
+                triples[cid].append(f"{source} -[{rel_type}]-> {target}")
+
+    rows = []
+    failed = 0
+    if new_ids:
+        ranked = {
+            cid: sorted(communities[cid], key=lambda member: (-degree[member], member))
+            for cid in new_ids
+        }
+        responses = llm.batch(
+            [_build_summary_prompt(ranked[cid][:30], triples[cid]) for cid in new_ids],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        for cid, response in zip(new_ids, responses):
+            if isinstance(response, Exception):
+                failed += 1
+                continue
+            title, summary = _parse_summary(message_text(response), ranked[cid])
+            rows.append({
+                "id": cid,
+                "title": title,
+                "summary": summary,
+                "size": len(communities[cid]),
+                "members": communities[cid],
+            })
+    store.save_communities(rows, removed)
+
+    stats = {
+        "communities": len(communities),
+        "summarized": len(rows),
+        "reused": len(communities) - len(new_ids),
+        "removed": len(removed),
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+    }
+    metrics.inc("communities_summarized", len(rows))
+    metrics.inc("communities_reused", stats["reused"])
+    print(f"Communities: {stats['communities']} ({stats['summarized']} summarized, "
+          f"{stats['reused']} reused, {stats['removed']} removed, {failed} failed)")
+    return stats
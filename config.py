@@ -7,22 +7,116 @@ load_dotenv()
 
 # API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+if GOOGLE_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
 # LLM Configuration
 LLM_MODEL = "gemini-flash-latest"
 LLM_TEMPERATURE = 0
 
+# Extraction Concurrency Configuration
+EXTRACTION_MAX_CONCURRENCY = 4        # Max chunks in flight at once
+EXTRACTION_REQUESTS_PER_MINUTE = 15   # None disables the request budget
+EXTRACTION_TOKENS_PER_MINUTE = 250000 # None disables the token budget
+EXTRACTION_MAX_RETRIES = 5            # Retries per chunk on 429/quota errors
+EXTRACTION_CHUNKS_PER_REQUEST = 1     # >1 packs several chunks into one request
+
+# Extraction Cache Configuration
+EXTRACTION_CACHE_ENABLED = True
+EXTRACTION_CACHE_PATH = ".cache/extraction_cache.sqlite"
+EXTRACTION_CACHE_MAX_ENTRIES = 100000  # LRU eviction beyond this many chunks
+
+# Entity Resolution Configuration
+ENTITY_RESOLUTION_ENABLED = True       # Merge name variants before storage
+ENTITY_RESOLUTION_MAX_BLOCK_SIZE = 200 # Skip tokens shared by more names than this
+ENTITY_RESOLUTION_SIMILARITY = 0.8     # Trigram Jaccard threshold for fuzzy matches
+
 # Neo4j Configuration
 NEO4J_URL = os.getenv("NEO4J_URL")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+NEO4J_MAX_POOL_SIZE = 50          # Connections in the shared driver pool
+NEO4J_CONNECTION_TIMEOUT = 30     # Seconds to establish a connection
+NEO4J_ACQUISITION_TIMEOUT = 60    # Seconds to wait for a free pooled connection
+NEO4J_QUERY_TIMEOUT = None        # Transaction timeout in seconds, None for none
+NEO4J_ROUTE_READS = True          # Send reads to read replicas on neo4j:// clusters
+
+# Graph Store Configuration
+GRAPH_STORE = "neo4j"                     # "neo4j" or "memory" (in-process, no server)
+GRAPH_STORE_PATH = ".cache/graph_store.bin"  # File the in-memory store is saved to
+
+# Ingestion Configuration
+INCREMENTAL_INGEST = True  # False clears the graph and reloads everything
+
+# Journaled Ingestion Configuration
+INGEST_WORKERS = 0                    # >0 extracts through the job journal with this many processes
+INGEST_JOURNAL_PATH = ".cache/ingest_journal.sqlite"
+INGEST_JOURNAL_BATCH_SIZE = 20        # Jobs claimed and committed per transaction
+INGEST_JOB_LEASE_SECONDS = 600        # Claims older than this are handed out again
+INGEST_JOB_MAX_ATTEMPTS = 3           # Claims before a failing job is given up
+
+# Bulk Write Configuration
+BULK_WRITE_BATCH_SIZE = 1000  # Max rows per UNWIND write transaction
+BULK_WRITE_PARALLELISM = 1    # Write transactions run in parallel
+BULK_WRITE_MAX_RETRIES = 3    # Retries per failed batch
+BULK_DELETE_BATCH_SIZE = 10000  # Max nodes or relationships deleted per transaction when clearing
+
+# Query Configuration
+# Skip LLM entity extraction when keyword search finds at least this many
+# triples; None always runs it concurrently with the keyword search
+QUERY_MIN_KEYWORD_RESULTS = None
+QUERY_BATCH_MAX_CONCURRENCY = 4  # LLM requests in flight for query_graph_batch
+QUERY_CONTEXT_MAX_TOKENS = 1000  # Estimated token budget for the answer context
+
+# Entity Linking Configuration
+ENTITY_INDEX_ENABLED = True              # Link question terms to node ids by n-gram similarity
+ENTITY_INDEX_PATH = ".cache/entity_index.npy"  # Neo4j indexes, suffixed per URL and database; the in-memory store's sits next to its file
+ENTITY_INDEX_DIMENSIONS = 512            # Hashed n-gram buckets per vector
+ENTITY_INDEX_NGRAM = 3                   # Characters per n-gram
+ENTITY_INDEX_TOP_K = 3                   # Nodes linked per term
+ENTITY_INDEX_MIN_SCORE = 0.45            # Minimum cosine similarity of a link
+ENTITY_INDEX_REFRESH_SECONDS = 10        # How often queries check for an index saved by a newer ingest
+
+# Community Summary Configuration
+COMMUNITY_SUMMARIES_ENABLED = False     # Summarize graph communities after storage (extra LLM calls)
+COMMUNITY_MIN_SIZE = 3                  # Smaller communities get no summary
+COMMUNITY_MAX_ITERATIONS = 20           # Label propagation passes
+COMMUNITY_PROMPT_MAX_TRIPLES = 40       # Relationships shown per summary prompt
+COMMUNITY_SUMMARY_MAX_CONCURRENCY = 4   # Summary requests in flight
+COMMUNITY_QUERY_LIMIT = 5               # Summaries used to answer a global question
+
+# Query Cache Configuration
+QUERY_CACHE_MAX_ENTRIES = 1024   # Per cache level, LRU eviction beyond this
+QUERY_CACHE_TTL_SECONDS = 3600   # None keeps entries until evicted or invalidated
+
+# Query Server Configuration
+QUERY_SERVER_HOST = "127.0.0.1"
+QUERY_SERVER_PORT = 8765
+QUERY_SERVER_MAX_CONCURRENCY = 8  # Questions answered at once
+QUERY_SERVER_MAX_QUEUE = 100      # Waiting questions before requests are rejected
+
+# Instrumentation Configuration
+INSTRUMENTATION_ENABLED = False       # Record spans, counters and latency histograms
+INSTRUMENTATION_MAX_SPANS = 10000     # Finished spans kept for the JSON report
+INSTRUMENTATION_REPORT_PATH = ".cache/metrics.json"
+INSTRUMENTATION_PROMETHEUS_PATH = ".cache/metrics.prom"
 
 # Document Processing Configuration
+CHUNKING_MODE = "characters"  # "characters" or "tokens"
 CHUNK_SIZE = 200
 CHUNK_OVERLAP = 20
+CHUNK_TOKEN_BUDGET = 1000     # Target tokens per chunk in "tokens" mode
+CHUNK_TOKEN_OVERLAP = 100     # Overlap between chunks in "tokens" mode
 INPUT_FILE = "input.txt"
 
+# Streaming Ingestion Configuration
+STREAMING_INGEST = False          # Stream INPUT_FILE (file, directory or glob)
+STREAM_FILE_EXTENSIONS = [".txt", ".md"]  # Files picked up from directories
+STREAM_READ_SIZE = 65536          # Characters read from a file at a time
+STREAM_QUEUE_SIZE = 256           # Chunks buffered between loading and extraction
+STREAM_BATCH_SIZE = 64            # Chunks extracted and written per batch
+
 # Graph Schema Configuration
 ALLOWED_NODES = [
     "Person",
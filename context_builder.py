@@ -0,0 +1,109 @@
+"""Compact, token-budgeted answer context from retrieved triples."""
+import re
+from typing import NamedTuple
+
+from config import QUERY_CONTEXT_MAX_TOKENS
+from llm_setup import estimate_tokens
+
+# Shown to the LLM when retrieval found nothing
+EMPTY_CONTEXT = "No specific graph data found, but the graph contains information about the topic."
+
+
+class GraphContext(NamedTuple):
+    """Answer context together with what went into it."""
+    text: str
+    stats: dict
+
+
+def _node_name(node) -> str:
+    """Display name of a node given as a property dict."""
+    if isinstance(node, dict):
+        name = node.get("id", node.get("name"))
+        if name is not None:
+            return str(name)
+    return str(node)
+
+
+def _triple(record: dict) -> tuple[str, str, str]:
+    """(head, type, tail) of a result record, in the relationship's direction."""
+    r = record.get("r")
+    if isinstance(r, (tuple, list)) and len(r) == 3 and isinstance(r[1], str):
+        return _node_name(r[0]), r[1], _node_name(r[2])
+    return _node_name(record.get("n")), str(r), _node_name(record.get("m"))
+
+
+def _entry(record: dict) -> tuple[tuple, str]:
+    """Deduplication key and rendered line of a result record."""
+    if "summary" in record:
+        return ("community", record.get("id")), f"Community summary: {record.get('title')}: {record.get('summary')}"
+    head, rel, tail = _triple(record)
+    return (head, rel, tail), f"{head} -[{rel}]-> {tail}"
+
+
+def _relevance(line: str, terms: list[str]) -> int:
+    """Number of terms mentioned by a rendered line."""
+    text = line.lower().replace("_", " ")
+    return sum(1 for term in terms if term in text)
+
+
+def build_context(
+    results: list,
+    terms: list[str] = (),
+    max_tokens: int = QUERY_CONTEXT_MAX_TOKENS
+) -> GraphContext:
+    """Render retrieved triples as compact ``head -[TYPE]-> tail`` lines.
+
+    Community summaries (records with a ``summary``) become one line each.
+    Triples returned more than once, from several terms or from both
+    directions of an undirected match, are kept once with their hits summed.
+    They are ranked by how many of the terms they mention, then by hits, and
+    added in that order until the token budget is reached. The top triple is
+    always kept, even if it alone exceeds the budget.
+
+    Args:
+        results: Records with ``n``, ``r``, ``m`` and optional ``hits``
+        terms: Question keywords and entity names to rank triples by
+        max_tokens: Estimated token budget for the context, or None for no limit
+
+    Returns:
+        GraphContext: The context text, and stats with the number of triples
+        retrieved, unique and used, the context tokens, the tokens the former
+        one-dict-per-line rendering would have taken, and the tokens saved
+    """
+    unique = {}
+    for order, record in enumerate(results):
+        key, line = _entry(record)
+        if key in unique:
+            unique[key][2] += record.get("hits", 1)
+        else:
+            unique[key] = [line, order, record.get("hits", 1)]
+
+    terms = list(dict.fromkeys(
+        term.lower().strip() for term in terms if re.search(r"\w", term)
+    ))
+    ranked = sorted(
+        unique.values(),
+        key=lambda entry: (-_relevance(entry[0], terms), -entry[2], entry[1])
+    )
+
+    lines = []
+    tokens = 0
+    for line, _, _ in ranked:
+        line_tokens = estimate_tokens(line + "\n")
+        if lines and max_tokens is not None and tokens + line_tokens > max_tokens:
+            break
+        lines.append(line)
+        tokens += line_tokens
+
+    text = "\n".join(lines) if lines else EMPTY_CONTEXT
+    raw_text = "\n".join(str(r) for r in results[:50]) if results else EMPTY_CONTEXT
+    raw_tokens = estimate_tokens(raw_text)
+    tokens = estimate_tokens(text)
+    return GraphContext(text, {
+        "triples": len(results),
+        "unique_triples": len(unique),
+        "used_triples": len(lines),
+        "tokens": tokens,
+        "raw_tokens": raw_tokens,
+        "tokens_saved": raw_tokens - tokens,
+    })
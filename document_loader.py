@@ -1,15 +1,109 @@
 """Document loading and text splitting."""
+import glob
+import os
+import re
+from typing import Iterator
+
 from langchain_text_splitters import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 from langchain_core.documents import Document
-from config import CHUNK_SIZE, CHUNK_OVERLAP, INPUT_FILE
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNKING_MODE,
+    CHUNK_TOKEN_BUDGET,
+    CHUNK_TOKEN_OVERLAP,
+    INPUT_FILE,
+    STREAM_FILE_EXTENSIONS,
+    STREAM_READ_SIZE,
+)
+from instrumentation import metrics, traced
+from llm_setup import estimate_tokens
+
+# Sentence ends, and paragraph breaks, are the boundaries token packing splits at
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+def _text_units(text: str, token_budget: int) -> list[tuple[int, int]]:
+    """Split text into (start, end) spans of sentences, each within the budget.
+    
+    Sentences longer than the budget are further split at whitespace.
+    """
+    units = []
+    start = 0
+    boundaries = [(m.start(), m.end()) for m in _SENTENCE_BOUNDARY.finditer(text)]
+    for end, next_start in [*boundaries, (len(text), len(text))]:
+        if text[start:end].strip():
+            if estimate_tokens(text[start:end]) <= token_budget:
+                units.append((start, end))
+            else:
+                piece_start = start
+                for word in re.finditer(r"\S+", text[start:end]):
+                    word_end = start + word.end()
+                    if piece_start < start + word.start() and estimate_tokens(text[piece_start:word_end]) > token_budget:
+                        units.append((piece_start, start + word.start()))
+                        piece_start = start + word.start()
+                units.append((piece_start, end))
+        start = next_start
+    return units
+
+
+def split_text_by_tokens(
+    text: str,
+    token_budget: int = CHUNK_TOKEN_BUDGET,
+    overlap_tokens: int = CHUNK_TOKEN_OVERLAP
+) -> list[tuple[int, str]]:
+    """Pack sentences into chunks of up to ``token_budget`` estimated tokens.
+    
+    Chunks start and end on sentence or paragraph boundaries, and each chunk
+    repeats the trailing sentences of the previous one up to ``overlap_tokens``.
+    
+    Args:
+        text: Text to split
+        token_budget: Target maximum tokens per chunk
+        overlap_tokens: Maximum tokens repeated from the previous chunk
+        
+    Returns:
+        list[tuple[int, str]]: Character offset and text of each chunk
+    """
+    units = _text_units(text, token_budget)
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(text[unit[0]:unit[1]])
+        if current and current_tokens + unit_tokens > token_budget:
+            chunks.append((current[0][0], text[current[0][0]:current[-1][1]]))
+            # Carry trailing sentences over as overlap, never the whole chunk
+            overlap = []
+            overlap_total = 0
+            for previous in reversed(current[1:]):
+                previous_tokens = estimate_tokens(text[previous[0]:previous[1]])
+                if overlap_total + previous_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_total += previous_tokens
+            if overlap_total + unit_tokens > token_budget:
+                overlap, overlap_total = [], 0
+            current, current_tokens = overlap, overlap_total
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append((current[0][0], text[current[0][0]:current[-1][1]]))
+    return chunks
 
 
-def load_and_split_documents(file_path: str = None) -> list[Document]:
+@traced("load_documents")
+def load_and_split_documents(file_path: str = None, chunking_mode: str = CHUNKING_MODE) -> list[Document]:
     """Load documents from file and split into chunks.
     
+    The chunks come from ``iter_document_chunks``, so they have the same
+    boundaries, and therefore the same chunk ids, whether a corpus is loaded
+    whole or streamed, and switching ``STREAMING_INGEST`` re-extracts nothing.
+    
     Args:
         file_path: Path to the input file. Defaults to config.INPUT_FILE
+        chunking_mode: "characters" for CHUNK_SIZE character chunks, or
+            "tokens" for chunks packed up to CHUNK_TOKEN_BUDGET tokens
         
     Returns:
         list[Document]: List of document chunks
@@ -17,17 +111,128 @@ def load_and_split_documents(file_path: str = None) -> list[Document]:
     if file_path is None:
         file_path = INPUT_FILE
     
-    # Load documents
-    loader = TextLoader(file_path)
-    documents = loader.load()
+    texts = list(iter_document_chunks(file_path, chunking_mode=chunking_mode))
+    print(f"Loaded {len(texts)} document chunks")
+    return texts
+
+
+def iter_source_files(paths: str | list[str]) -> Iterator[str]:
+    """Expand files, directories and glob patterns into file paths.
+    
+    Directories are walked recursively for files with one of
+    config.STREAM_FILE_EXTENSIONS. Paths are yielded in sorted order so
+    repeated runs see the corpus in the same order.
+    
+    Args:
+        paths: A path or list of paths, directories or glob patterns
+        
+    Yields:
+        str: Path of each input file
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(tuple(STREAM_FILE_EXTENSIONS)):
+                        yield os.path.join(root, name)
+        elif glob.has_magic(path):
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(match):
+                    yield match
+        else:
+            yield path
+
+
+def _find_cut(buffer: str, separator: str, force: bool) -> int:
+    """Find where the buffered text can be split without breaking a chunk."""
+    cut = buffer.rfind(separator)
+    if cut > 0 or not force:
+        return cut
+    for fallback in ("\n", " "):
+        cut = buffer.rfind(fallback)
+        if cut > 0:
+            return cut
+    return len(buffer)
+
+
+def iter_document_chunks(
+    paths: str | list[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    read_size: int = STREAM_READ_SIZE,
+    encoding: str = "utf-8",
+    chunking_mode: str = CHUNKING_MODE
+) -> Iterator[Document]:
+    """Stream document chunks from files without loading whole files.
+    
+    Each file is read ``read_size`` characters at a time. Buffered text is
+    split at the last paragraph break, so memory use stays bounded by a few
+    read blocks regardless of file size. Chunk overlap applies within a
+    block but not across the paragraph break where blocks are cut.
+    ``load_and_split_documents`` is built on this, so both loaders yield the
+    same chunks.
+    
+    Args:
+        paths: Files, directories or glob patterns. Defaults to config.INPUT_FILE
+        chunk_size: Maximum chunk size in characters
+        chunk_overlap: Overlap between consecutive chunks in characters
+        read_size: Number of characters read from a file at a time
+        encoding: Text encoding of the input files
+        chunking_mode: "characters" or "tokens", as in ``load_and_split_documents``
+        
+    Yields:
+        Document: Chunks with ``source``, ``start_index`` (character offset in
+        the file) and ``chunk_index`` metadata
+    """
+    if paths is None:
+        paths = INPUT_FILE
     
-    # Split into chunks
     text_splitter = CharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True
     )
-    texts = text_splitter.split_documents(documents)
+    separator = "\n\n"
     
-    print(f"Loaded {len(texts)} document chunks")
-    return texts
-
+    for path in iter_source_files(paths):
+        chunk_index = 0
+        buffer = ""
+        buffer_offset = 0
+        with open(path, encoding=encoding, errors="replace") as f:
+            while True:
+                block = f.read(read_size)
+                eof = not block
+                buffer += block
+                if eof:
+                    cut = len(buffer)
+                else:
+                    cut = _find_cut(buffer, separator, force=len(buffer) >= 4 * read_size)
+                    if cut <= 0:
+                        continue
+                
+                segment = buffer[:cut]
+                if chunking_mode == "tokens":
+                    chunks = split_text_by_tokens(segment)
+                else:
+                    chunks = [
+                        (chunk.metadata["start_index"], chunk.page_content)
+                        for chunk in text_splitter.create_documents([segment])
+                    ]
+                for start, chunk in chunks:
+                    yield Document(
+                        page_content=chunk,
+                        metadata={
+                            "source": path,
+                            "start_index": buffer_offset + start,
+                            "chunk_index": chunk_index,
+                        }
+                    )
+                    chunk_index += 1
+                    metrics.inc("chunks_loaded")
+                buffer = buffer[cut:]
+                buffer_offset += cut
+                if eof:
+                    break
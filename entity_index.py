@@ -0,0 +1,354 @@
+"""Entity-linking index matching question terms to node ids.
+
+Node ids are embedded as L2-normalized vectors of hashed character n-gram
+counts, one row of a NumPy matrix per node, so a misspelled, plural or
+partial name still lands close to the node it refers to. All terms of a
+question are linked with one matrix product and a top-k selection per term.
+
+The matrix is saved as a ``.npy`` file with a JSON sidecar holding the node
+keys and the graph version it was built for. Loading memory-maps the matrix,
+so opening even a large index is instant. The index is refreshed at ingest
+time, vectorizing only the nodes that were added; queries never read the
+node keys, they only reload the saved index once the graph version moved.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import weakref
+import zlib
+
+import numpy as np
+
+from config import (
+    ENTITY_INDEX_DIMENSIONS,
+    ENTITY_INDEX_MIN_SCORE,
+    ENTITY_INDEX_NGRAM,
+    ENTITY_INDEX_PATH,
+    ENTITY_INDEX_REFRESH_SECONDS,
+    ENTITY_INDEX_TOP_K,
+    NEO4J_DATABASE,
+    NEO4J_URL,
+)
+from graph_storage import as_graph_store
+from instrumentation import metrics
+
+
+def _normalize(text) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def vectorize(
+    texts: list[str],
+    dimensions: int = ENTITY_INDEX_DIMENSIONS,
+    ngram: int = ENTITY_INDEX_NGRAM
+) -> np.ndarray:
+    """Embed texts as L2-normalized vectors of hashed character n-gram counts.
+
+    Args:
+        texts: Names or search terms
+        dimensions: Number of hash buckets
+        ngram: Characters per n-gram, taken from the text padded with spaces
+
+    Returns:
+        np.ndarray: float32 matrix with one row per text
+    """
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        padded = f" {_normalize(text)} "
+        for i in range(len(padded) - ngram + 1):
+            rows.append(row)
+            columns.append(zlib.crc32(padded[i:i + ngram].encode("utf-8")) % dimensions)
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _names(node_id: str) -> list[str]:
+    """Texts a node is matched by: its id and, for multi-word ids, each longer word."""
+    words = _normalize(node_id).split()
+    if len(words) < 2:
+        return [node_id]
+    return [node_id, *dict.fromkeys(word for word in words if len(word) >= 3)]
+
+
+class EntityIndex:
+    """N-gram vectors of every entity node, for fuzzy term-to-node linking.
+
+    Each node has one row for its id and, for multi-word ids, one for each
+    word, so a single question word such as a misspelled surname scores
+    against that word rather than against the whole name.
+
+    Args:
+        path: ``.npy`` file to load the index from and save it to, or None to
+            keep it in memory only
+        dimensions: Number of hash buckets per vector
+        ngram: Characters per n-gram
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        dimensions: int = ENTITY_INDEX_DIMENSIONS,
+        ngram: int = ENTITY_INDEX_NGRAM
+    ):
+        self.path = path
+        self.dimensions = dimensions
+        self.ngram = ngram
+        self.version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        # Node (label, id) keys, the vector rows and the node each row belongs
+        # to, swapped together so lookups never see a half-refreshed index
+        self._rows = ([], np.zeros((0, dimensions), dtype=np.float32), np.zeros(0, dtype=np.int64))
+        if path is not None and os.path.exists(path) and os.path.exists(self._meta_path(path)):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._rows[0])
+
+    @staticmethod
+    def _meta_path(path: str) -> str:
+        return os.path.splitext(path)[0] + ".json"
+
+    def reload(self, graph) -> bool:
+        """Pick up the index saved by the last ingest, without reading the graph's nodes.
+
+        The graph version is checked at most every ``ENTITY_INDEX_REFRESH_SECONDS``.
+        If it moved past the loaded index and the saved index is newer, the
+        saved one is loaded.
+
+        Args:
+            graph: Neo4j graph instance or graph store
+
+        Returns:
+            bool: True if a newer saved index was loaded
+        """
+        now = time.monotonic()
+        if self.path is None or now - self._checked < ENTITY_INDEX_REFRESH_SECONDS:
+            return False
+        with self._lock:
+            self._checked = now
+            if as_graph_store(graph).get_version() == self.version:
+                return False
+            previous = self.version
+            if os.path.exists(self.path) and os.path.exists(self._meta_path(self.path)):
+                self._load(self.path)
+            return self.version != previous
+
+    def refresh(self, graph) -> dict:
+        """Bring the index up to date with the graph's nodes.
+
+        The node keys are compared with the indexed ones: rows of removed
+        nodes are dropped, only added nodes are vectorized, and the index is
+        saved if it has a path. The keys are always compared, because a
+        rebuilt in-memory store can reach the same version number as the
+        graph the index was built for.
+
+        Args:
+            graph: Neo4j graph instance or graph store
+
+        Returns:
+            dict: Numbers of ``nodes``, ``added`` and ``removed`` nodes and
+            ``seconds`` taken
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            store = as_graph_store(graph)
+            version = store.get_version()
+            start = time.perf_counter()
+            old_keys, old_matrix, old_owners = self._rows
+            keys = list(dict.fromkeys((str(label), str(node_id)) for label, node_id in store.node_keys()))
+            wanted = set(keys)
+            kept = [node for node, key in enumerate(old_keys) if key in wanted]
+            indexed = {old_keys[node] for node in kept}
+            added = [key for key in keys if key not in indexed]
+            removed = len(old_keys) - len(kept)
+            if added or removed:
+                # Kept rows move to their node's new position; added nodes follow
+                position = np.full(len(old_keys), -1, dtype=np.int64)
+                position[kept] = np.arange(len(kept))
+                kept_rows = np.flatnonzero(position[old_owners] >= 0) if len(old_owners) else old_owners
+                texts, owners = [], []
+                for offset, (_, node_id) in enumerate(added):
+                    for name in _names(node_id):
+                        texts.append(name)
+                        owners.append(len(kept) + offset)
+                self._rows = (
+                    [old_keys[node] for node in kept] + added,
+                    np.vstack([
+                        np.asarray(old_matrix[kept_rows], dtype=np.float32),
+                        vectorize(texts, self.dimensions, self.ngram),
+                    ]),
+                    np.concatenate([position[old_owners[kept_rows]], np.asarray(owners, dtype=np.int64)]),
+                )
+            self.version = version
+            if self.path is not None:
+                self.save()
+
+        stats = {
+            "nodes": len(self),
+            "added": len(added),
+            "removed": removed,
+            "seconds": time.perf_counter() - start,
+        }
+        metrics.inc("entity_index_vectorized", len(added))
+        return stats
+
+    def link(
+        self,
+        terms: list[str],
+        top_k: int = ENTITY_INDEX_TOP_K,
+        min_score: float = ENTITY_INDEX_MIN_SCORE
+    ) -> dict[str, list[tuple[str, float]]]:
+        """Find the nodes most similar to each term, in one vectorized call.
+
+        Args:
+            terms: Keywords or entity names
+            top_k: Maximum number of nodes linked per term
+            min_score: Minimum cosine similarity of a link
+
+        Returns:
+            dict[str, list[tuple[str, float]]]: Each term mapped to the ids of
+            its linked nodes and their scores, best first
+        """
+        terms = list(dict.fromkeys(terms))
+        keys, matrix, owners = self._rows
+        linked = {term: [] for term in terms}
+        if not terms or not keys:
+            return linked
+
+        # Several rows can belong to one node, so take extra candidates
+        scores = vectorize(terms, self.dimensions, self.ngram) @ matrix.T
+        k = min(top_k * 4, len(owners))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for term, rows, row_scores in zip(terms, top, top_scores):
+            matches = linked[term]
+            for row, score in zip(rows, row_scores):
+                if score < min_score or len(matches) == top_k:
+                    break
+                node_id = keys[owners[row]][1]
+                if all(node_id != seen for seen, _ in matches):
+                    matches.append((node_id, float(score)))
+        return linked
+
+    def save(self, path: str = None) -> None:
+        """Write the matrix, its row owners and the node keys, replacing any earlier files.
+
+        Args:
+            path: Destination ``.npy`` file. Defaults to the path the index was opened with
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the entity index to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        keys, matrix, owners = self._rows
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, np.asarray(matrix, dtype=np.float32))
+        meta = {
+            "version": self.version,
+            "dimensions": self.dimensions,
+            "ngram": self.ngram,
+            "keys": keys,
+            "owners": np.asarray(owners).tolist(),
+        }
+        with open(f"{self._meta_path(path)}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{path}.tmp", path)
+        os.replace(f"{self._meta_path(path)}.tmp", self._meta_path(path))
+        self.path = path
+
+    def _load(self, path: str) -> None:
+        with open(self._meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(path, mmap_mode="r")
+        # An index built with other settings, or cut short, is rebuilt on refresh
+        if (
+            meta.get("dimensions") != self.dimensions or meta.get("ngram") != self.ngram
+            or matrix.shape != (len(meta.get("owners", ())), self.dimensions)
+        ):
+            return
+        self._rows = (
+            [tuple(key) for key in meta["keys"]],
+            matrix,
+            np.asarray(meta["owners"], dtype=np.int64),
+        )
+        self.version = meta["version"]
+
+
+# One index per graph connection or store, shared by every query in the process
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def _index_path(store) -> str | None:
+    """In-memory stores' indexes sit next to their file; Neo4j ones at ``ENTITY_INDEX_PATH``,
+    with the URL and database in the name so each database has its own."""
+    if hasattr(store, "path"):
+        return f"{os.path.splitext(store.path)[0]}.entities.npy" if store.path else None
+    url = getattr(store.graph, "url", NEO4J_URL)
+    database = getattr(store.graph, "database", NEO4J_DATABASE)
+    digest = hashlib.sha1(f"{url}|{database}".encode("utf-8")).hexdigest()[:12]
+    name = re.sub(r"[^\w.-]", "_", str(database))
+    root, extension = os.path.splitext(ENTITY_INDEX_PATH)
+    return f"{root}.{name}-{digest}{extension}"
+
+
+def _index_for(store) -> EntityIndex:
+    """The process-wide index of a graph store, opened from its file on first use."""
+    owner = getattr(store, "graph", store)
+    path = _index_path(store)
+    with _indexes_lock:
+        index = _indexes.get(owner)
+        if index is None or (path is not None and index.path != path):
+            index = _indexes[owner] = EntityIndex(path)
+        return index
+
+
+def get_entity_index(graph) -> EntityIndex:
+    """Return the graph's entity index for queries.
+
+    Queries never scan the graph's nodes: the index is only reloaded from
+    its file once the graph version changed, so it is as current as the last
+    ``update_entity_index``, which ingestion and ``clear`` run.
+
+    Args:
+        graph: Neo4j graph instance or graph store
+
+    Returns:
+        EntityIndex: The index, current as of the last saved refresh
+    """
+    store = as_graph_store(graph)
+    index = _index_for(store)
+    index.reload(store)
+    return index
+
+
+def update_entity_index(graph) -> dict:
+    """Bring the graph's entity index up to date after ingestion and report it.
+
+    Args:
+        graph: Neo4j graph instance or graph store
+
+    Returns:
+        dict: See ``EntityIndex.refresh``
+    """
+    store = as_graph_store(graph)
+    stats = _index_for(store).refresh(store)
+    print(f"Entity index: {stats['nodes']} nodes ({stats['added']} vectorized, "
+          f"{stats['removed']} removed) in {stats['seconds']:.2f}s")
+    return stats
@@ -0,0 +1,213 @@
+"""Entity resolution: merge name variants of the same entity before storage."""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from config import ENTITY_RESOLUTION_MAX_BLOCK_SIZE, ENTITY_RESOLUTION_SIMILARITY
+from instrumentation import metrics, traced
+
+
+def normalize_entity_name(name: str) -> str:
+    """Normalize an entity name for comparison.
+
+    Strips accents, possessives and punctuation, lowercases and collapses
+    whitespace, so "Albert Einstein's" and "albert  einstein" compare equal.
+
+    Args:
+        name: Entity id as extracted
+
+    Returns:
+        str: Normalized name
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"['’]s\b", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"^the\s+", "", text.strip())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _numbers(tokens: set[str]) -> set[str]:
+    """Tokens containing a digit, such as years and ordinals."""
+    return {token for token in tokens if any(c.isdigit() for c in token)}
+
+
+def _find(parent: dict, item):
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]
+        item = parent[item]
+    return item
+
+
+def _resolve_type(
+    counts: Counter,
+    max_block_size: int,
+    similarity: float,
+    stats: dict
+) -> dict[str, str]:
+    """Cluster the ids of one entity type and map each id to its canonical id."""
+    # Ids with the same normalized name are merged outright
+    by_name = defaultdict(list)
+    for node_id in counts:
+        by_name[normalize_entity_name(node_id)].append(node_id)
+    names = [name for name in by_name if name]
+    parent = {name: name for name in names}
+
+    # Blocking: same sorted-token key, or sharing a token in a small enough block
+    by_key = defaultdict(list)
+    by_token = defaultdict(list)
+    for name in names:
+        tokens = name.split()
+        by_key[" ".join(sorted(tokens))].append(name)
+        for token in set(tokens):
+            by_token[token].append(name)
+    for group in by_key.values():
+        for other in group[1:]:
+            parent[_find(parent, other)] = _find(parent, group[0])
+
+    supersets = defaultdict(set)
+    trigrams = {}
+    seen_pairs = set()
+    for token, block in by_token.items():
+        if len(block) < 2 or len(block) > max_block_size:
+            continue
+        for a, b in combinations(block, 2):
+            pair = (a, b) if a < b else (b, a)
+            if pair in seen_pairs:
+                continue
+            seen_pairs.add(pair)
+            stats["comparisons"] += 1
+            tokens_a, tokens_b = set(a.split()), set(b.split())
+            if len(tokens_a) == 1 and tokens_a < tokens_b:
+                supersets[a].add(b)
+            elif len(tokens_b) == 1 and tokens_b < tokens_a:
+                supersets[b].add(a)
+            elif _numbers(tokens_a) != _numbers(tokens_b):
+                # Years and ordinals tell entities apart however similar the rest is
+                continue
+            else:
+                grams_a = trigrams.setdefault(a, _trigrams(a))
+                grams_b = trigrams.setdefault(b, _trigrams(b))
+                if len(grams_a & grams_b) / len(grams_a | grams_b) >= similarity:
+                    parent[_find(parent, b)] = _find(parent, a)
+
+    # A single-word name joins a longer name only if that name is unambiguous
+    for name, candidates in supersets.items():
+        roots = {_find(parent, candidate) for candidate in candidates}
+        if len(roots) == 1:
+            parent[_find(parent, name)] = roots.pop()
+
+    clusters = defaultdict(list)
+    for name in names:
+        clusters[_find(parent, name)].extend(by_name[name])
+
+    mapping = {}
+    for members in clusters.values():
+        canonical = max(members, key=lambda node_id: (
+            len(normalize_entity_name(node_id).split()),
+            counts[node_id],
+            any(c.isupper() for c in str(node_id)),
+            -len(str(node_id)),
+            str(node_id),
+        ))
+        for member in members:
+            mapping[member] = canonical
+        if len(members) > 1:
+            stats["clusters_merged"] += 1
+    return mapping
+
+
+@traced("entity_resolution")
+def resolve_entities(
+    graph_documents: list[GraphDocument],
+    max_block_size: int = ENTITY_RESOLUTION_MAX_BLOCK_SIZE,
+    similarity: float = ENTITY_RESOLUTION_SIMILARITY
+) -> tuple[list[GraphDocument], dict]:
+    """Canonicalize entity ids within each type across all graph documents.
+
+    Names are compared only within blocks that share a token, and tokens that
+    occur in more than ``max_block_size`` names are skipped, so the work grows
+    near-linearly with the number of entities. Within a block, names merge if
+    they have the same tokens in any order, if one is a single word contained
+    in exactly one longer name, or if their character-trigram similarity is at
+    least ``similarity`` and they contain the same numbers, so "Solvay
+    Conference 1927" and "Solvay Conference 1930" stay apart. Relationship endpoints are rewritten to the canonical
+    ids and relationships that become duplicates or self-loops are dropped.
+
+    Args:
+        graph_documents: Extracted graph documents
+        max_block_size: Largest token block whose names are compared pairwise
+        similarity: Minimum trigram Jaccard similarity for a fuzzy match
+
+    Returns:
+        tuple[list[GraphDocument], dict]: Rewritten graph documents and merge statistics
+    """
+    counts_by_type = defaultdict(Counter)
+    for doc in graph_documents:
+        for node in doc.nodes:
+            counts_by_type[node.type][node.id] += 1
+        for rel in doc.relationships:
+            counts_by_type[rel.source.type][rel.source.id] += 0
+            counts_by_type[rel.target.type][rel.target.id] += 0
+
+    stats = {"comparisons": 0, "clusters_merged": 0}
+    mappings = {
+        node_type: _resolve_type(counts, max_block_size, similarity, stats)
+        for node_type, counts in counts_by_type.items()
+    }
+
+    def canonical(node: Node) -> str:
+        return mappings.get(node.type, {}).get(node.id, node.id)
+
+    resolved = []
+    relationships_before = relationships_after = 0
+    for doc in graph_documents:
+        nodes = {}
+        for node in doc.nodes:
+            key = (canonical(node), node.type)
+            merged = nodes.setdefault(key, Node(id=key[0], type=node.type, properties={}))
+            merged.properties.update(node.properties or {})
+        relationships = {}
+        for rel in doc.relationships:
+            relationships_before += 1
+            source = nodes.get((canonical(rel.source), rel.source.type)) or Node(
+                id=canonical(rel.source), type=rel.source.type
+            )
+            target = nodes.get((canonical(rel.target), rel.target.type)) or Node(
+                id=canonical(rel.target), type=rel.target.type
+            )
+            if (source.id, source.type) == (target.id, target.type):
+                continue
+            key = (source.id, source.type, rel.type, target.id, target.type)
+            if key not in relationships:
+                relationships[key] = Relationship(
+                    source=source, target=target, type=rel.type, properties=dict(rel.properties or {})
+                )
+        relationships_after += len(relationships)
+        resolved.append(GraphDocument(
+            nodes=list(nodes.values()),
+            relationships=list(relationships.values()),
+            source=doc.source,
+        ))
+
+    entities_before = sum(len(counts) for counts in counts_by_type.values())
+    entities_after = sum(len(set(mapping.values())) for mapping in mappings.values())
+    stats.update({
+        "entities_before": entities_before,
+        "entities_after": entities_after,
+        "entities_merged": entities_before - entities_after,
+        "relationships_dropped": relationships_before - relationships_after,
+    })
+    metrics.inc("entities_merged", stats["entities_merged"])
+    print(f"Entity resolution: {entities_before} -> {entities_after} entities "
+          f"({stats['clusters_merged']} clusters merged, "
+          f"{stats['relationships_dropped']} duplicate or self-loop relationships dropped, "
+          f"{stats['comparisons']} comparisons)")
+    return resolved, stats
@@ -0,0 +1,170 @@
+"""Persistent content-addressed cache for LLM graph extraction results."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.documents import Document
+from langchain_core.prompts.chat import ChatPromptTemplate
+from langchain_community.graphs.graph_document import GraphDocument
+from config import (
+    ALLOWED_NODES,
+    ALLOWED_RELATIONSHIPS,
+    EXTRACTION_CACHE_PATH,
+    EXTRACTION_CACHE_MAX_ENTRIES,
+)
+from graph_serialization import graph_document_from_dict, graph_document_to_dict
+from instrumentation import metrics
+
+
+def make_extraction_key(
+    text: str,
+    prompt: ChatPromptTemplate,
+    model: str,
+    temperature: float,
+    allowed_nodes: list[str] = None,
+    allowed_relationships: list[str] = None
+) -> str:
+    """Build the cache key for extracting one chunk.
+
+    The key covers everything that influences the LLM output: the chunk text,
+    the prompt template, the model settings and the graph schema.
+
+    Args:
+        text: Chunk text
+        prompt: Extraction prompt template
+        model: LLM model name
+        temperature: LLM temperature
+        allowed_nodes: Allowed node types. Defaults to config.ALLOWED_NODES
+        allowed_relationships: Allowed relationship types. Defaults to config.ALLOWED_RELATIONSHIPS
+
+    Returns:
+        str: Hex SHA-256 digest identifying the extraction
+    """
+    payload = json.dumps({
+        "text": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "prompt": prompt.pretty_repr(),
+        "model": str(model),
+        "temperature": temperature,
+        "nodes": list(allowed_nodes if allowed_nodes is not None else ALLOWED_NODES),
+        "relationships": list(
+            allowed_relationships if allowed_relationships is not None else ALLOWED_RELATIONSHIPS
+        ),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """On-disk SQLite cache of serialized graph documents with LRU eviction.
+
+    Safe to share between the extraction worker threads, and between
+    processes using the same file: eviction counts the entries in the same
+    write transaction, so the cap holds however many writers there are.
+    """
+
+    def __init__(self, path: str = EXTRACTION_CACHE_PATH, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS extractions_last_access ON extractions(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, source: Document = None) -> GraphDocument | None:
+        """Look up a cached extraction.
+
+        Args:
+            key: Key from ``make_extraction_key``
+            source: Optional chunk to attach as the graph document's source
+
+        Returns:
+            GraphDocument | None: The cached graph document, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                metrics.inc("cache_lookups", cache="extraction", result="miss")
+                return None
+            self._conn.execute(
+                "UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        metrics.inc("cache_lookups", cache="extraction", result="hit")
+        graph_document = graph_document_from_dict(json.loads(row[0]))
+        if source is not None:
+            graph_document.source = source
+        return graph_document
+
+    def put(self, key: str, graph_document: GraphDocument) -> None:
+        """Store an extraction, evicting least recently used entries over the cap.
+
+        Args:
+            key: Key from ``make_extraction_key``
+            graph_document: Extracted graph document
+        """
+        value = json.dumps(graph_document_to_dict(graph_document), default=str)
+        with self._lock:
+            # Lock the file for writing before counting, so no other process
+            # can insert between the count and the eviction
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, value, last_access) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+                if self.max_entries:
+                    size = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+                    if size > self.max_entries:
+                        excess = size - self.max_entries
+                        self._conn.execute(
+                            "DELETE FROM extractions WHERE key IN ("
+                            " SELECT key FROM extractions ORDER BY last_access LIMIT ?)",
+                            (excess,)
+                        )
+                        self.evictions += excess
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of entries.
+
+        Returns:
+            dict: Cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0],
+                "max_entries": self.max_entries,
+            }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
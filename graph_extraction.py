@@ -1,9 +1,29 @@
 """Knowledge graph extraction from documents using LLM."""
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, NamedTuple
+
 from langchain_experimental.graph_transformers import LLMGraphTransformer
 from langchain_core.prompts.chat import ChatPromptTemplate
 from langchain_core.documents import Document
-from langchain_community.graphs.graph_document import GraphDocument
-from config import ALLOWED_NODES, ALLOWED_RELATIONSHIPS
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from config import (
+    ALLOWED_NODES,
+    ALLOWED_RELATIONSHIPS,
+    EXTRACTION_MAX_CONCURRENCY,
+    EXTRACTION_REQUESTS_PER_MINUTE,
+    EXTRACTION_TOKENS_PER_MINUTE,
+    EXTRACTION_MAX_RETRIES,
+    EXTRACTION_CHUNKS_PER_REQUEST,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+)
+from extraction_cache import ExtractionCache, make_extraction_key
+from instrumentation import metrics, traced
+from llm_setup import estimate_tokens, message_text
+from rate_limiting import RateLimiter, backoff_delay, is_rate_limit_error
 
 
 def create_extraction_prompt() -> ChatPromptTemplate:
@@ -33,46 +53,431 @@ def create_extraction_prompt() -> ChatPromptTemplate:
     ])
 
 
-def extract_graph_from_documents(
+def create_batch_extraction_prompt() -> ChatPromptTemplate:
+    """Create the prompt template for extracting several chunks in one request.
+    
+    Returns:
+        ChatPromptTemplate: Prompt expecting id-tagged chunks as ``input``
+    """
+    return ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "You are a top-tier algorithm designed for extracting information in structured formats to build a knowledge graph. "
+            "Your task is to identify entities and relations in each of several texts, independently. "
+            "Each text starts with a line of the form [chunk <id>]. "
+            "You must generate the output as a JSON object with a single key \"chunks\" holding a list with one object per text, "
+            "in the same order as the texts. Each of these objects must have the keys \"id\" (the id of the text) "
+            "and \"relationships\" (a list of the relations found in that text only). "
+            "Each relation object should have the keys: \"head\", \"head_type\", \"relation\", \"tail\", and \"tail_type\". "
+            "The \"head\" key must contain the text of the extracted entity. "
+            "The \"head_type\" key must contain the type of the extracted head entity "
+            "(one of: Person, Organization, Location, Event, Date, Concept, Theory). "
+            "The \"relation\" key must contain the type of relation between the \"head\" and the \"tail\" "
+            "(one of: WORKS_AT, BORN_IN, LIVES_IN, DEVELOPED, WON, INVOLVED_IN, RELATED_TO). "
+            "The \"tail\" key must represent the text of an extracted entity which is the tail of the relation, "
+            "and the \"tail_type\" key must contain the type of the tail entity. "
+            "Include every text, with an empty list if it has no relations. "
+            "Attempt to extract as many entities and relations as you can. "
+            "Return ONLY valid JSON"
+        ),
+        ("human", "Extract entities and relationships from each of the following texts:\n\n{input}")
+    ])
+
+
+class ChunkFailure(NamedTuple):
+    """A document chunk that could not be converted to a graph document."""
+    index: int
+    source: dict
+    error: str
+
+
+def report_extraction_plan(
     documents: list[Document],
-    llm,
-    prompt: ChatPromptTemplate = None
-) -> list[GraphDocument]:
-    """Extract knowledge graph from documents using LLM.
+    prompt: ChatPromptTemplate = None,
+    chunks_per_request: int = EXTRACTION_CHUNKS_PER_REQUEST
+) -> dict:
+    """Project the LLM calls and prompt overhead of extracting the given chunks.
     
     Args:
         documents: List of document chunks to process
+        prompt: Optional custom prompt template
+        chunks_per_request: Number of chunks packed into each request
+        
+    Returns:
+        dict: Projected calls, token totals and the share of prompt tokens
+        spent on the repeated prompt rather than chunk text
+    """
+    if chunks_per_request > 1:
+        prompt = create_batch_extraction_prompt()
+    elif prompt is None:
+        prompt = create_extraction_prompt()
+    
+    calls = -(-len(documents) // max(1, chunks_per_request))
+    overhead_tokens = estimate_tokens(prompt.format(input=""))
+    content_tokens = sum(estimate_tokens(doc.page_content) for doc in documents)
+    total_overhead = overhead_tokens * calls
+    total_tokens = total_overhead + content_tokens
+    plan = {
+        "llm_calls": calls,
+        "prompt_overhead_tokens": total_overhead,
+        "content_tokens": content_tokens,
+        "overhead_ratio": total_overhead / total_tokens if total_tokens else 0.0,
+    }
+    print(f"  Projected: {plan['llm_calls']} LLM calls, ~{total_tokens} prompt tokens "
+          f"({plan['overhead_ratio']:.0%} prompt overhead)")
+    return plan
+
+
+def create_graph_transformer(llm, prompt: ChatPromptTemplate = None) -> LLMGraphTransformer:
+    """Create the LLM graph transformer used for extraction.
+    
+    Args:
         llm: LLM instance to use for extraction
         prompt: Optional custom prompt template
         
     Returns:
-        list[GraphDocument]: List of extracted graph documents
+        LLMGraphTransformer: Transformer restricted to the configured schema
     """
     if prompt is None:
         prompt = create_extraction_prompt()
+    return LLMGraphTransformer(
+        llm=llm,
+        allowed_nodes=ALLOWED_NODES,
+        allowed_relationships=ALLOWED_RELATIONSHIPS,
+        prompt=prompt
+    )
+
+
+def _call_with_backoff(func, limiter: RateLimiter, tokens: int, max_retries: int):
+    """Call ``func`` within the rate limits, backing off on 429/quota errors."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        try:
+            result = func()
+        except Exception as e:
+            if attempt < max_retries and is_rate_limit_error(e):
+                metrics.inc("llm_retries")
+                limiter.penalize()
+                time.sleep(backoff_delay(attempt))
+                continue
+            raise
+        limiter.reward()
+        return result
+
+
+def _extract_chunk(
+    transformer: LLMGraphTransformer,
+    document: Document,
+    limiter: RateLimiter,
+    tokens: int,
+    max_retries: int
+) -> GraphDocument:
+    """Extract one chunk, backing off and slowing the limiter on 429/quota errors."""
+    return _call_with_backoff(
+        lambda: transformer.process_response(document), limiter, tokens, max_retries
+    )
+
+
+def _load_json(text: str):
+    """Parse JSON from an LLM response, tolerating code fences and stray text."""
+    text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def _relations_to_graph_document(relations: list, document: Document) -> GraphDocument:
+    """Build a graph document from head/relation/tail objects, keeping the schema.
     
-    print("Extracting knowledge graph from documents...")
-    print("Note: This may take a while as Gemini processes each document chunk...")
+    Ids are title-cased and relationship types upper-cased with underscores,
+    as ``LLMGraphTransformer`` formats them, so a chunk yields the same nodes
+    whether it was extracted alone or in a batch.
+    """
+    allowed_nodes = {label.lower(): label for label in ALLOWED_NODES}
+    allowed_relationships = {rel.lower(): rel for rel in ALLOWED_RELATIONSHIPS}
+    nodes = {}
+    relationships = []
+    for rel in relations:
+        if not isinstance(rel, dict) or not rel.get("head") or not rel.get("tail") or not rel.get("relation"):
+            continue
+        head_type = allowed_nodes.get(str(rel.get("head_type", "")).lower())
+        tail_type = allowed_nodes.get(str(rel.get("tail_type", "")).lower())
+        rel_type = allowed_relationships.get(str(rel["relation"]).replace(" ", "_").lower())
+        if head_type is None or tail_type is None or rel_type is None:
+            continue
+        head, tail = str(rel["head"]).title(), str(rel["tail"]).title()
+        source = nodes.setdefault((head, head_type), Node(id=head, type=head_type))
+        target = nodes.setdefault((tail, tail_type), Node(id=tail, type=tail_type))
+        relationships.append(Relationship(source=source, target=target, type=rel_type))
+    return GraphDocument(nodes=list(nodes.values()), relationships=relationships, source=document)
+
+
+def _parse_batch_response(text: str, documents: list[Document]) -> dict[int, GraphDocument]:
+    """Split a multi-chunk response into one graph document per chunk id.
     
+    Returns:
+        dict[int, GraphDocument]: Position in ``documents`` mapped to its graph
+        document, for every chunk the response covered with a well-formed entry
+    """
+    parsed = _load_json(text)
+    entries = parsed.get("chunks", []) if isinstance(parsed, dict) else parsed
+    results = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or not isinstance(entry.get("relationships"), list):
+            continue
+        match = re.fullmatch(r"c?(\d+)", str(entry.get("id", "")).strip())
+        if match is None or int(match.group(1)) >= len(documents):
+            continue
+        index = int(match.group(1))
+        results[index] = _relations_to_graph_document(entry["relationships"], documents[index])
+    return results
+
+
+def _extract_chunk_batch(
+    transformer: LLMGraphTransformer,
+    llm,
+    batch_prompt: ChatPromptTemplate,
+    prompt: ChatPromptTemplate,
+    documents: list[Document],
+    limiter: RateLimiter,
+    max_retries: int
+) -> list[tuple[GraphDocument | Exception, ChatPromptTemplate]]:
+    """Extract several chunks with one request, falling back to one request per chunk.
+    
+    Chunks missing from the response, or all of them if the response is not
+    valid JSON, are extracted individually with the single-chunk prompt. A
+    failed request, such as one still rate limited after every retry, is
+    raised rather than multiplied into one request per chunk.
+    
+    Returns:
+        list[tuple[GraphDocument | Exception, ChatPromptTemplate]]: The
+        outcome of each chunk and the prompt that produced it
+    """
+    batch_text = "\n\n".join(
+        f"[chunk c{i}]\n{document.page_content}" for i, document in enumerate(documents)
+    )
+    messages = batch_prompt.format_messages(input=batch_text)
+    response = _call_with_backoff(
+        lambda: llm.invoke(messages),
+        limiter,
+        estimate_tokens(batch_prompt.format(input=batch_text)),
+        max_retries
+    )
     try:
-        llm_transformer = LLMGraphTransformer(
-            llm=llm,
-            allowed_nodes=ALLOWED_NODES,
-            allowed_relationships=ALLOWED_RELATIONSHIPS,
-            prompt=prompt
+        parsed = _parse_batch_response(message_text(response), documents)
+    except (ValueError, TypeError):
+        # Malformed JSON or entries; pydantic validation errors are ValueErrors
+        parsed = {}
+    
+    outcomes = []
+    for i, document in enumerate(documents):
+        if i in parsed:
+            outcomes.append((parsed[i], batch_prompt))
+            continue
+        try:
+            outcomes.append((_extract_chunk(
+                transformer,
+                document,
+                limiter,
+                estimate_tokens(prompt.format(input=document.page_content)),
+                max_retries
+            ), prompt))
+        except Exception as e:
+            outcomes.append((e, prompt))
+    return outcomes
+
+
+@traced("extract_graph")
+def extract_graph_documents_concurrently(
+    documents: list[Document],
+    llm,
+    prompt: ChatPromptTemplate = None,
+    max_concurrency: int = EXTRACTION_MAX_CONCURRENCY,
+    requests_per_minute: float = EXTRACTION_REQUESTS_PER_MINUTE,
+    tokens_per_minute: float = EXTRACTION_TOKENS_PER_MINUTE,
+    max_retries: int = EXTRACTION_MAX_RETRIES,
+    cache: ExtractionCache = None,
+    chunks_per_request: int = EXTRACTION_CHUNKS_PER_REQUEST,
+    on_progress: Callable[[], None] = None
+) -> tuple[list[GraphDocument | None], list[ChunkFailure]]:
+    """Extract graph documents from chunks with bounded, rate-limited concurrency.
+    
+    With ``chunks_per_request`` above 1, that many chunks are packed into each
+    request with the batch prompt and the response is split back into one
+    graph document per chunk. Chunks the response does not cover properly are
+    retried one request each.
+    
+    Args:
+        documents: List of document chunks to process
+        llm: LLM instance to use for extraction
+        prompt: Optional custom prompt template
+        max_concurrency: Maximum number of requests in flight at once
+        requests_per_minute: Request budget, or None for no limit
+        tokens_per_minute: Estimated prompt token budget, or None for no limit
+        max_retries: Retries per request on 429/quota errors
+        cache: Optional extraction cache; hits skip the LLM call entirely
+        chunks_per_request: Number of chunks packed into each request
+        on_progress: Optional function called after each finished request
+        
+    Returns:
+        tuple[list[GraphDocument | None], list[ChunkFailure]]: Results in the
+        same order as ``documents`` (None for failed chunks) and the failures
+    """
+    if prompt is None:
+        prompt = create_extraction_prompt()
+    batch_prompt = create_batch_extraction_prompt() if chunks_per_request > 1 else None
+    
+    transformer = create_graph_transformer(llm, prompt)
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    results: list[GraphDocument | None] = [None] * len(documents)
+    failures: list[ChunkFailure] = []
+    
+    def cache_key(document: Document, used_prompt: ChatPromptTemplate) -> str:
+        return make_extraction_key(
+            document.page_content,
+            used_prompt,
+            getattr(llm, "model", LLM_MODEL),
+            getattr(llm, "temperature", LLM_TEMPERATURE)
         )
+    
+    # Results are cached under the prompt that produced them; in batch mode a
+    # chunk can have been extracted with either prompt
+    lookup_prompts = [batch_prompt, prompt] if batch_prompt is not None else [prompt]
+    pending = []
+    for index, document in enumerate(documents):
+        if cache is not None:
+            for lookup_prompt in lookup_prompts:
+                results[index] = cache.get(cache_key(document, lookup_prompt), source=document)
+                if results[index] is not None:
+                    break
+            if results[index] is not None:
+                continue
+        pending.append(index)
+    
+    if cache is not None:
+        print(f"  Extraction cache: {len(documents) - len(pending)} hits, {len(pending)} misses")
+    progress_step = max(1, len(pending) // 10)
+    units = [
+        pending[start:start + max(1, chunks_per_request)]
+        for start in range(0, len(pending), max(1, chunks_per_request))
+    ]
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = {}
+        for unit in units:
+            if batch_prompt is None or len(unit) == 1:
+                future = executor.submit(
+                    _extract_chunk,
+                    transformer,
+                    documents[unit[0]],
+                    limiter,
+                    estimate_tokens(prompt.format(input=documents[unit[0]].page_content)),
+                    max_retries
+                )
+            else:
+                future = executor.submit(
+                    _extract_chunk_batch,
+                    transformer,
+                    llm,
+                    batch_prompt,
+                    prompt,
+                    [documents[index] for index in unit],
+                    limiter,
+                    max_retries
+                )
+            futures[future] = unit
         
-        print("Converting documents to graph... (this may take a minute)")
-        graph_documents = llm_transformer.convert_to_graph_documents(documents)
-        print(f"Extracted {len(graph_documents)} graph documents")
-        return graph_documents
+        completed = 0
+        next_report = progress_step
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                outcomes = [(e, None)] * len(unit)
+            if not isinstance(outcomes, list):
+                outcomes = [(outcomes, prompt)]
+            for index, (outcome, used_prompt) in zip(unit, outcomes):
+                if isinstance(outcome, Exception):
+                    failures.append(ChunkFailure(
+                        index=index,
+                        source=documents[index].metadata,
+                        error=f"{type(outcome).__name__}: {outcome}"
+                    ))
+                    continue
+                results[index] = outcome
+                if cache is not None:
+                    cache.put(cache_key(documents[index], used_prompt), outcome)
+            completed += len(unit)
+            if on_progress is not None:
+                on_progress()
+            if completed >= next_report or completed == len(pending):
+                print(f"  Processed {completed}/{len(pending)} chunks")
+                next_report = completed + progress_step
+    
+    failures.sort(key=lambda failure: failure.index)
+    metrics.inc("chunks_extracted", len(pending) - len(failures))
+    metrics.inc("extraction_failures", len(failures))
+    return results, failures
+
+
+def extract_graph_from_documents(
+    documents: list[Document],
+    llm,
+    prompt: ChatPromptTemplate = None,
+    max_concurrency: int = EXTRACTION_MAX_CONCURRENCY,
+    cache: ExtractionCache = None,
+    chunks_per_request: int = EXTRACTION_CHUNKS_PER_REQUEST,
+    requests_per_minute: float = EXTRACTION_REQUESTS_PER_MINUTE,
+    tokens_per_minute: float = EXTRACTION_TOKENS_PER_MINUTE
+) -> list[GraphDocument]:
+    """Extract knowledge graph from documents using LLM.
+    
+    Chunks are processed concurrently within the configured rate limits.
+    Chunks that fail are reported and skipped; the rest keep their order.
+    
+    Args:
+        documents: List of document chunks to process
+        llm: LLM instance to use for extraction
+        prompt: Optional custom prompt template
+        max_concurrency: Maximum number of chunks in flight at once
+        cache: Optional extraction cache; hits skip the LLM call entirely
+        chunks_per_request: Number of chunks packed into each request
+        requests_per_minute: Request budget, or None for no limit
+        tokens_per_minute: Estimated prompt token budget, or None for no limit
         
-    except Exception as e:
-        print(f"ERROR during graph extraction: {e}")
-        print(f"Error details: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        return []
+    Returns:
+        list[GraphDocument]: List of extracted graph documents
+    """
+    print("Extracting knowledge graph from documents...")
+    print("Note: This may take a while as Gemini processes each document chunk...")
+    report_extraction_plan(documents, prompt, chunks_per_request)
+    
+    results, failures = extract_graph_documents_concurrently(
+        documents,
+        llm,
+        prompt,
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        cache=cache,
+        chunks_per_request=chunks_per_request
+    )
+    
+    if failures:
+        print(f"WARNING: {len(failures)} of {len(documents)} chunks failed to extract:")
+        for failure in failures[:10]:
+            print(f"  Chunk {failure.index} ({failure.source.get('source', 'unknown')}): {failure.error}")
+        if len(failures) > 10:
+            print(f"  ... and {len(failures) - 10} more")
+    
+    graph_documents = [doc for doc in results if doc is not None]
+    print(f"Extracted {len(graph_documents)} graph documents")
+    return graph_documents
 
 
 def analyze_graph_documents(graph_documents: list[GraphDocument]) -> tuple[int, int]:
@@ -1,108 +1,629 @@
 """Query operations for the knowledge graph."""
-from langchain_neo4j import Neo4jGraph
-from langchain_google_genai import ChatGoogleGenerativeAI
+from __future__ import annotations
 
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple
 
-def query_graph(question: str, graph: Neo4jGraph, llm: ChatGoogleGenerativeAI) -> str:
+from config import (
+    COMMUNITY_QUERY_LIMIT,
+    COMMUNITY_SUMMARIES_ENABLED,
+    ENTITY_INDEX_ENABLED,
+    QUERY_MIN_KEYWORD_RESULTS,
+    QUERY_BATCH_MAX_CONCURRENCY,
+)
+from context_builder import GraphContext, build_context
+from entity_index import get_entity_index
+from graph_store import GraphStore
+from graph_storage import as_graph_store
+from instrumentation import metrics
+from llm_setup import message_text
+from query_cache import QueryCache
+
+if TYPE_CHECKING:
+    from langchain_neo4j import Neo4jGraph
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+# Wording of broad questions that community summaries answer better than triples
+_GLOBAL_QUESTION = re.compile(
+    r"\b(main|overall|overview|summar(?:y|ize|ise)|in general|themes?|big picture|"
+    r"most important|key (?:ideas|points|topics|facts|contributions))\b",
+    re.IGNORECASE
+)
+
+
+class QueryResult(NamedTuple):
+    """Answer to a question together with what produced it."""
+    answer: str
+    entities: list[str]
+    results: list
+    timings: dict[str, float]
+    context: dict = None  # Stats of the answer context, see context_builder.build_context
+
+
+def _timed(func, *args, **kwargs) -> tuple:
+    """Call ``func`` and return its result with the elapsed seconds."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _build_context(results: list, terms: list[str], entities: list[str]) -> GraphContext:
+    """Build the answer context for one question and count its tokens."""
+    context = build_context(results, [*terms, *entities])
+    metrics.inc("context_tokens", context.stats["tokens"])
+    metrics.inc("context_tokens_saved", context.stats["tokens_saved"])
+    return context
+
+
+def _record_timings(timings: dict[str, float], questions: int = 1) -> None:
+    """Feed query stage latencies into the metrics histograms."""
+    metrics.inc("questions", questions)
+    for stage, seconds in timings.items():
+        metrics.observe("query_stage_seconds", seconds, stage=stage)
+
+
+def _retrieve(
+    question: str,
+    terms: list[str],
+    graph: GraphStore,
+    llm: ChatGoogleGenerativeAI,
+    min_keyword_results: int,
+    timings: dict[str, float]
+) -> tuple[list, list[str]]:
+    """Retrieve triples for a question, overlapping keyword search with entity extraction."""
+    entities = []
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        keyword_future = executor.submit(_timed, _search_linked_terms, terms, graph, timings)
+        entity_future = None
+        if min_keyword_results is None:
+            entity_future = executor.submit(_timed, _extract_entities, question, llm)
+        
+        (keyword_results, searched), timings["keyword_search"] = keyword_future.result()
+        if entity_future is None and len(keyword_results) < min_keyword_results:
+            entity_future = executor.submit(_timed, _extract_entities, question, llm)
+        if entity_future is not None:
+            entities, timings["entity_extraction"] = entity_future.result()
+    
+    # Extend retrieval with entities the keyword search did not cover
+    all_results = keyword_results
+    extra_terms = [e for e in entities if e.lower() not in searched]
+    if extra_terms:
+        entity_results, timings["entity_search"] = _timed(_search_terms, extra_terms, graph)
+        all_results = _merge_results(keyword_results, entity_results)
+    if not all_results:
+        all_results = _fallback_results(graph, terms)
+    
+    return all_results, entities
+
+
+def retrieve_context(
+    question: str,
+    graph: Neo4jGraph | GraphStore,
+    llm: ChatGoogleGenerativeAI,
+    min_keyword_results: int = QUERY_MIN_KEYWORD_RESULTS,
+    cache: QueryCache = None,
+    timings: dict[str, float] = None
+) -> tuple[list, list[str], GraphContext]:
+    """Retrieve the triples for a question and build the answer context from them.
+    
+    This is everything ``run_query_pipeline`` does before answer synthesis,
+    for callers that synthesize the answer themselves, e.g. streaming it.
+    
+    Args:
+        question: The question to answer
+        graph: Neo4j graph instance or graph store
+        llm: LLM instance for entity extraction
+        min_keyword_results: See ``run_query_pipeline``
+        cache: Optional retrieval and answer cache
+        timings: Optional dict that stage latencies are added to
+        
+    Returns:
+        tuple[list, list[str], GraphContext]: Retrieved triples, extracted
+        entities and the answer context
+    """
+    graph = as_graph_store(graph)
+    if timings is None:
+        timings = {}
+    terms = _extract_search_terms(question)
+    is_global = _is_global_question(question)
+    
+    # Retrieve triples, from the cache when the terms were seen before
+    cached = None
+    if cache is not None:
+        version, timings["version_check"] = _timed(graph.get_version)
+        cache.sync_version(version)
+        retrieval_key = _retrieval_key(cache, question, terms, is_global)
+        cached = cache.retrieval.get(retrieval_key)
+    if cached is not None:
+        all_results, entities = cached
+    else:
+        # Broad questions go to the community summaries, if there are any
+        all_results, entities = [], []
+        if is_global:
+            all_results, timings["community_search"] = _timed(_search_communities, terms, graph)
+        if not all_results:
+            all_results, entities = _retrieve(question, terms, graph, llm, min_keyword_results, timings)
+        if cache is not None:
+            cache.retrieval.put(retrieval_key, (all_results, entities))
+    
+    return all_results, entities, _build_context(all_results, terms, entities)
+
+
+def run_query_pipeline(
+    question: str,
+    graph: Neo4jGraph | GraphStore,
+    llm: ChatGoogleGenerativeAI,
+    min_keyword_results: int = QUERY_MIN_KEYWORD_RESULTS,
+    cache: QueryCache = None
+) -> QueryResult:
+    """Answer a question, overlapping keyword retrieval with entity extraction.
+    
+    A keyword search over the question starts right away. By default the LLM
+    entity extraction runs concurrently with it, and the extracted entities
+    then extend the retrieval with a second search for any new terms. When
+    ``min_keyword_results`` is set, the LLM extraction only runs if the
+    keyword search returned fewer triples than that, saving a round trip.
+    
+    With a cache, retrieval is reused for questions with the same search
+    terms and answers for the same question and context, until the graph
+    version changes. A fully cached question makes no LLM call.
+    
+    Args:
+        question: The question to answer
+        graph: Neo4j graph instance or graph store
+        llm: LLM instance for entity extraction and answer synthesis
+        min_keyword_results: Skip entity extraction when the keyword search
+            returns at least this many triples, or None to always overlap
+        cache: Optional retrieval and answer cache
+        
+    Returns:
+        QueryResult: The answer, extracted entities, retrieved triples and
+        per-stage latencies in seconds
+    """
+    start = time.perf_counter()
+    timings = {}
+    
+    # Steps 1-2: Retrieve triples and render the most relevant ones for the LLM
+    all_results, entities, context = retrieve_context(
+        question, graph, llm, min_keyword_results, cache, timings
+    )
+    graph_data = context.text
+    
+    # Step 3: Use LLM to synthesize answer from graph data
+    answer = None
+    if cache is not None:
+        answer_key = cache.answer_key(question, graph_data)
+        answer = cache.answers.get(answer_key)
+    if answer is None:
+        answer, timings["synthesis"] = _timed(_synthesize_answer, question, graph_data, llm)
+        if cache is not None:
+            cache.answers.put(answer_key, answer)
+    timings["total"] = time.perf_counter() - start
+    _record_timings(timings)
+    
+    return QueryResult(answer, entities, all_results, timings, context.stats)
+
+
+def query_graph(
+    question: str,
+    graph: Neo4jGraph | GraphStore,
+    llm: ChatGoogleGenerativeAI,
+    cache: QueryCache = None
+) -> str:
     """Query the knowledge graph and generate an answer.
     
     Args:
         question: The question to answer
-        graph: Neo4j graph instance
+        graph: Neo4j graph instance or graph store
         llm: LLM instance for entity extraction and answer synthesis
+        cache: Optional retrieval and answer cache
         
     Returns:
         str: The answer to the question
     """
     try:
-        # Step 1: Extract entities from the question using LLM
-        entity_extraction_prompt = f"""From the following question, extract the main entities (people, places, concepts, dates, etc.) that should be searched in the knowledge graph.
+        result = run_query_pipeline(question, graph, llm, cache=cache)
+        if result.entities:
+            print(f"  Extracted entities: {result.entities[:3]}...")  # Show first 3
+        print("  Stage timings: " + ", ".join(
+            f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in result.timings.items()
+        ))
+        print(f"  Context: {result.context['used_triples']} triples, "
+              f"{result.context['tokens']} tokens ({result.context['tokens_saved']} saved)")
+        return result.answer
+        
+    except Exception as e:
+        return f"Error querying graph: {str(e)}"
+
+
+def query_graph_batch(
+    questions: list[str],
+    graph: Neo4jGraph | GraphStore,
+    llm: ChatGoogleGenerativeAI,
+    max_concurrency: int = QUERY_BATCH_MAX_CONCURRENCY,
+    cache: QueryCache = None
+) -> list[QueryResult]:
+    """Answer many questions with shared retrieval and batched LLM calls.
+    
+    Entity extraction and answer synthesis prompts go through ``llm.batch``
+    with bounded concurrency. Every distinct term is looked up in the graph
+    once, however many questions share it, and keyword lookups run while the
+    entities are being extracted. Questions answered from the cache are left
+    out of the batches.
+    
+    Args:
+        questions: The questions to answer
+        graph: Neo4j graph instance or graph store
+        llm: LLM instance for entity extraction and answer synthesis
+        max_concurrency: Maximum number of LLM requests in flight at once
+        cache: Optional retrieval and answer cache
+        
+    Returns:
+        list[QueryResult]: One result per question, in order. Timings of the
+        shared stages are the durations of the batch the question was part of
+    """
+    start = time.perf_counter()
+    graph = as_graph_store(graph)
+    timings = {}
+    llm_config = {"max_concurrency": max_concurrency}
+    question_terms = [_extract_search_terms(question) for question in questions]
+    all_results = [None] * len(questions)
+    question_entities = [[] for _ in questions]
+    answers = [None] * len(questions)
+    
+    is_global = [_is_global_question(question) for question in questions]
+    
+    if cache is not None:
+        version, timings["version_check"] = _timed(graph.get_version)
+        cache.sync_version(version)
+        for i, (question, terms) in enumerate(zip(questions, question_terms)):
+            cached = cache.retrieval.get(_retrieval_key(cache, question, terms, is_global[i]))
+            if cached is not None:
+                all_results[i], question_entities[i] = cached
+    
+    # Broad questions go to the community summaries, if there are any
+    global_misses = [i for i, results in enumerate(all_results) if results is None and is_global[i]]
+    if global_misses:
+        community_start = time.perf_counter()
+        for i in global_misses:
+            summaries = _search_communities(question_terms[i], graph)
+            if summaries:
+                all_results[i] = summaries
+                if cache is not None:
+                    cache.retrieval.put(
+                        _retrieval_key(cache, questions[i], question_terms[i], True), (summaries, [])
+                    )
+        timings["community_search"] = time.perf_counter() - community_start
+    misses = [i for i, results in enumerate(all_results) if results is None]
+    
+    if misses:
+        keyword_terms = list(dict.fromkeys(term for i in misses for term in question_terms[i]))
+        
+        # Node ids the entity index links the terms to are looked up with them
+        linked, timings["entity_linking"] = _timed(_link_terms, keyword_terms, graph)
+        keyword_terms = list(dict.fromkeys(
+            [*keyword_terms, *(name for names in linked.values() for name in names)]
+        ))
+        
+        # Stage 1: Keyword lookups overlap with batched entity extraction
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            keyword_future = executor.submit(_timed, _search_each_term, keyword_terms, graph)
+            responses, timings["entity_extraction"] = _timed(
+                llm.batch,
+                [_build_entity_prompt(questions[i]) for i in misses],
+                config=llm_config,
+                return_exceptions=True
+            )
+            per_term, timings["keyword_search"] = keyword_future.result()
+        
+        # A failed or unreadable extraction leaves its question to the keyword results
+        for i, response in zip(misses, responses):
+            if isinstance(response, Exception):
+                continue
+            try:
+                question_entities[i] = _parse_entities(message_text(response))
+            except (TypeError, ValueError, AttributeError):
+                question_entities[i] = []
+        
+        # Stage 2: One shared lookup for entity names not already searched
+        extra_terms = [
+            entity for i in misses for entity in question_entities[i]
+            if entity.lower() not in per_term
+        ]
+        if extra_terms:
+            entity_per_term, timings["entity_search"] = _timed(_search_each_term, extra_terms, graph)
+            per_term.update(entity_per_term)
+        
+        for i in misses:
+            terms = [
+                *question_terms[i],
+                *(name for term in question_terms[i] for name in linked.get(term, ())),
+                *question_entities[i],
+            ]
+            results = _merge_results(*(per_term.get(term.lower(), []) for term in terms))
+            if not results:
+                results = _fallback_results(graph, question_terms[i])
+            all_results[i] = results
+            if cache is not None:
+                cache.retrieval.put(
+                    _retrieval_key(cache, questions[i], question_terms[i], is_global[i]),
+                    (results, question_entities[i])
+                )
+    
+    # Stage 3: Batched answer synthesis for questions not in the answer cache
+    contexts = [
+        _build_context(results, terms, entities)
+        for results, terms, entities in zip(all_results, question_terms, question_entities)
+    ]
+    graph_data = [context.text for context in contexts]
+    if cache is not None:
+        for i, question in enumerate(questions):
+            answers[i] = cache.answers.get(cache.answer_key(question, graph_data[i]))
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    if pending:
+        responses, timings["synthesis"] = _timed(
+            llm.batch,
+            [_build_answer_prompt(questions[i], graph_data[i]) for i in pending],
+            config=llm_config,
+            return_exceptions=True
+        )
+        for i, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                answers[i] = f"Error querying graph: {response}"
+                continue
+            answers[i] = message_text(response)
+            if cache is not None:
+                cache.answers.put(cache.answer_key(questions[i], graph_data[i]), answers[i])
+    timings["total"] = time.perf_counter() - start
+    _record_timings(timings, len(questions))
+    
+    return [
+        QueryResult(answer, entities, results, dict(timings), context.stats)
+        for answer, entities, results, context in zip(answers, question_entities, all_results, contexts)
+    ]
+
+
+def _build_entity_prompt(question: str) -> str:
+    """Build the prompt asking the LLM for the entities of a question."""
+    return f"""From the following question, extract the main entities (people, places, concepts, dates, etc.) that should be searched in the knowledge graph.
 
 Question: {question}
 
 List the key entities (one per line):"""
+
+
+def _parse_entities(response: str) -> list[str]:
+    """Parse one entity per line from an entity extraction response."""
+    entities = []
+    for line in response.split('\n'):
+        entity = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if entity and not entity.startswith('#') and entity not in entities:
+            entities.append(entity)
+    return entities
+
+
+def _extract_entities(question: str, llm) -> list[str]:
+    """Extract the entities of a question that should be searched in the graph.
+    
+    Args:
+        question: The question to analyze
+        llm: LLM instance
         
-        entities_response = llm.invoke(entity_extraction_prompt).content
-        entities = [e.strip() for e in entities_response.split('\n') 
-                   if e.strip() and not e.strip().startswith('#')]
+    Returns:
+        list[str]: Entity names, one per line of the LLM response
+    """
+    return _parse_entities(message_text(llm.invoke(_build_entity_prompt(question))))
+
+
+def _extract_search_terms(question: str, max_terms: int = 5) -> list[str]:
+    """Pick the keywords of a question to look up in the graph.
+    
+    Args:
+        question: The question to search for
+        max_terms: Maximum number of terms to return
         
-        print(f"  Extracted entities: {entities[:3]}...")  # Show first 3
+    Returns:
+        list[str]: Lowercased words longer than three characters, in order
+    """
+    terms = []
+    for word in re.findall(r"\w+", question.lower()):
+        if len(word) > 3 and word not in terms:  # Filter short words
+            terms.append(word)
+    return terms[:max_terms]
+
+
+def _search_terms(terms: list[str], graph: GraphStore, seed_limit: int = 5, limit: int = 50) -> list:
+    """Look up triples matching any of the given terms.
+    
+    All terms go to the store in one call, so Neo4j sees a single round trip
+    and can reuse the cached plan across questions. Each term's best matching
+    nodes are expanded to their neighbors, and the triples are deduplicated
+    and ranked by how many terms hit them.
+    
+    Args:
+        terms: Keywords or entity names to search for
+        graph: Graph store
+        seed_limit: Maximum number of matching nodes expanded per term
+        limit: Maximum number of triples returned
         
-        # Step 2: Query the graph for relevant information
-        all_results = _search_graph(question, graph)
+    Returns:
+        list: Query results with ``n``, ``r``, ``m`` and ``hits``
+    """
+    terms = list(dict.fromkeys(term.lower() for term in terms if re.search(r"\w", term)))
+    if not terms:
+        return []
+    return graph.search_terms(terms, seed_limit, limit)
+
+
+def _link_terms(terms: list[str], graph: GraphStore) -> dict[str, list[str]]:
+    """Link terms to node ids with the entity index, all in one vectorized call.
+    
+    Catches misspellings, plurals and partial names that the store's word
+    lookups miss.
+    
+    Args:
+        terms: Lowercased keywords or entity names
+        graph: Graph store
         
-        # Step 3: Format the results for the LLM
-        graph_data = _format_graph_results(all_results)
+    Returns:
+        dict[str, list[str]]: Each term mapped to the lowercased ids of the
+        nodes it links to, leaving out the term itself. Empty when the index
+        is disabled or unavailable
+    """
+    if not ENTITY_INDEX_ENABLED or not terms:
+        return {}
+    try:
+        linked = get_entity_index(graph).link(terms)
+    except Exception:
+        return {}
+    return {
+        term: [node_id.lower() for node_id, _ in matches if node_id.lower() != term]
+        for term, matches in linked.items()
+    }
+
+
+def _search_linked_terms(
+    terms: list[str],
+    graph: GraphStore,
+    timings: dict[str, float]
+) -> tuple[list, list[str]]:
+    """Search the terms together with the node ids the entity index links them to.
+    
+    Returns:
+        tuple[list, list[str]]: Matching triples, and every term searched
+    """
+    linked, timings["entity_linking"] = _timed(_link_terms, terms, graph)
+    searched = list(dict.fromkeys([*terms, *(name for names in linked.values() for name in names)]))
+    return _search_terms(searched, graph), searched
+
+
+def _search_each_term(
+    terms: list[str],
+    graph: GraphStore,
+    seed_limit: int = 5,
+    limit: int = 50
+) -> dict[str, list]:
+    """Look up the triples of each term separately, in one round trip.
+    
+    Args:
+        terms: Keywords or entity names to search for
+        graph: Graph store
+        seed_limit: Maximum number of matching nodes expanded per term
+        limit: Maximum number of triples returned per term
         
-        # Step 4: Use LLM to synthesize answer from graph data
-        answer = _synthesize_answer(question, graph_data, llm)
-        return answer
+    Returns:
+        dict[str, list]: Each lowercased term mapped to its matching triples
+    """
+    terms = list(dict.fromkeys(term.lower() for term in terms if re.search(r"\w", term)))
+    if not terms:
+        return {}
+    return graph.search_each_term(terms, seed_limit, limit)
+
+
+def _merge_results(*result_lists: list, limit: int = 50) -> list:
+    """Merge search results, summing the term hits of repeated triples."""
+    merged = {}
+    for results in result_lists:
+        for record in results:
+            key = repr((record.get("n"), record.get("r"), record.get("m")))
+            if key in merged:
+                merged[key]["hits"] = merged[key].get("hits", 1) + record.get("hits", 1)
+            else:
+                merged[key] = dict(record)
+    ranked = sorted(merged.values(), key=lambda record: record.get("hits", 1), reverse=True)
+    return ranked[:limit]
+
+
+def _is_global_question(question: str) -> bool:
+    """Whether a question asks about the graph broadly rather than about specific facts."""
+    return bool(_GLOBAL_QUESTION.search(question))
+
+
+def _retrieval_key(cache: QueryCache, question: str, terms: list[str], is_global: bool) -> tuple:
+    """Retrieval cache key, kept apart for questions routed to community summaries."""
+    key = cache.retrieval_key(terms or [question])
+    return ("__global__", *key) if is_global else key
+
+
+def _search_communities(terms: list[str], graph: GraphStore, limit: int = COMMUNITY_QUERY_LIMIT) -> list:
+    """Look up the community summaries most relevant to the terms.
+    
+    Args:
+        terms: Lowercased question keywords
+        graph: Graph store
+        limit: Maximum number of summaries returned
         
-    except Exception as e:
-        return f"Error querying graph: {str(e)}"
+    Returns:
+        list: Summaries with ``id``, ``title``, ``summary`` and ``size``, or an
+        empty list when summaries are disabled or none are stored
+    """
+    if not COMMUNITY_SUMMARIES_ENABLED:
+        return []
+    try:
+        return graph.search_communities(terms, limit)
+    except Exception:
+        return []
+
+
+def _fallback_results(graph: GraphStore, terms: list[str] = ()) -> list:
+    """Return community summaries, or a general slice of the graph, when no term matched."""
+    return _search_communities(terms, graph) or graph.sample(20)
 
 
-def _search_graph(question: str, graph: Neo4jGraph) -> list:
+def _search_graph(question: str, graph: Neo4jGraph | GraphStore, seed_limit: int = 5, limit: int = 50) -> list:
     """Search the graph for relevant information.
     
     Args:
         question: The question to search for
-        graph: Neo4j graph instance
+        graph: Neo4j graph instance or graph store
+        seed_limit: Maximum number of index hits expanded per term
+        limit: Maximum number of triples returned
         
     Returns:
         list: List of query results
     """
-    all_results = []
-    
-    # Search for entities in the question
-    search_terms = question.lower().split()
-    important_words = [w for w in search_terms if len(w) > 3]  # Filter short words
-    
-    # Query for each important word
-    for term in important_words[:5]:  # Limit to 5 terms
-        try:
-            # Search for nodes containing the term
-            query = f"""
-            MATCH (n)-[r]-(m)
-            WHERE any(prop in keys(n) WHERE 
-                toLower(toString(n[prop])) CONTAINS toLower('{term}'))
-               OR any(prop in keys(m) WHERE 
-                toLower(toString(m[prop])) CONTAINS toLower('{term}'))
-            RETURN n, r, m
-            LIMIT 10
-            """
-            result = graph.query(query)
-            if result:
-                all_results.extend(result)
-        except Exception as e:
-            continue
-    
-    # Also try a general query to get all nodes and relationships
+    graph = as_graph_store(graph)
+    all_results = _search_terms(_extract_search_terms(question), graph, seed_limit, limit)
+    
+    # Fall back to community summaries or a general slice of the graph
     if not all_results:
-        try:
-            general_query = "MATCH (n)-[r]-(m) RETURN n, r, m LIMIT 20"
-            result = graph.query(general_query)
-            if result:
-                all_results.extend(result)
-        except:
-            pass
+        all_results = _fallback_results(graph, _extract_search_terms(question))
     
     return all_results
 
 
-def _format_graph_results(results: list) -> str:
-    """Format graph query results as a string.
+def _build_answer_prompt(question: str, graph_data: str) -> str:
+    """Build the prompt asking the LLM to answer from graph data."""
+    return f"""You are answering questions based on information from a knowledge graph stored in Neo4j.
+
+Question: {question}
+
+Knowledge Graph Data (relationships as head -[TYPE]-> tail, and community summaries):
+{graph_data}
+
+Provide a clear, concise answer based on the graph data above. If the graph data doesn't contain the answer, say so explicitly.
+
+Answer:"""
+
+
+async def astream_answer(question: str, graph_data: str, llm) -> AsyncIterator[str]:
+    """Synthesize an answer from graph data, yielding text as the LLM generates it.
     
     Args:
-        results: List of query results
+        question: The question to answer
+        graph_data: Formatted graph data
+        llm: LLM instance
         
-    Returns:
-        str: Formatted graph data
+    Yields:
+        str: Successive pieces of the answer
     """
-    if results:
-        return "\n".join([str(r) for r in results[:50]])  # Limit results
-    else:
-        return "No specific graph data found, but the graph contains information about the topic."
+    async for chunk in llm.astream(_build_answer_prompt(question, graph_data)):
+        if text := message_text(chunk):
+            yield text
 
 
 def _synthesize_answer(question: str, graph_data: str, llm) -> str:
@@ -116,17 +637,4 @@ def _synthesize_answer(question: str, graph_data: str, llm) -> str:
     Returns:
         str: The synthesized answer
     """
-    answer_prompt = f"""You are answering questions based on information from a knowledge graph stored in Neo4j.
-
-Question: {question}
-
-Knowledge Graph Data:
-{graph_data}
-
-Provide a clear, concise answer based on the graph data above. If the graph data doesn't contain the answer, say so explicitly.
-
-Answer:"""
-    
-    answer = llm.invoke(answer_prompt).content
-    return answer
-
+    return message_text(llm.invoke(_build_answer_prompt(question, graph_data)))
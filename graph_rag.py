@@ -1,53 +1,381 @@
-"""Main GraphRAG application."""
-from document_loader import load_and_split_documents
-from llm_setup import get_llm
-from graph_extraction import extract_graph_from_documents, analyze_graph_documents
-from graph_storage import store_knowledge_graph
-from graph_query import query_graph
-
-
-def main():
-    """Main execution function."""
-    # Load and split documents
-    texts = load_and_split_documents()
-    
-    # Initialize LLM
-    llm = get_llm()
-    
-    # Extract knowledge graph
-    graph_documents = extract_graph_from_documents(texts, llm)
-    
-    # Analyze extracted graph
-    total_nodes, total_relationships = analyze_graph_documents(graph_documents)
-    
-    # Check if extraction was successful
-    if total_nodes == 0 and total_relationships == 0:
-        print("\n❌ Cannot proceed without graph data. Exiting.")
-        return
-    
-    # Store knowledge graph in Neo4j
-    graph = store_knowledge_graph(graph_documents)
-    
-    # Setup query chain
-    print("Setting up query chain...")
-    
-    # Query examples
+"""Main GraphRAG application.
+
+Subcommands import only the stages they run, so ``query`` and ``stats`` start
+without loading the extraction stack.
+"""
+import time
+
+# Taken before any other import so startup time includes module loading
+_START = time.perf_counter()
+
+import argparse
+import sys
+
+from config import (
+    COMMUNITY_SUMMARIES_ENABLED,
+    ENTITY_INDEX_ENABLED,
+    ENTITY_RESOLUTION_ENABLED,
+    EXTRACTION_CACHE_ENABLED,
+    GRAPH_STORE,
+    GRAPH_STORE_PATH,
+    INCREMENTAL_INGEST,
+    INGEST_JOURNAL_BATCH_SIZE,
+    INGEST_JOURNAL_PATH,
+    INGEST_WORKERS,
+    INSTRUMENTATION_PROMETHEUS_PATH,
+    INSTRUMENTATION_REPORT_PATH,
+    INPUT_FILE,
+    QUERY_SERVER_HOST,
+    QUERY_SERVER_PORT,
+    QUERY_SERVER_MAX_CONCURRENCY,
+    QUERY_SERVER_MAX_QUEUE,
+    STREAMING_INGEST,
+)
+from instrumentation import metrics, set_instrumentation_enabled
+
+EXAMPLE_QUERIES = [
+    "When did Einstein make significant contribution in statistical mechanics?",
+    "When did he won the nobel prize?",
+    "Was Albert Einstein involved in Manhattan project?"
+]
+
+
+def report_startup(command: str) -> float:
+    """Print and record the time from launch until a subcommand is ready to work.
+
+    Args:
+        command: Name of the subcommand
+
+    Returns:
+        float: Startup time in seconds
+    """
+    seconds = time.perf_counter() - _START
+    metrics.observe("startup_seconds", seconds, command=command)
+    print(f"Startup ({command}): {seconds * 1000:.0f}ms")
+    return seconds
+
+
+def open_graph():
+    """Open the configured graph store without writing to it.
+
+    Returns:
+        Neo4jGraph | GraphStore: The shared Neo4j connection, or the in-memory
+        store loaded from ``GRAPH_STORE_PATH``
+    """
+    if GRAPH_STORE == "neo4j":
+        from graph_storage import create_neo4j_graph
+
+        return create_neo4j_graph()
+    from graph_store import InMemoryGraphStore
+
+    return InMemoryGraphStore(GRAPH_STORE_PATH)
+
+
+def ingest(llm, input_file: str = INPUT_FILE, workers: int = INGEST_WORKERS):
+    """Load, extract and store the input into the configured graph store.
+
+    Args:
+        llm: Language model used for extraction
+        input_file: File to ingest
+        workers: Extract through the job journal with this many worker
+            processes, or 0 for the configured ingestion mode
+
+    Returns:
+        Neo4jGraph | GraphStore: The graph that was written, or None if
+        nothing could be extracted
+    """
+    from document_loader import load_and_split_documents
+    from extraction_cache import ExtractionCache
+
+    cache = ExtractionCache() if EXTRACTION_CACHE_ENABLED else None
+
+    # Incremental and streaming ingestion keep their bookkeeping in Neo4j
+    use_neo4j = GRAPH_STORE == "neo4j"
+
+    if workers > 0:
+        from ingestion import ingest_with_journal
+
+        # Load and split documents
+        texts = load_and_split_documents(input_file)
+
+        # Extract through the resumable job journal, then store everything
+        if use_neo4j:
+            graph = ingest_with_journal(texts, llm, workers=workers)
+        else:
+            from graph_store import InMemoryGraphStore
+
+            graph = ingest_with_journal(texts, llm, graph=InMemoryGraphStore(), workers=workers)
+        if graph is None:
+            print("\n❌ Cannot proceed without graph data. Exiting.")
+            return None
+    elif STREAMING_INGEST and use_neo4j:
+        from ingestion import ingest_streaming
+
+        # Load, extract and store in overlapping stages with bounded memory
+        graph = ingest_streaming(input_file, llm, cache=cache)
+    elif INCREMENTAL_INGEST and use_neo4j:
+        from ingestion import ingest_incrementally
+
+        # Load and split documents
+        texts = load_and_split_documents(input_file)
+
+        # Extract and merge only new or changed chunks
+        graph = ingest_incrementally(texts, llm, cache=cache)
+    else:
+        from graph_extraction import extract_graph_from_documents, analyze_graph_documents
+        from graph_storage import store_knowledge_graph
+
+        # Load and split documents
+        texts = load_and_split_documents(input_file)
+
+        # Extract knowledge graph, reusing cached results for unchanged chunks
+        graph_documents = extract_graph_from_documents(texts, llm, cache=cache)
+
+        # Analyze extracted graph
+        total_nodes, total_relationships = analyze_graph_documents(graph_documents)
+
+        # Check if extraction was successful
+        if total_nodes == 0 and total_relationships == 0:
+            print("\n❌ Cannot proceed without graph data. Exiting.")
+            return None
+
+        # Merge name variants of the same entity
+        if ENTITY_RESOLUTION_ENABLED:
+            from entity_resolution import resolve_entities
+
+            graph_documents, _ = resolve_entities(graph_documents)
+
+        # Store knowledge graph in Neo4j, or in process and saved to disk
+        if use_neo4j:
+            graph = store_knowledge_graph(graph_documents)
+        else:
+            from graph_store import InMemoryGraphStore
+
+            graph = store_knowledge_graph(graph_documents, graph=InMemoryGraphStore())
+
+    # Summarize the communities whose membership changed
+    if COMMUNITY_SUMMARIES_ENABLED:
+        from communities import update_communities
+
+        update_communities(graph, llm)
+
+    if not use_neo4j:
+        graph.save(GRAPH_STORE_PATH)
+
+    # Vectorize the nodes added since the entity-linking index was last saved
+    if ENTITY_INDEX_ENABLED:
+        from entity_index import update_entity_index
+
+        update_entity_index(graph)
+
+    if cache is not None:
+        print(f"Extraction cache stats: {cache.stats()}")
+        cache.close()
+    return graph
+
+
+def ask(questions: list[str], graph, llm) -> None:
+    """Answer questions against the graph and print the answers.
+
+    Args:
+        questions: Questions to answer
+        graph: Neo4j graph instance or graph store
+        llm: Language model used for the query pipeline
+    """
+    from graph_query import query_graph_batch
+    from query_cache import QueryCache
+
     print("\n" + "="*50)
     print("Querying the knowledge graph...")
     print("="*50 + "\n")
-    
-    queries = [
-        "When did Einstein make significant contribution in statistical mechanics?",
-        "When did he won the nobel prize?",
-        "Was Albert Einstein involved in Manhattan project?"
-    ]
-    
-    for query in queries:
-        print(f"Query: {query}")
-        answer = query_graph(query, graph, llm)
-        print(f"Answer: {answer}\n")
+
+    results = query_graph_batch(questions, graph, llm, cache=QueryCache())
+    for question, result in zip(questions, results):
+        print(f"Query: {question}")
+        print(f"Answer: {result.answer}\n")
         print("-"*50 + "\n")
+    print("Stage timings: " + ", ".join(
+        f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in results[0].timings.items()
+    ))
+
+
+def show_stats(graph) -> None:
+    """Print the size and version of the graph.
+
+    Args:
+        graph: Neo4j graph instance or graph store
+    """
+    from graph_storage import as_graph_store
+
+    store = as_graph_store(graph)
+    counts = store.count()
+    by_label = store.count_by_label()
+    print(f"Graph store: {GRAPH_STORE}" + (f" ({GRAPH_STORE_PATH})" if GRAPH_STORE != "neo4j" else ""))
+    print(f"Nodes: {counts['nodes']}")
+    for label, count in sorted(by_label["labels"].items(), key=lambda item: (-item[1], item[0])):
+        print(f"  {label}: {count}")
+    print(f"Relationships: {counts['relationships']}")
+    for rel_type, count in sorted(by_label["types"].items(), key=lambda item: (-item[1], item[0])):
+        print(f"  {rel_type}: {count}")
+    print(f"Version: {store.get_version()}")
+
+
+def clear(graph, source: str = None) -> None:
+    """Clear the stored graph, or only what one source document contributed.
+
+    Args:
+        graph: Neo4j graph instance or graph store
+        source: Optional source document id to limit the clear to
+    """
+    from graph_storage import as_graph_store
+
+    store = as_graph_store(graph)
+    store.clear(source)
+    store.bump_version()
+    if GRAPH_STORE != "neo4j":
+        store.save(GRAPH_STORE_PATH)
+    if ENTITY_INDEX_ENABLED:
+        from entity_index import update_entity_index
+
+        update_entity_index(store)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """Run one subcommand, importing only what it needs.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        int: Process exit code
+    """
+    command = args.command or "run"
+
+    if command == "stats":
+        graph = open_graph()
+        report_startup(command)
+        show_stats(graph)
+        return 0
+
+    if command == "clear":
+        graph = open_graph()
+        report_startup(command)
+        clear(graph, args.source)
+        show_stats(graph)
+        return 0
+
+    if command == "jobs":
+        from job_journal import JobJournal, print_progress
+
+        journal = JobJournal(args.journal)
+        print(f"Job journal: {args.journal}")
+        print_progress(journal)
+        journal.close()
+        return 0
+
+    if command == "worker":
+        from ingestion import run_worker
+
+        report_startup(command)
+        report = run_worker(args.journal, args.name, batch_size=args.batch_size, quota_share=args.quota_share)
+        print(f"Worker finished: {report}")
+        return 0
+
+    from llm_setup import get_llm
+
+    llm = get_llm()
+
+    if command == "query":
+        graph = open_graph()
+        report_startup(command)
+        ask(args.questions or EXAMPLE_QUERIES, graph, llm)
+        return 0
+
+    if command == "serve":
+        import asyncio
+        from query_server import QueryServer
+
+        server = QueryServer(open_graph(), llm, args.concurrency, args.queue)
+        report_startup(command)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print(f"Query server stopped: {server.stats()}")
+        return 0
+
+    # ``ingest`` and the default full run both build the graph first
+    report_startup(command)
+    graph = ingest(
+        llm,
+        getattr(args, "input", None) or INPUT_FILE,
+        getattr(args, "workers", INGEST_WORKERS)
+    )
+    if graph is None:
+        return 1
+    if command == "run":
+        ask(EXAMPLE_QUERIES, graph, llm)
+    return 0
+
+
+def main(argv: list[str] = None) -> int:
+    """Parse the command line and run the chosen subcommand.
+
+    Without a subcommand, ingests the input file and answers the example questions.
+
+    Args:
+        argv: Command line arguments. Defaults to ``sys.argv[1:]``
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Build and query a knowledge graph")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record metrics and write them when the command finishes")
+    subparsers = parser.add_subparsers(dest="command")
+
+    ingest_parser = subparsers.add_parser("ingest", help="Extract the input into the graph store")
+    ingest_parser.add_argument("--input", help=f"File to ingest (default: {INPUT_FILE})")
+    ingest_parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                               help="Extract through the resumable job journal with this many processes")
+
+    worker_parser = subparsers.add_parser("worker", help="Extract jobs from a shared job journal")
+    worker_parser.add_argument("--journal", default=INGEST_JOURNAL_PATH, help="Job journal file")
+    worker_parser.add_argument("--name", help="Worker name (default: host name and process id)")
+    worker_parser.add_argument("--batch-size", type=int, default=INGEST_JOURNAL_BATCH_SIZE,
+                               help="Jobs claimed and committed at a time")
+    worker_parser.add_argument("--quota-share", type=int, default=1,
+                               help="Workers sharing the API quota; each gets 1/N of the rate limits")
+
+    jobs_parser = subparsers.add_parser("jobs", help="Show job journal progress and worker throughput")
+    jobs_parser.add_argument("--journal", default=INGEST_JOURNAL_PATH, help="Job journal file")
+
+    query_parser = subparsers.add_parser("query", help="Answer questions against the stored graph")
+    query_parser.add_argument("questions", nargs="*", help="Questions to answer (default: the examples)")
+
+    subparsers.add_parser("stats", help="Show the size and version of the stored graph")
+
+    clear_parser = subparsers.add_parser("clear", help="Delete the stored graph in bounded batches")
+    clear_parser.add_argument("--source", help="Only delete what this source document contributed")
+
+    serve_parser = subparsers.add_parser("serve", help="Answer questions sent as JSON lines over TCP")
+    serve_parser.add_argument("--host", default=QUERY_SERVER_HOST, help="Interface to listen on")
+    serve_parser.add_argument("--port", type=int, default=QUERY_SERVER_PORT, help="TCP port to listen on")
+    serve_parser.add_argument("--concurrency", type=int, default=QUERY_SERVER_MAX_CONCURRENCY,
+                              help="Questions answered at once")
+    serve_parser.add_argument("--queue", type=int, default=QUERY_SERVER_MAX_QUEUE,
+                              help="Questions allowed to wait before requests are rejected")
+
+    args = parser.parse_args(argv)
+    if args.metrics:
+        set_instrumentation_enabled(True)
+
+    exit_code = run_command(args)
+
+    if metrics.enabled:
+        metrics.write(INSTRUMENTATION_REPORT_PATH, INSTRUMENTATION_PROMETHEUS_PATH)
+        print(f"Metrics written to {INSTRUMENTATION_REPORT_PATH} and {INSTRUMENTATION_PROMETHEUS_PATH}")
+    return exit_code
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
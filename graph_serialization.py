@@ -0,0 +1,67 @@
+"""JSON-friendly serialization of graph documents."""
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+
+
+def _node_to_dict(node: Node) -> dict:
+    return {"id": node.id, "type": node.type, "properties": dict(node.properties or {})}
+
+
+def _node_from_dict(data: dict) -> Node:
+    return Node(id=data["id"], type=data["type"], properties=data.get("properties") or {})
+
+
+def graph_document_to_dict(graph_document: GraphDocument) -> dict:
+    """Convert a graph document to plain JSON-serializable data.
+
+    Args:
+        graph_document: Graph document to convert
+
+    Returns:
+        dict: Nodes, relationships and source document as plain data
+    """
+    source = graph_document.source
+    return {
+        "nodes": [_node_to_dict(node) for node in graph_document.nodes],
+        "relationships": [
+            {
+                "source": _node_to_dict(rel.source),
+                "target": _node_to_dict(rel.target),
+                "type": rel.type,
+                "properties": dict(rel.properties or {}),
+            }
+            for rel in graph_document.relationships
+        ],
+        "source": {
+            "page_content": source.page_content,
+            "metadata": dict(source.metadata),
+        } if source is not None else None,
+    }
+
+
+def graph_document_from_dict(data: dict) -> GraphDocument:
+    """Rebuild a graph document from data produced by ``graph_document_to_dict``.
+
+    Args:
+        data: Serialized graph document
+
+    Returns:
+        GraphDocument: The reconstructed graph document
+    """
+    source = data.get("source")
+    return GraphDocument(
+        nodes=[_node_from_dict(node) for node in data["nodes"]],
+        relationships=[
+            Relationship(
+                source=_node_from_dict(rel["source"]),
+                target=_node_from_dict(rel["target"]),
+                type=rel["type"],
+                properties=rel.get("properties") or {},
+            )
+            for rel in data["relationships"]
+        ],
+        source=Document(
+            page_content=source["page_content"],
+            metadata=source.get("metadata") or {},
+        ) if source is not None else Document(page_content=""),
+    )
@@ -1,41 +1,164 @@
 """Neo4j graph storage operations."""
-from langchain_neo4j import Neo4jGraph
-from langchain_community.graphs.graph_document import GraphDocument
-from config import NEO4J_URL, NEO4J_USERNAME, NEO4J_PASSWORD
+from __future__ import annotations
+
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+from config import (
+    ALLOWED_NODES,
+    BULK_DELETE_BATCH_SIZE,
+    BULK_WRITE_BATCH_SIZE,
+    BULK_WRITE_PARALLELISM,
+    BULK_WRITE_MAX_RETRIES,
+)
+from graph_store import GraphStore
+from instrumentation import metrics, span, traced
+from rate_limiting import backoff_delay
+
+if TYPE_CHECKING:
+    from langchain_neo4j import Neo4jGraph
+    from langchain_community.graphs.graph_document import GraphDocument
+
+# Bookkeeping labels for incremental ingestion; kept apart from entity labels
+CHUNK_LABEL = "__Chunk__"
+SOURCE_LABEL = "__Source__"
+
+# Holds the graph version counter that query caches are invalidated by
+META_LABEL = "__GraphMeta__"
+
+# Community summaries, kept across full rebuilds and searched by a fulltext index
+COMMUNITY_LABEL = "__Community__"
+COMMUNITY_INDEX_NAME = "community_summaries"
+
+# Labels and relationship types that are not part of the extracted graph
+BOOKKEEPING_LABELS = (CHUNK_LABEL, SOURCE_LABEL, META_LABEL, COMMUNITY_LABEL)
+BOOKKEEPING_RELATIONSHIPS = ("HAS_CHUNK", "MENTIONS")
+
+# Fulltext index over entity ids/names, used by graph_query for seed lookups
+ENTITY_INDEX_NAME = "entity_names"
+ENTITY_INDEX_PROPERTIES = ["id", "name"]
 
 
 def create_neo4j_graph() -> Neo4jGraph:
-    """Create and return a Neo4j graph connection.
+    """Return the process-wide Neo4j graph connection.
+    
+    Every call returns the same instance, so all callers share one driver
+    and its connection pool, and the schema is only loaded when needed.
     
     Returns:
-        Neo4jGraph: Configured Neo4j graph instance
+        Neo4jGraph: Shared Neo4j graph instance
     """
-    return Neo4jGraph(
-        url=NEO4J_URL,
-        username=NEO4J_USERNAME,
-        password=NEO4J_PASSWORD,
-        database="neo4j"
-    )
+    # Deferred: the Neo4j client is slow to import and the in-memory store skips it
+    from neo4j_connection import connections
+    
+    return connections.get()
+
+
+def _read_query(graph: Neo4jGraph, query: str, params: dict = None) -> list[dict]:
+    """Run a read-only statement, on a read replica when the connection routes reads."""
+    read_query = getattr(graph, "read_query", None)
+    if read_query is not None:
+        return read_query(query, params)
+    return graph.query(query, params or {})
+
+
+CLEAR_RELATIONSHIPS_QUERY = """
+MATCH ()-[r]->()
+WITH r LIMIT $batch_size
+DELETE r
+RETURN count(*) AS deleted
+"""
 
+CLEAR_NODES_QUERY = f"""
+MATCH (n) WHERE NOT n:{META_LABEL} AND NOT n:{COMMUNITY_LABEL}
+WITH n LIMIT $batch_size
+DETACH DELETE n
+RETURN count(*) AS deleted
+"""
 
-def clear_graph(graph: Neo4jGraph) -> None:
-    """Clear all nodes and relationships from the graph.
+
+def _delete_in_batches(graph: Neo4jGraph, query: str, what: str, batch_size: int) -> int:
+    """Run a bounded delete statement until it deletes nothing, printing progress."""
+    total = 0
+    start = time.perf_counter()
+    while True:
+        deleted = graph.query(query, {"batch_size": batch_size})[0]["deleted"]
+        if not deleted:
+            return total
+        total += deleted
+        elapsed = time.perf_counter() - start
+        print(f"  Deleted {total} {what} ({total / elapsed if elapsed > 0 else 0:.0f}/s)")
+
+
+def clear_graph(graph: Neo4jGraph, source: str = None, batch_size: int = BULK_DELETE_BATCH_SIZE) -> dict:
+    """Clear all nodes and relationships from the graph, in bounded transactions.
+    
+    Relationships are deleted first and nodes after, at most ``batch_size``
+    per transaction, so memory use and transaction time do not grow with the
+    graph. The graph version counter survives, so caches keyed by it stay
+    correct, and so do community summaries, which are reused while their
+    membership is unchanged.
+    
+    With ``source``, only what that source document contributed is removed,
+    using the chunk bookkeeping of ``bulk_write_graph_documents``: its chunks
+    are retracted batch by batch, then the source node is deleted.
     
     Args:
         graph: Neo4j graph instance
+        source: Optional source document id to limit the clear to
+        batch_size: Maximum relationships or nodes deleted per transaction
+        
+    Returns:
+        dict: Numbers of deleted ``relationships`` and ``nodes`` (retracted
+        ``chunks`` for a source), and ``seconds`` taken
+        
+    Raises:
+        Exception: Whatever stopped a batch; the graph is then partly
+        cleared, so nothing must be written onto it before clearing again
     """
+    start = time.perf_counter()
+    stats = {}
     try:
-        graph.query("MATCH (n) DETACH DELETE n")
-        print("Cleared existing Neo4j data")
-    except Exception as e:
-        print(f"Note: {e}")
+        if source is None:
+            stats["relationships"] = _delete_in_batches(
+                graph, CLEAR_RELATIONSHIPS_QUERY, "relationships", batch_size
+            )
+            stats["nodes"] = _delete_in_batches(graph, CLEAR_NODES_QUERY, "nodes", batch_size)
+            print("Cleared existing Neo4j data")
+        else:
+            chunk_ids = [
+                record["id"] for record in _read_query(
+                    graph,
+                    f"MATCH (:{SOURCE_LABEL} {{id: $source}})-[:HAS_CHUNK]->(c:{CHUNK_LABEL}) RETURN c.id AS id",
+                    {"source": source}
+                )
+            ]
+            if not chunk_ids:
+                print(f"Nothing to clear for source {source}")
+            # Chunks fan out to many entities, so retract fewer per transaction
+            chunk_batch = max(1, batch_size // 20)
+            for offset in range(0, len(chunk_ids), chunk_batch):
+                retract_chunks(graph, chunk_ids[offset:offset + chunk_batch], chunk_batch)
+                print(f"  Retracted {min(offset + chunk_batch, len(chunk_ids))}/{len(chunk_ids)} chunks")
+            update_source_fingerprints(graph, {}, [source])
+            stats["chunks"] = len(chunk_ids)
+            if chunk_ids:
+                print(f"Cleared source {source}")
+    except Exception:
+        print("Clearing failed part way; the graph is partly cleared")
+        raise
+    stats["seconds"] = time.perf_counter() - start
+    return stats
 
 
-def store_graph_documents(graph: Neo4jGraph, graph_documents: list[GraphDocument]) -> None:
-    """Store graph documents in Neo4j.
+def store_graph_documents(graph: Neo4jGraph | GraphStore, graph_documents: list[GraphDocument]) -> None:
+    """Store graph documents in Neo4j or another graph store.
     
     Args:
-        graph: Neo4j graph instance
+        graph: Neo4j graph instance or graph store
         graph_documents: List of graph documents to store
     """
     if not graph_documents:
@@ -44,8 +167,11 @@ def store_graph_documents(graph: Neo4jGraph, graph_documents: list[GraphDocument
     
     print(f"\nAdding {len(graph_documents)} graph documents to Neo4j...")
     try:
-        graph.add_graph_documents(graph_documents)
-        print("Knowledge graph stored in Neo4j")
+        stats = as_graph_store(graph).upsert(graph_documents)
+        if stats["failed_batches"]:
+            print(f"WARNING: {stats['failed_batches']} write batches failed")
+        else:
+            print("Knowledge graph stored")
     except Exception as e:
         print(f"ERROR adding graph documents: {e}")
         print(f"Error type: {type(e)}")
@@ -53,47 +179,911 @@ def store_graph_documents(graph: Neo4jGraph, graph_documents: list[GraphDocument
         traceback.print_exc()
 
 
-def verify_graph_storage(graph: Neo4jGraph) -> None:
-    """Verify that the graph was stored correctly.
+def _quote_identifier(name: str) -> str:
+    """Quote a label or relationship type for safe use in Cypher."""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+CHUNK_WRITE_QUERY = f"""
+UNWIND $rows AS row
+MERGE (s:{SOURCE_LABEL} {{id: row.source}})
+MERGE (c:{CHUNK_LABEL} {{id: row.chunk}})
+SET c.source = row.source, c.index = row.index
+MERGE (s)-[:HAS_CHUNK]->(c)
+"""
+
+
+def _node_write_query(label: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MERGE (n:{_quote_identifier(label)} {{id: row.id}})
+    SET n += row.properties
+    WITH n, row WHERE row.chunk IS NOT NULL
+    MATCH (c:{CHUNK_LABEL} {{id: row.chunk}})
+    MERGE (c)-[:MENTIONS]->(n)
+    """
+
+
+def _relationship_write_query(source_label: str, rel_type: str, target_label: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MATCH (s:{_quote_identifier(source_label)} {{id: row.source}})
+    MATCH (t:{_quote_identifier(target_label)} {{id: row.target}})
+    MERGE (s)-[r:{_quote_identifier(rel_type)}]->(t)
+    SET r += row.properties
+    WITH r, row WHERE row.chunk IS NOT NULL
+      AND NOT row.chunk IN coalesce(r.chunks, [])
+    SET r.chunks = coalesce(r.chunks, []) + row.chunk
+    """
+
+
+def _group_rows(graph_documents: list[GraphDocument]) -> tuple[list, dict, dict]:
+    """Flatten graph documents into write rows grouped by label and type.
+    
+    Returns:
+        tuple[list, dict, dict]: Chunk rows, node rows keyed by label and
+        relationship rows keyed by (source label, type, target label)
+    """
+    chunk_rows = []
+    node_rows = defaultdict(dict)
+    rel_rows = defaultdict(list)
+    
+    for doc in graph_documents:
+        metadata = doc.source.metadata if doc.source is not None else {}
+        chunk_id = metadata.get("chunk_id")
+        if chunk_id is not None:
+            chunk_rows.append({
+                "chunk": chunk_id,
+                "source": str(metadata.get("source", "")),
+                "index": metadata.get("chunk_index"),
+            })
+        nodes = list(doc.nodes)
+        for rel in doc.relationships:
+            nodes.extend([rel.source, rel.target])
+        for node in nodes:
+            row = node_rows[node.type].setdefault((node.id, chunk_id), {
+                "id": node.id,
+                "properties": {},
+                "chunk": chunk_id,
+            })
+            row["properties"].update(node.properties or {})
+        for rel in doc.relationships:
+            rel_rows[(rel.source.type, rel.type, rel.target.type)].append({
+                "source": rel.source.id,
+                "target": rel.target.id,
+                "properties": dict(rel.properties or {}),
+                "chunk": chunk_id,
+            })
+    
+    return (
+        chunk_rows,
+        {label: list(rows.values()) for label, rows in node_rows.items()},
+        dict(rel_rows),
+    )
+
+
+def _make_batches(query: str, rows: list[dict], key, batch_size: int) -> list[tuple[str, list[dict]]]:
+    """Split rows into batches, keeping rows with the same key in one batch.
+    
+    Rows that MERGE the same node or relationship must not be written by two
+    transactions running in parallel, or MERGE may create duplicates.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[key(row)].append(row)
+    batches = []
+    current = []
+    for group in groups.values():
+        if current and len(current) + len(group) > batch_size:
+            batches.append((query, current))
+            current = []
+        current.extend(group)
+    if current:
+        batches.append((query, current))
+    return batches
+
+
+def _write_batch(graph: Neo4jGraph, query: str, rows: list[dict], max_retries: int) -> None:
+    """Write one batch in its own transaction, retrying it on failure."""
+    for attempt in range(max_retries + 1):
+        try:
+            with span("storage_batch", rows=len(rows), attempt=attempt):
+                graph.query(query, {"rows": rows})
+            return
+        except Exception:
+            if attempt == max_retries:
+                raise
+            metrics.inc("storage_retries")
+            time.sleep(backoff_delay(attempt, base=0.5, cap=10.0))
+
+
+def _run_batches(
+    graph: Neo4jGraph,
+    batches: list[tuple[str, list[dict]]],
+    parallelism: int,
+    max_retries: int
+) -> list[tuple[int, str]]:
+    """Run write batches, optionally in parallel, and return the failures."""
+    failures = []
+    if parallelism <= 1:
+        for query, rows in batches:
+            try:
+                _write_batch(graph, query, rows, max_retries)
+            except Exception as e:
+                failures.append((len(rows), f"{type(e).__name__}: {e}"))
+        return failures
+    
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = {
+            executor.submit(_write_batch, graph, query, rows, max_retries): len(rows)
+            for query, rows in batches
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failures.append((futures[future], f"{type(e).__name__}: {e}"))
+    return failures
+
+
+@traced("bulk_write")
+def bulk_write_graph_documents(
+    graph: Neo4jGraph,
+    graph_documents: list[GraphDocument],
+    batch_size: int = BULK_WRITE_BATCH_SIZE,
+    parallelism: int = BULK_WRITE_PARALLELISM,
+    max_retries: int = BULK_WRITE_MAX_RETRIES
+) -> dict:
+    """MERGE graph documents into Neo4j with batched, parameterized UNWIND writes.
+    
+    Nodes are written per label and relationships per (source label, type,
+    target label), each in batches of at most ``batch_size`` rows with one
+    transaction per batch. Nodes are written before relationships. A failed
+    batch is retried on its own and, if it keeps failing, reported without
+    affecting the other batches.
+    
+    Documents whose source metadata carries a ``chunk_id`` get a chunk node
+    that MENTIONS every entity they contributed, and each relationship keeps
+    the ids of the chunks that produced it in its ``chunks`` property. This is
+    what allows ``retract_chunks`` to remove a chunk's contribution later.
+    
+    Args:
+        graph: Neo4j graph instance
+        graph_documents: Graph documents to write
+        batch_size: Maximum rows per write transaction
+        parallelism: Number of write transactions run in parallel
+        max_retries: Retries per failed batch
+        
+    Returns:
+        dict: Rows written, elapsed seconds, rows per second and failed batches
+    """
+    chunk_rows, node_rows, rel_rows = _group_rows(graph_documents)
+    
+    phases = [
+        _make_batches(CHUNK_WRITE_QUERY, chunk_rows, lambda row: row["chunk"], batch_size),
+        [
+            batch
+            for label, rows in node_rows.items()
+            for batch in _make_batches(_node_write_query(label), rows, lambda row: row["id"], batch_size)
+        ],
+        [
+            batch
+            for key, rows in rel_rows.items()
+            for batch in _make_batches(
+                _relationship_write_query(*key),
+                rows,
+                lambda row: (row["source"], row["target"]),
+                batch_size
+            )
+        ],
+    ]
+    
+    total_rows = sum(len(rows) for batches in phases for _, rows in batches)
+    failures = []
+    start = time.perf_counter()
+    for batches in phases:
+        failures.extend(_run_batches(graph, batches, parallelism, max_retries))
+    elapsed = time.perf_counter() - start
+    
+    failed_rows = sum(rows for rows, _ in failures)
+    written = total_rows - failed_rows
+    metrics.inc("storage_rows", written)
+    metrics.inc("storage_failed_batches", len(failures))
+    stats = {
+        "rows": written,
+        "failed_rows": failed_rows,
+        "failed_batches": len(failures),
+        "seconds": elapsed,
+        "rows_per_second": written / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"  Wrote {written} rows in {elapsed:.2f}s ({stats['rows_per_second']:.0f} rows/s)")
+    for rows, error in failures[:5]:
+        print(f"  ERROR: batch of {rows} rows failed: {error}")
+    return stats
+
+
+def get_ingested_sources(graph: Neo4jGraph) -> dict[str, dict]:
+    """Read the source and chunk fingerprints recorded by incremental ingestion.
     
     Args:
         graph: Neo4j graph instance
+        
+    Returns:
+        dict[str, dict]: Source id mapped to its ``fingerprint`` and set of ``chunks``
     """
+    records = _read_query(
+        graph,
+        f"""
+        MATCH (s:{SOURCE_LABEL})
+        OPTIONAL MATCH (s)-[:HAS_CHUNK]->(c:{CHUNK_LABEL})
+        RETURN s.id AS source, s.fingerprint AS fingerprint, collect(c.id) AS chunks
+        """
+    )
+    return {
+        record["source"]: {"fingerprint": record["fingerprint"], "chunks": set(record["chunks"])}
+        for record in records
+    }
+
+
+def retract_chunks(graph: Neo4jGraph, chunk_ids: list[str], batch_size: int = 500) -> None:
+    """Remove everything contributed only by the given chunks.
+    
+    Each chunk id is dropped from the relationships it produced, and
+    relationships left without any chunk are deleted. The chunk nodes are then
+    deleted along with entities no remaining chunk mentions. Every batch runs
+    in its own transaction, so the rest of the graph stays queryable.
+    
+    Args:
+        graph: Neo4j graph instance
+        chunk_ids: Ids of the chunks to retract
+        batch_size: Number of chunks retracted per transaction
+    """
+    for start in range(0, len(chunk_ids), batch_size):
+        graph.query(
+            f"""
+            UNWIND $chunk_ids AS chunk_id
+            CALL {{
+                WITH chunk_id
+                MATCH (:{CHUNK_LABEL} {{id: chunk_id}})-[:MENTIONS]->()-[r]->()
+                WHERE chunk_id IN coalesce(r.chunks, [])
+                SET r.chunks = [x IN r.chunks WHERE x <> chunk_id]
+                WITH r WHERE size(r.chunks) = 0
+                DELETE r
+            }}
+            CALL {{
+                WITH chunk_id
+                MATCH (c:{CHUNK_LABEL} {{id: chunk_id}})
+                OPTIONAL MATCH (c)-[:MENTIONS]->(e)
+                DETACH DELETE c
+                WITH DISTINCT e
+                WHERE e IS NOT NULL AND NOT (e)<-[:MENTIONS]-(:{CHUNK_LABEL})
+                DETACH DELETE e
+            }}
+            RETURN count(*) AS retracted
+            """,
+            {"chunk_ids": chunk_ids[start:start + batch_size]}
+        )
+
+
+def mark_chunks_seen(graph: Neo4jGraph, chunk_ids: list[str], run_id: str) -> set[str]:
+    """Mark already ingested chunks as seen by a streaming run.
+    
+    Args:
+        graph: Neo4j graph instance
+        chunk_ids: Ids of chunks read in this run
+        run_id: Identifier of the streaming run
+        
+    Returns:
+        set[str]: The ids among ``chunk_ids`` that are already in the graph
+    """
+    records = graph.query(
+        f"""
+        UNWIND $chunk_ids AS chunk_id
+        MATCH (c:{CHUNK_LABEL} {{id: chunk_id}})
+        SET c.seen = $run_id
+        RETURN c.id AS id
+        """,
+        {"chunk_ids": chunk_ids, "run_id": run_id}
+    )
+    return {record["id"] for record in records}
+
+
+def get_unseen_chunks(
+    graph: Neo4jGraph,
+    sources: list[str],
+    run_id: str,
+    prune_missing_sources: bool = True
+) -> tuple[list[str], list[str]]:
+    """Find what a streaming run did not see and should retract.
+    
+    Args:
+        graph: Neo4j graph instance
+        sources: Source ids read in the run
+        run_id: Identifier of the streaming run
+        prune_missing_sources: Also report sources the run did not read at all
+        
+    Returns:
+        tuple[list[str], list[str]]: Stale chunk ids and removed source ids
+    """
+    records = _read_query(
+        graph,
+        f"""
+        MATCH (s:{SOURCE_LABEL})-[:HAS_CHUNK]->(c:{CHUNK_LABEL})
+        WHERE (s.id IN $sources OR $prune) AND coalesce(c.seen, '') <> $run_id
+        RETURN c.id AS id
+        """,
+        {"sources": sources, "run_id": run_id, "prune": prune_missing_sources}
+    )
+    removed_sources = []
+    if prune_missing_sources:
+        removed_sources = [
+            record["id"] for record in _read_query(
+                graph,
+                f"MATCH (s:{SOURCE_LABEL}) WHERE NOT s.id IN $sources RETURN s.id AS id",
+                {"sources": sources}
+            )
+        ]
+    return [record["id"] for record in records], removed_sources
+
+
+def update_source_fingerprints(
+    graph: Neo4jGraph,
+    fingerprints: dict[str, str],
+    removed_sources: list[str] = None
+) -> None:
+    """Record source document fingerprints and drop sources no longer ingested.
+    
+    Args:
+        graph: Neo4j graph instance
+        fingerprints: Source id mapped to its current fingerprint
+        removed_sources: Source ids whose chunks have all been retracted
+    """
+    if fingerprints:
+        graph.query(
+            f"""
+            UNWIND $rows AS row
+            MERGE (s:{SOURCE_LABEL} {{id: row.source}})
+            SET s.fingerprint = row.fingerprint
+            """,
+            {"rows": [{"source": k, "fingerprint": v} for k, v in fingerprints.items()]}
+        )
+    if removed_sources:
+        graph.query(
+            f"""
+            UNWIND $sources AS source
+            MATCH (s:{SOURCE_LABEL} {{id: source}})
+            DETACH DELETE s
+            """,
+            {"sources": removed_sources}
+        )
+
+
+def _constraint_name(label: str) -> str:
+    return "unique_" + "".join(c if c.isalnum() else "_" for c in label.lower()) + "_id"
+
+
+def ensure_indexes(graph: Neo4jGraph, labels: list[str] = None) -> None:
+    """Create the constraints and fulltext index that entity lookups rely on.
+    
+    Every entity label gets a uniqueness constraint on ``id`` (which also backs
+    MERGE with an index), and all entity labels share one fulltext index over
+    ids and names. The fulltext index is recreated when the label set changes.
+    
+    Args:
+        graph: Neo4j graph instance
+        labels: Entity labels to index. Defaults to config.ALLOWED_NODES
+    """
+    if labels is None:
+        labels = ALLOWED_NODES
+    
+    for label in [*labels, CHUNK_LABEL, SOURCE_LABEL, COMMUNITY_LABEL]:
+        try:
+            graph.query(
+                f"CREATE CONSTRAINT {_constraint_name(label)} IF NOT EXISTS "
+                f"FOR (n:{_quote_identifier(label)}) REQUIRE n.id IS UNIQUE"
+            )
+        except Exception as e:
+            print(f"Note: Could not create constraint for {label}: {e}")
+    
     try:
-        # Count nodes and relationships
-        node_result = graph.query("MATCH (n) RETURN count(n) as count")
-        rel_result = graph.query("MATCH ()-[r]->() RETURN count(r) as count")
-        print(f"\nVerification:")
-        print(f"  Nodes in graph: {node_result}")
-        print(f"  Relationships in graph: {rel_result}")
+        existing = graph.query(
+            "SHOW FULLTEXT INDEXES YIELD name, labelsOrTypes, properties "
+            "WHERE name = $name RETURN labelsOrTypes, properties",
+            {"name": ENTITY_INDEX_NAME}
+        )
+        if existing and (
+            set(existing[0]["labelsOrTypes"]) != set(labels)
+            or set(existing[0]["properties"]) != set(ENTITY_INDEX_PROPERTIES)
+        ):
+            graph.query(f"DROP INDEX {ENTITY_INDEX_NAME} IF EXISTS")
+            existing = []
+        if not existing:
+            label_expr = "|".join(_quote_identifier(label) for label in labels)
+            property_expr = ", ".join(f"n.{prop}" for prop in ENTITY_INDEX_PROPERTIES)
+            graph.query(
+                f"CREATE FULLTEXT INDEX {ENTITY_INDEX_NAME} IF NOT EXISTS "
+                f"FOR (n:{label_expr}) ON EACH [{property_expr}]"
+            )
+            print(f"Created fulltext index {ENTITY_INDEX_NAME} on {len(labels)} labels")
+    except Exception as e:
+        print(f"Note: Could not create fulltext index: {e}")
+    
+    try:
+        graph.query(
+            f"CREATE FULLTEXT INDEX {COMMUNITY_INDEX_NAME} IF NOT EXISTS "
+            f"FOR (n:{COMMUNITY_LABEL}) ON EACH [n.title, n.summary, n.member_names]"
+        )
+    except Exception as e:
+        print(f"Note: Could not create community index: {e}")
+
+
+def bump_graph_version(graph: Neo4jGraph) -> int:
+    """Increment the graph version counter after a write.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        int: The new graph version
+    """
+    result = graph.query(
+        f"""
+        MERGE (m:{META_LABEL} {{id: 'graph'}})
+        SET m.version = coalesce(m.version, 0) + 1
+        RETURN m.version AS version
+        """
+    )
+    return result[0]["version"]
+
+
+def get_graph_version(graph: Neo4jGraph) -> int:
+    """Read the graph version counter.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        int: The current graph version, 0 if the graph was never written
+    """
+    result = _read_query(graph, f"MATCH (m:{META_LABEL} {{id: 'graph'}}) RETURN m.version AS version")
+    return (result[0]["version"] or 0) if result else 0
+
+
+def get_edge_list(graph: Neo4jGraph) -> list[tuple[str, str, str]]:
+    """Read every entity relationship, leaving out ingestion bookkeeping.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        list[tuple[str, str, str]]: (source id, type, target id) tuples
+    """
+    records = _read_query(
+        graph,
+        f"""
+        MATCH (a)-[r]->(b)
+        WHERE NOT a:{CHUNK_LABEL} AND NOT a:{SOURCE_LABEL}
+        RETURN a.id AS source, type(r) AS type, b.id AS target
+        """
+    )
+    return [(record["source"], record["type"], record["target"]) for record in records]
+
+
+def get_node_keys(graph: Neo4jGraph) -> list[tuple[str, str]]:
+    """Read the label and id of every entity node, leaving out bookkeeping nodes.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        list[tuple[str, str]]: (label, id) tuples
+    """
+    records = _read_query(
+        graph,
+        f"""
+        MATCH (n)
+        WHERE n.id IS NOT NULL AND NOT n:{CHUNK_LABEL} AND NOT n:{SOURCE_LABEL}
+            AND NOT n:{META_LABEL} AND NOT n:{COMMUNITY_LABEL}
+        RETURN labels(n)[0] AS label, n.id AS id
+        """
+    )
+    return [(record["label"], str(record["id"])) for record in records]
+
+
+def get_counts_by_label(graph: Neo4jGraph) -> dict[str, dict[str, int]]:
+    """Read node counts per label and relationship counts per type.
+    
+    Every count is a single-label or single-type aggregation that Neo4j
+    answers from its count store, so this takes the same time whatever the
+    size of the graph.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        dict[str, dict[str, int]]: ``labels`` and ``types``, each mapping a
+        name to its count; names without any nodes or relationships are left out
+    """
+    labels = [record["label"] for record in _read_query(graph, "CALL db.labels() YIELD label RETURN label")]
+    types = [
+        record["type"] for record in _read_query(
+            graph, "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType AS type"
+        )
+    ]
+    counts = {"labels": {}, "types": {}}
+    parts = [
+        f"MATCH (n:{_quote_identifier(label)}) WITH count(n) AS total "
+        f"RETURN 'labels' AS kind, $name{i} AS name, total"
+        for i, label in enumerate(labels)
+    ] + [
+        f"MATCH ()-[r:{_quote_identifier(rel_type)}]->() WITH count(r) AS total "
+        f"RETURN 'types' AS kind, $name{len(labels) + i} AS name, total"
+        for i, rel_type in enumerate(types)
+    ]
+    if parts:
+        params = {f"name{i}": name for i, name in enumerate([*labels, *types])}
+        for record in _read_query(graph, "\nUNION ALL\n".join(parts), params):
+            if record["total"]:
+                counts[record["kind"]][record["name"]] = record["total"]
+    return counts
+
+
+def get_communities(graph: Neo4jGraph) -> dict[str, dict]:
+    """Read the stored community summaries.
+    
+    Args:
+        graph: Neo4j graph instance
+        
+    Returns:
+        dict[str, dict]: Community id mapped to its summary row
+    """
+    records = _read_query(
+        graph,
+        f"MATCH (c:{COMMUNITY_LABEL}) RETURN c {{.id, .title, .summary, .size, .members}} AS community"
+    )
+    return {record["community"]["id"]: record["community"] for record in records}
+
+
+def save_communities(graph: Neo4jGraph, communities: list[dict], removed: list[str] = ()) -> None:
+    """Store new community summaries and delete the ones no longer present.
+    
+    Args:
+        graph: Neo4j graph instance
+        communities: Rows with ``id``, ``title``, ``summary``, ``size`` and ``members``
+        removed: Ids of communities to delete
+    """
+    if removed:
+        graph.query(
+            f"UNWIND $ids AS id MATCH (c:{COMMUNITY_LABEL} {{id: id}}) DETACH DELETE c",
+            {"ids": list(removed)}
+        )
+    if communities:
+        graph.query(
+            f"""
+            UNWIND $rows AS row
+            MERGE (c:{COMMUNITY_LABEL} {{id: row.id}})
+            SET c.title = row.title, c.summary = row.summary,
+                c.size = row.size, c.members = row.members,
+                c.member_names = reduce(names = '', member IN row.members | names + ' ' + member)
+            """,
+            {"rows": communities}
+        )
+
+
+def _escape_lucene(term: str) -> str:
+    """Escape Lucene query syntax so a term is matched literally."""
+    return re.sub(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)', r"\\\1", term)
+
+
+def _lucene_query(term: str) -> str:
+    """Build a fulltext query requiring every word of a term as a prefix."""
+    words = re.findall(r"\w+", term.lower())
+    return " AND ".join(_escape_lucene(word) + "*" for word in words)
+
+
+ENTITY_SEARCH_QUERY = f"""
+UNWIND $terms AS term
+CALL {{
+    WITH term
+    CALL db.index.fulltext.queryNodes($index, term.query) YIELD node, score
+    RETURN node
+    ORDER BY score DESC
+    LIMIT $seed_limit
+}}
+MATCH (node)-[r]-(m)
+WHERE NOT m:{CHUNK_LABEL}
+WITH r, count(DISTINCT term.term) AS hits
+ORDER BY hits DESC
+LIMIT $limit
+RETURN startNode(r) AS n, r, endNode(r) AS m, hits
+"""
+
+# Same lookup, but returns the triples of each term separately
+TERM_SEARCH_QUERY = f"""
+UNWIND $terms AS term
+CALL {{
+    WITH term
+    CALL db.index.fulltext.queryNodes($index, term.query) YIELD node, score
+    RETURN node
+    ORDER BY score DESC
+    LIMIT $seed_limit
+}}
+MATCH (node)-[r]-(m)
+WHERE NOT m:{CHUNK_LABEL}
+WITH term.term AS term, collect(DISTINCT r)[..$limit] AS rels
+UNWIND rels AS r
+RETURN term, startNode(r) AS n, r, endNode(r) AS m
+"""
+
+COMMUNITY_SEARCH_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+RETURN node {.id, .title, .summary, .size, .members} AS community
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+LARGEST_COMMUNITIES_QUERY = f"""
+MATCH (c:{COMMUNITY_LABEL})
+RETURN c {{.id, .title, .summary, .size, .members}} AS community
+ORDER BY c.size DESC, c.id
+LIMIT $limit
+"""
+
+# Used for graphs stored before the fulltext index existed
+SCAN_SEARCH_QUERY = """
+MATCH (n)-[r]->(m)
+WITH n, r, m, [term IN $terms WHERE
+    any(prop IN keys(n) WHERE toLower(toString(n[prop])) CONTAINS term)
+    OR any(prop IN keys(m) WHERE toLower(toString(m[prop])) CONTAINS term)] AS matched
+WHERE size(matched) > 0
+RETURN n, r, m, size(matched) AS hits
+ORDER BY hits DESC
+LIMIT $limit
+"""
+
+
+class Neo4jGraphStore:
+    """Graph store backed by Neo4j through ``Neo4jGraph``.
+    
+    Args:
+        graph: Optional Neo4j graph instance. Defaults to a new connection
+    """
+    
+    def __init__(self, graph: Neo4jGraph = None):
+        self.graph = graph if graph is not None else create_neo4j_graph()
+    
+    def upsert(self, graph_documents: list[GraphDocument]) -> dict:
+        """MERGE graph documents with batched UNWIND writes."""
+        return bulk_write_graph_documents(self.graph, graph_documents)
+    
+    def clear(self, source: str = None) -> None:
+        """Remove all nodes and relationships, or what one source contributed, in batches."""
+        clear_graph(self.graph, source)
+    
+    def ensure_indexes(self) -> None:
+        """Create the entity constraints and fulltext index."""
+        ensure_indexes(self.graph)
+    
+    def count(self) -> dict[str, int]:
+        """Return the number of entity ``nodes`` and ``relationships``.
         
-        # Show some sample nodes to see what was stored
-        sample_nodes = graph.query("MATCH (n) RETURN n LIMIT 3")
-        print(f"  Sample nodes: {sample_nodes}\n")
+        Bookkeeping nodes and their relationships are subtracted from the
+        totals, so the counts match the in-memory store's. Every term is a
+        count-store aggregation.
+        """
+        parts = ["MATCH (n) WITH count(n) AS total RETURN 'nodes' AS kind, 1 AS sign, total"]
+        parts += [
+            f"MATCH (n:{label}) WITH count(n) AS total RETURN 'nodes' AS kind, -1 AS sign, total"
+            for label in BOOKKEEPING_LABELS
+        ]
+        parts.append("MATCH ()-[r]->() WITH count(r) AS total RETURN 'relationships' AS kind, 1 AS sign, total")
+        parts += [
+            f"MATCH ()-[r:{rel_type}]->() WITH count(r) AS total "
+            "RETURN 'relationships' AS kind, -1 AS sign, total"
+            for rel_type in BOOKKEEPING_RELATIONSHIPS
+        ]
+        counts = {"nodes": 0, "relationships": 0}
+        for record in _read_query(self.graph, "\nUNION ALL\n".join(parts)):
+            counts[record["kind"]] += record["sign"] * record["total"]
+        return counts
+    
+    def count_by_label(self) -> dict[str, dict[str, int]]:
+        """Return node counts per label and relationship counts per type from the count store."""
+        return get_counts_by_label(self.graph)
+    
+    def search_terms(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> list[dict]:
+        """Look up all terms in the fulltext index in one round trip.
+        
+        Each term's best matching nodes are expanded to their neighbors, and
+        the triples are deduplicated on the server and ranked by how many terms
+        hit them. Falls back to a property scan if the index is missing.
+        
+        Args:
+            terms: Lowercased keywords or entity names
+            seed_limit: Maximum number of index hits expanded per term
+            limit: Maximum number of triples returned
+            
+        Returns:
+            list[dict]: Triples with ``n``, ``r``, ``m`` and ``hits``
+        """
+        try:
+            return _read_query(
+                self.graph,
+                ENTITY_SEARCH_QUERY,
+                {
+                    "terms": [{"term": term, "query": _lucene_query(term)} for term in terms],
+                    "index": ENTITY_INDEX_NAME,
+                    "seed_limit": seed_limit,
+                    "limit": limit,
+                }
+            )
+        except Exception:
+            try:
+                return _read_query(self.graph, SCAN_SEARCH_QUERY, {"terms": terms, "limit": limit})
+            except Exception:
+                return []
+    
+    def search_each_term(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> dict[str, list]:
+        """Look up the triples of each term separately, in one round trip.
+        
+        Args:
+            terms: Lowercased keywords or entity names
+            seed_limit: Maximum number of index hits expanded per term
+            limit: Maximum number of triples returned per term
+            
+        Returns:
+            dict[str, list]: Each term mapped to its triples
+        """
+        per_term = {term: [] for term in terms}
+        try:
+            records = _read_query(
+                self.graph,
+                TERM_SEARCH_QUERY,
+                {
+                    "terms": [{"term": term, "query": _lucene_query(term)} for term in terms],
+                    "index": ENTITY_INDEX_NAME,
+                    "seed_limit": seed_limit,
+                    "limit": limit,
+                }
+            )
+            for record in records:
+                per_term[record["term"]].append(
+                    {"n": record["n"], "r": record["r"], "m": record["m"], "hits": 1}
+                )
+        except Exception:
+            for term in terms:
+                per_term[term] = self.search_terms([term], seed_limit, limit)
+        return per_term
+    
+    def sample(self, limit: int = 20) -> list[dict]:
+        """Return an arbitrary slice of triples."""
+        try:
+            return _read_query(
+                self.graph, "MATCH (n)-[r]-(m) RETURN n, r, m LIMIT $limit", {"limit": limit}
+            ) or []
+        except Exception:
+            return []
+    
+    def get_version(self) -> int:
+        """Return the graph version counter."""
+        return get_graph_version(self.graph)
+    
+    def bump_version(self) -> int:
+        """Increment and return the graph version counter."""
+        return bump_graph_version(self.graph)
+    
+    def edge_list(self) -> list[tuple[str, str, str]]:
+        """Return every entity relationship as a (source id, type, target id) tuple."""
+        return get_edge_list(self.graph)
+    
+    def node_keys(self) -> list[tuple[str, str]]:
+        """Return the (label, id) of every entity node."""
+        return get_node_keys(self.graph)
+    
+    def get_communities(self) -> dict[str, dict]:
+        """Return the stored community summaries by id."""
+        return get_communities(self.graph)
+    
+    def save_communities(self, communities: list[dict], removed: list[str] = ()) -> None:
+        """Store new community summaries and drop the ones in ``removed``."""
+        save_communities(self.graph, communities, removed)
+    
+    def search_communities(self, terms: list[str], limit: int = 5) -> list[dict]:
+        """Look up summaries in the fulltext index, or return the largest communities."""
+        query = " OR ".join(f"({_lucene_query(term)})" for term in terms if _lucene_query(term))
+        records = []
+        if query:
+            try:
+                records = _read_query(
+                    self.graph,
+                    COMMUNITY_SEARCH_QUERY,
+                    {"index": COMMUNITY_INDEX_NAME, "query": query, "limit": limit}
+                )
+            except Exception:
+                records = []
+        if not records:
+            records = _read_query(self.graph, LARGEST_COMMUNITIES_QUERY, {"limit": limit})
+        return [record["community"] for record in records]
+
+
+def as_graph_store(graph: Neo4jGraph | GraphStore) -> GraphStore:
+    """Wrap a ``Neo4jGraph`` in a graph store; return graph stores unchanged.
+    
+    Args:
+        graph: Neo4j graph instance or graph store
+        
+    Returns:
+        GraphStore: The graph store to use
+    """
+    if isinstance(graph, GraphStore):
+        return graph
+    return Neo4jGraphStore(graph)
+
+
+def _format_counts(counts: dict[str, int], limit: int = 10) -> str:
+    """Render the largest counts as ``name=count`` pairs."""
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    text = ", ".join(f"{name}={count}" for name, count in ranked[:limit])
+    if len(ranked) > limit:
+        text += f", ... ({len(ranked) - limit} more)"
+    return text or "none"
+
+
+def verify_graph_storage(graph: Neo4jGraph | GraphStore) -> None:
+    """Verify that the graph was stored correctly.
+    
+    Only counts are read, per label and relationship type, so the check
+    takes the same time however large the graph is.
+    
+    Args:
+        graph: Neo4j graph instance or graph store
+    """
+    try:
+        # Counts come from the count store or maintained counters, not scans
+        store = as_graph_store(graph)
+        counts = store.count()
+        by_label = store.count_by_label()
+        print(f"\nVerification:")
+        print(f"  Nodes in graph: {counts['nodes']}")
+        print(f"  Relationships in graph: {counts['relationships']}")
+        print(f"  Nodes per label: {_format_counts(by_label['labels'])}")
+        print(f"  Relationships per type: {_format_counts(by_label['types'])}\n")
     except Exception as e:
         print(f"Note: Could not verify graph: {e}\n")
 
 
-def store_knowledge_graph(graph_documents: list[GraphDocument]) -> Neo4jGraph:
-    """Complete workflow to store knowledge graph in Neo4j.
+@traced("store_graph")
+def store_knowledge_graph(
+    graph_documents: list[GraphDocument],
+    graph: Neo4jGraph | GraphStore = None
+) -> Neo4jGraph | GraphStore:
+    """Complete workflow to store knowledge graph in Neo4j or another graph store.
     
     Args:
         graph_documents: List of graph documents to store
+        graph: Optional Neo4j graph instance or graph store. Defaults to a new
+            Neo4j connection
         
     Returns:
-        Neo4jGraph: The Neo4j graph instance
+        Neo4jGraph | GraphStore: The graph the documents were stored in
     """
-    print("Storing knowledge graph in Neo4j...")
-    graph = create_neo4j_graph()
+    print("Storing knowledge graph...")
+    if graph is None:
+        graph = create_neo4j_graph()
+    store = as_graph_store(graph)
     
     # Clear existing data
-    clear_graph(graph)
+    store.clear()
+    
+    # Make sure lookups and MERGE are index-backed
+    store.ensure_indexes()
     
     # Add graph documents
-    store_graph_documents(graph, graph_documents)
+    store_graph_documents(store, graph_documents)
+    store.bump_version()
     
     # Verify storage
-    verify_graph_storage(graph)
+    verify_graph_storage(store)
     
     return graph
 
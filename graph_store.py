@@ -0,0 +1,596 @@
+"""Graph store interface and a compact in-process implementation."""
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
+
+if TYPE_CHECKING:
+    from langchain_community.graphs.graph_document import GraphDocument
+
+# File layout: magic, header length, JSON header, then 8-byte aligned int64 arrays
+_MAGIC = b"GRAPHST1"
+
+
+@runtime_checkable
+class GraphStore(Protocol):
+    """What the pipeline needs from a graph backend.
+
+    Search results are dicts with ``n``, ``r`` and ``m`` in the shape
+    ``Neo4jGraph.query`` returns them: node property dicts, and the
+    relationship as a (source properties, type, target properties) tuple.
+    Community summaries are dicts with ``id``, ``title``, ``summary``,
+    ``size`` and ``members``; they survive ``clear`` so that rebuilding an
+    unchanged graph does not summarize it again.
+    """
+
+    def upsert(self, graph_documents: list[GraphDocument]) -> dict:
+        """Merge nodes and relationships, returning write statistics."""
+        ...
+
+    def clear(self, source: str = None) -> None:
+        """Remove all nodes and relationships, or what one source contributed, keeping the version counter."""
+        ...
+
+    def ensure_indexes(self) -> None:
+        """Create whatever indexes term lookups rely on."""
+        ...
+
+    def count(self) -> dict[str, int]:
+        """Return the number of ``nodes`` and ``relationships``."""
+        ...
+
+    def count_by_label(self) -> dict[str, dict[str, int]]:
+        """Return node counts per label and relationship counts per type, without scanning the graph."""
+        ...
+
+    def search_terms(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> list[dict]:
+        """Expand the nodes matching any term, ranked by how many terms hit each triple."""
+        ...
+
+    def search_each_term(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> dict[str, list]:
+        """Expand the nodes matching each term separately."""
+        ...
+
+    def sample(self, limit: int = 20) -> list[dict]:
+        """Return an arbitrary slice of triples."""
+        ...
+
+    def get_version(self) -> int:
+        """Return the graph version counter."""
+        ...
+
+    def bump_version(self) -> int:
+        """Increment and return the graph version counter."""
+        ...
+
+    def edge_list(self) -> list[tuple[str, str, str]]:
+        """Return every entity relationship as a (source id, type, target id) tuple."""
+        ...
+
+    def node_keys(self) -> list[tuple[str, str]]:
+        """Return the (label, id) of every entity node."""
+        ...
+
+    def get_communities(self) -> dict[str, dict]:
+        """Return the stored community summaries by id."""
+        ...
+
+    def save_communities(self, communities: list[dict], removed: list[str] = ()) -> None:
+        """Store new community summaries and drop the ones in ``removed``."""
+        ...
+
+    def search_communities(self, terms: list[str], limit: int = 5) -> list[dict]:
+        """Return the summaries or members mentioning the most terms, or the largest if none do."""
+        ...
+
+
+def _words(text) -> list[str]:
+    return re.findall(r"\w+", str(text).lower())
+
+
+class InMemoryGraphStore:
+    """Graph kept in process with interned ids and CSR adjacency.
+
+    Every (label, id) pair is interned to an integer. Relationships are stored
+    as parallel int64 arrays, and a compressed sparse row index over both
+    directions is rebuilt lazily after writes, so expanding a node reads one
+    contiguous slice. A word index over node ids and names serves term
+    lookups, where each word of a term must prefix a word of the node.
+
+    ``save`` writes everything to one file. Opening a store from that file
+    memory-maps the relationship and adjacency arrays instead of reading
+    them, and they are only copied into memory on the first write. Node keys
+    and properties are still parsed and the word index rebuilt, so opening
+    takes time proportional to the graph.
+
+    Args:
+        path: Optional file written by ``save`` to load the graph from
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mmap = None
+        self._version = 0
+        self._communities = {}
+        self._clear()
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _clear(self) -> None:
+        self._node_ids = {}
+        self._keys = []
+        self._node_properties = []
+        self._node_chunks = []
+        self._type_ids = {}
+        self._types = []
+        self._edge_ids = {}
+        self._edge_properties = []
+        self.edge_source = array("q")
+        self.edge_target = array("q")
+        self.edge_type = array("q")
+        self._offsets = array("q", [0])
+        self._adjacency = array("q")
+        self._csr_dirty = False
+        self._word_index = {}
+        self._sorted_words = []
+        self._words_dirty = False
+        self._label_counts = Counter()
+        self._type_counts = Counter()
+        self._source_chunks = {}
+
+    # Writes
+
+    def _materialize(self) -> None:
+        """Copy memory-mapped arrays into memory so they can grow."""
+        if self._mmap is None:
+            return
+        views = [self.edge_source, self.edge_target, self.edge_type, self._offsets, self._adjacency]
+        self.edge_source = array("q", self.edge_source)
+        self.edge_target = array("q", self.edge_target)
+        self.edge_type = array("q", self.edge_type)
+        self._offsets = array("q", self._offsets)
+        self._adjacency = array("q", self._adjacency)
+        for view in views:
+            view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _intern_node(self, label: str, node_id, properties: dict) -> int:
+        key = (label, node_id)
+        index = self._node_ids.get(key)
+        if index is None:
+            index = len(self._keys)
+            self._node_ids[key] = index
+            self._keys.append(key)
+            self._node_properties.append({"id": node_id})
+            self._node_chunks.append([])
+            self._label_counts[label] += 1
+            self._index_words(index, node_id)
+        if properties:
+            self._node_properties[index].update(properties)
+            if "name" in properties:
+                self._index_words(index, properties["name"])
+        return index
+
+    def _index_words(self, index: int, text) -> None:
+        for word in _words(text):
+            nodes = self._word_index.get(word)
+            if nodes is None:
+                self._word_index[word] = nodes = []
+                self._words_dirty = True
+            if not nodes or nodes[-1] != index:
+                nodes.append(index)
+
+    def _intern_edge(self, source: int, rel_type: str, target: int) -> int:
+        type_index = self._type_ids.get(rel_type)
+        if type_index is None:
+            type_index = self._type_ids[rel_type] = len(self._types)
+            self._types.append(rel_type)
+        key = (source, type_index, target)
+        index = self._edge_ids.get(key)
+        if index is None:
+            index = self._edge_ids[key] = len(self._edge_properties)
+            self._edge_properties.append({})
+            self.edge_source.append(source)
+            self.edge_target.append(target)
+            self.edge_type.append(type_index)
+            self._type_counts[rel_type] += 1
+            self._csr_dirty = True
+        return index
+
+    def _add_node_chunk(self, index: int, chunk_id) -> None:
+        if chunk_id is not None and chunk_id not in self._node_chunks[index]:
+            self._node_chunks[index].append(chunk_id)
+
+    def upsert(self, graph_documents: list[GraphDocument]) -> dict:
+        """Merge graph documents, tracking the chunks each node and relationship came from.
+
+        Args:
+            graph_documents: Graph documents to write
+
+        Returns:
+            dict: Rows written, elapsed seconds and rows per second, in the
+            same shape as ``bulk_write_graph_documents``
+        """
+        start = time.perf_counter()
+        rows = 0
+        with self._lock:
+            self._materialize()
+            for doc in graph_documents:
+                metadata = doc.source.metadata if doc.source is not None else {}
+                chunk_id = metadata.get("chunk_id")
+                if chunk_id is not None:
+                    chunks = self._source_chunks.setdefault(str(metadata.get("source", "")), [])
+                    if chunk_id not in chunks:
+                        chunks.append(chunk_id)
+                for node in doc.nodes:
+                    self._add_node_chunk(self._intern_node(node.type, node.id, node.properties), chunk_id)
+                    rows += 1
+                for rel in doc.relationships:
+                    source = self._intern_node(rel.source.type, rel.source.id, rel.source.properties)
+                    target = self._intern_node(rel.target.type, rel.target.id, rel.target.properties)
+                    self._add_node_chunk(source, chunk_id)
+                    self._add_node_chunk(target, chunk_id)
+                    properties = self._edge_properties[self._intern_edge(source, rel.type, target)]
+                    properties.update(rel.properties or {})
+                    if chunk_id is not None and chunk_id not in properties.setdefault("chunks", []):
+                        properties["chunks"].append(chunk_id)
+                    rows += 1
+        elapsed = time.perf_counter() - start
+        stats = {
+            "rows": rows,
+            "failed_rows": 0,
+            "failed_batches": 0,
+            "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"  Wrote {rows} rows in {elapsed:.2f}s ({stats['rows_per_second']:.0f} rows/s)")
+        return stats
+
+    def clear(self, source: str = None) -> None:
+        """Remove all nodes and relationships, keeping the version counter and summaries.
+
+        Args:
+            source: Only remove what this source document contributed:
+                relationships and nodes no other source's chunks produced,
+                unless a kept relationship still connects the node
+        """
+        with self._lock:
+            self._materialize()
+            if source is None:
+                self._clear()
+                print("Cleared existing graph data")
+                return
+            chunk_ids = set(self._source_chunks.pop(str(source), ()))
+            if not chunk_ids:
+                print(f"Nothing to clear for source {source}")
+                return
+            before = self.count()
+            self._retract(chunk_ids)
+            after = self.count()
+        print(f"Cleared source {source}: {before['nodes'] - after['nodes']} nodes, "
+              f"{before['relationships'] - after['relationships']} relationships")
+
+    def _retract(self, chunk_ids: set[str]) -> None:
+        """Drop the chunks from every relationship and rebuild the graph without what they alone produced."""
+        kept_edges = []
+        touched = set()
+        for edge, properties in enumerate(self._edge_properties):
+            chunks = properties.get("chunks")
+            if chunks and not chunk_ids.isdisjoint(chunks):
+                touched.update((self.edge_source[edge], self.edge_target[edge]))
+                properties["chunks"] = [chunk for chunk in chunks if chunk not in chunk_ids]
+                if not properties["chunks"]:
+                    continue
+            kept_edges.append(edge)
+        connected = {node for edge in kept_edges for node in (self.edge_source[edge], self.edge_target[edge])}
+        # Nodes go once their last chunk is gone; nodes written without
+        # chunks only go with their last relationship
+        node_chunks = []
+        dropped = set()
+        for node, chunks in enumerate(self._node_chunks):
+            remaining = [chunk for chunk in chunks if chunk not in chunk_ids]
+            node_chunks.append(remaining)
+            if node not in connected and not remaining and (node in touched or len(remaining) < len(chunks)):
+                dropped.add(node)
+
+        keys, node_properties, types = self._keys, self._node_properties, self._types
+        edges = [
+            (
+                self.edge_source[edge], types[self.edge_type[edge]],
+                self.edge_target[edge], self._edge_properties[edge]
+            )
+            for edge in kept_edges
+        ]
+        source_chunks = self._source_chunks
+        self._clear()
+        self._source_chunks = source_chunks
+        position = {}
+        for node, (label, node_id) in enumerate(keys):
+            if node not in dropped:
+                position[node] = self._intern_node(label, node_id, node_properties[node])
+                self._node_chunks[position[node]] = node_chunks[node]
+        for source, rel_type, target, properties in edges:
+            edge = self._intern_edge(position[source], rel_type, position[target])
+            self._edge_properties[edge] = properties
+
+    def ensure_indexes(self) -> None:
+        """Nothing to do; the word index is maintained on every write."""
+
+    def bump_version(self) -> int:
+        """Increment and return the graph version counter."""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def get_version(self) -> int:
+        """Return the graph version counter."""
+        return self._version
+
+    def save_communities(self, communities: list[dict], removed: list[str] = ()) -> None:
+        """Store new community summaries and drop the ones in ``removed``."""
+        with self._lock:
+            for community_id in removed:
+                self._communities.pop(community_id, None)
+            for community in communities:
+                self._communities[community["id"]] = dict(community)
+
+    # Reads
+
+    def _csr(self) -> tuple:
+        """Return the CSR offsets and adjacency, rebuilding them after writes."""
+        with self._lock:
+            if self._csr_dirty:
+                node_count = len(self._keys)
+                degree = [0] * (node_count + 1)
+                for source, target in zip(self.edge_source, self.edge_target):
+                    degree[source + 1] += 1
+                    degree[target + 1] += 1
+                offsets = array("q", degree)
+                for i in range(node_count):
+                    offsets[i + 1] += offsets[i]
+                adjacency = array("q", bytes(8 * offsets[node_count]))
+                position = list(offsets[:node_count])
+                for edge, (source, target) in enumerate(zip(self.edge_source, self.edge_target)):
+                    adjacency[position[source]] = edge
+                    position[source] += 1
+                    adjacency[position[target]] = edge
+                    position[target] += 1
+                self._offsets, self._adjacency = offsets, adjacency
+                self._csr_dirty = False
+            return self._offsets, self._adjacency
+
+    def count(self) -> dict[str, int]:
+        """Return the number of ``nodes`` and ``relationships``."""
+        return {"nodes": len(self._keys), "relationships": len(self.edge_source)}
+
+    def count_by_label(self) -> dict[str, dict[str, int]]:
+        """Return the counters of nodes per label and relationships per type kept on every write."""
+        with self._lock:
+            return {
+                "labels": {label: count for label, count in self._label_counts.items() if count},
+                "types": {rel_type: count for rel_type, count in self._type_counts.items() if count},
+            }
+
+    def _seeds(self, term: str, seed_limit: int) -> list[int]:
+        """Nodes having every word of ``term`` as a word prefix, exact matches first."""
+        matched = None
+        exact = {}
+        # Writes rebuild the word index, so read it as one consistent state
+        with self._lock:
+            if self._words_dirty:
+                self._sorted_words = sorted(self._word_index)
+                self._words_dirty = False
+            sorted_words, word_index, keys = self._sorted_words, self._word_index, self._keys
+            for word in _words(term):
+                nodes = set()
+                i = bisect.bisect_left(sorted_words, word)
+                while i < len(sorted_words) and sorted_words[i].startswith(word):
+                    nodes.update(word_index[sorted_words[i]])
+                    i += 1
+                for node in word_index.get(word, ()):
+                    exact[node] = exact.get(node, 0) + 1
+                matched = nodes if matched is None else matched & nodes
+                if not matched:
+                    return []
+            ranked = sorted(
+                matched or (),
+                key=lambda node: (-exact.get(node, 0), len(str(keys[node][1])), node)
+            )
+        return ranked[:seed_limit]
+
+    def _expand(self, nodes: list[int]) -> list[int]:
+        """Distinct relationships touching any of ``nodes``, in first-seen order."""
+        offsets, adjacency = self._csr()
+        edges = {}
+        for node in nodes:
+            for edge in adjacency[offsets[node]:offsets[node + 1]]:
+                edges.setdefault(edge, None)
+        return list(edges)
+
+    def _triple(self, edge: int, hits: int = 1) -> dict:
+        n = dict(self._node_properties[self.edge_source[edge]])
+        m = dict(self._node_properties[self.edge_target[edge]])
+        return {"n": n, "r": (n, self._types[self.edge_type[edge]], m), "m": m, "hits": hits}
+
+    def search_terms(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> list[dict]:
+        """Expand the nodes matching any term, ranked by how many terms hit each triple.
+
+        Args:
+            terms: Lowercased keywords or entity names
+            seed_limit: Maximum number of matching nodes expanded per term
+            limit: Maximum number of triples returned
+
+        Returns:
+            list[dict]: Triples with ``n``, ``r``, ``m`` and ``hits``
+        """
+        hits = {}
+        for term, edges in self._edges_per_term(terms, seed_limit).items():
+            for edge in edges:
+                hits[edge] = hits.get(edge, 0) + 1
+        ranked = sorted(hits, key=lambda edge: hits[edge], reverse=True)[:limit]
+        return [self._triple(edge, hits[edge]) for edge in ranked]
+
+    def search_each_term(self, terms: list[str], seed_limit: int = 5, limit: int = 50) -> dict[str, list]:
+        """Expand the nodes matching each term separately.
+
+        Args:
+            terms: Lowercased keywords or entity names
+            seed_limit: Maximum number of matching nodes expanded per term
+            limit: Maximum number of triples returned per term
+
+        Returns:
+            dict[str, list]: Each term mapped to its triples
+        """
+        return {
+            term: [self._triple(edge) for edge in edges[:limit]]
+            for term, edges in self._edges_per_term(terms, seed_limit).items()
+        }
+
+    def _edges_per_term(self, terms: list[str], seed_limit: int) -> dict[str, list[int]]:
+        return {term: self._expand(self._seeds(term, seed_limit)) for term in dict.fromkeys(terms)}
+
+    def sample(self, limit: int = 20) -> list[dict]:
+        """Return the first ``limit`` triples."""
+        return [self._triple(edge) for edge in range(min(limit, len(self.edge_source)))]
+
+    def edge_list(self) -> list[tuple[str, str, str]]:
+        """Return every relationship as a (source id, type, target id) tuple."""
+        keys, types = self._keys, self._types
+        return [
+            (keys[source][1], types[rel_type], keys[target][1])
+            for source, rel_type, target in zip(self.edge_source, self.edge_type, self.edge_target)
+        ]
+
+    def node_keys(self) -> list[tuple[str, str]]:
+        """Return the (label, id) of every node."""
+        return [(label, str(node_id)) for label, node_id in self._keys]
+
+    def get_communities(self) -> dict[str, dict]:
+        """Return the stored community summaries by id."""
+        with self._lock:
+            return {community_id: dict(row) for community_id, row in self._communities.items()}
+
+    def search_communities(self, terms: list[str], limit: int = 5) -> list[dict]:
+        """Rank summaries by how many terms their title, summary or members contain.
+
+        Falls back to the largest communities when no summary mentions any term.
+        """
+        with self._lock:
+            communities = list(self._communities.values())
+        scored = []
+        for community in communities:
+            text = " ".join([
+                str(community.get("title", "")), str(community.get("summary", "")), *community.get("members", ())
+            ]).lower()
+            score = sum(1 for term in terms if term in text)
+            scored.append((score, community))
+        if not any(score for score, _ in scored):
+            scored = [(0, community) for community in communities]
+        else:
+            scored = [(score, community) for score, community in scored if score]
+        scored.sort(key=lambda item: (-item[0], -item[1].get("size", 0), item[1]["id"]))
+        return [dict(community) for _, community in scored[:limit]]
+
+    # Persistence
+
+    def save(self, path: str = None) -> None:
+        """Write the graph to a file whose arrays are memory-mapped when it is opened.
+
+        Args:
+            path: Destination file. Defaults to the path the store was opened with
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the graph store to")
+        with self._lock:
+            offsets, adjacency = self._csr()
+            header = json.dumps({
+                "byteorder": sys.byteorder,
+                "version": self._version,
+                "keys": self._keys,
+                "node_properties": self._node_properties,
+                "node_chunks": self._node_chunks,
+                "types": self._types,
+                "edge_properties": self._edge_properties,
+                "communities": list(self._communities.values()),
+                "source_chunks": self._source_chunks,
+                "lengths": [len(offsets), len(adjacency), len(self.edge_source),
+                            len(self.edge_target), len(self.edge_type)],
+            }, default=str).encode("utf-8")
+            header += b" " * (-len(header) % 8)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_MAGIC)
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                for values in (offsets, adjacency, self.edge_source, self.edge_target, self.edge_type):
+                    f.write(bytes(memoryview(values).cast("B")) if len(values) else b"")
+            os.replace(tmp_path, path)
+        self.path = path
+
+    def _load(self, path: str) -> None:
+        """Map the arrays of a saved file and rebuild the indexes over its nodes and relationships."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(_MAGIC)] != _MAGIC:
+            mapped.close()
+            raise ValueError(f"{path} is not a graph store file")
+        header_length = int.from_bytes(mapped[8:16], "little")
+        header = json.loads(mapped[16:16 + header_length])
+        if header["byteorder"] != sys.byteorder:
+            mapped.close()
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+
+        self._version = header["version"]
+        self._keys = [tuple(key) for key in header["keys"]]
+        self._node_ids = {key: i for i, key in enumerate(self._keys)}
+        self._node_properties = header["node_properties"]
+        self._node_chunks = header.get("node_chunks") or [[] for _ in self._keys]
+        self._types = header["types"]
+        self._type_ids = {rel_type: i for i, rel_type in enumerate(self._types)}
+        self._edge_properties = header["edge_properties"]
+        self._communities = {row["id"]: row for row in header.get("communities", [])}
+        self._source_chunks = header.get("source_chunks", {})
+        self._label_counts = Counter(label for label, _ in self._keys)
+
+        view = memoryview(mapped)
+        position = 16 + header_length
+        arrays = []
+        for length in header["lengths"]:
+            arrays.append(view[position:position + 8 * length].cast("q"))
+            position += 8 * length
+        self._offsets, self._adjacency, self.edge_source, self.edge_target, self.edge_type = arrays
+        self._mmap = mapped
+        self._csr_dirty = False
+
+        self._edge_ids = {
+            (source, rel_type, target): i
+            for i, (source, rel_type, target) in enumerate(
+                zip(self.edge_source, self.edge_type, self.edge_target)
+            )
+        }
+        self._word_index = {}
+        for index, (_, node_id) in enumerate(self._keys):
+            for word in _words(node_id):
+                self._word_index.setdefault(word, []).append(index)
+            if "name" in self._node_properties[index]:
+                for word in _words(self._node_properties[index]["name"]):
+                    nodes = self._word_index.setdefault(word, [])
+                    if not nodes or nodes[-1] != index:
+                        nodes.append(index)
+        self._sorted_words = sorted(self._word_index)
+        self._type_counts = Counter({self._types[t]: count for t, count in Counter(self.edge_type).items()})
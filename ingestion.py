@@ -0,0 +1,521 @@
+"""Incremental ingestion of document chunks into the knowledge graph."""
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import TYPE_CHECKING, Iterator, NamedTuple
+
+from langchain_core.documents import Document
+from config import (
+    ENTITY_RESOLUTION_ENABLED,
+    EXTRACTION_CACHE_ENABLED,
+    EXTRACTION_REQUESTS_PER_MINUTE,
+    EXTRACTION_TOKENS_PER_MINUTE,
+    INGEST_JOURNAL_BATCH_SIZE,
+    INGEST_JOURNAL_PATH,
+    STREAM_QUEUE_SIZE,
+    STREAM_BATCH_SIZE,
+)
+from document_loader import iter_document_chunks
+from entity_resolution import resolve_entities
+from extraction_cache import ExtractionCache
+from graph_extraction import (
+    analyze_graph_documents,
+    extract_graph_documents_concurrently,
+    extract_graph_from_documents,
+)
+from graph_serialization import graph_document_from_dict, graph_document_to_dict
+from graph_storage import (
+    bump_graph_version,
+    create_neo4j_graph,
+    ensure_indexes,
+    get_ingested_sources,
+    get_unseen_chunks,
+    mark_chunks_seen,
+    bulk_write_graph_documents,
+    retract_chunks,
+    store_knowledge_graph,
+    update_source_fingerprints,
+    verify_graph_storage,
+)
+from instrumentation import traced
+from job_journal import JobJournal, print_progress
+
+if TYPE_CHECKING:
+    from langchain_neo4j import Neo4jGraph
+
+
+class IngestPlan(NamedTuple):
+    """Difference between the chunks on disk and the chunks in the graph."""
+    new_chunks: list[Document]
+    removed_chunk_ids: list[str]
+    source_fingerprints: dict[str, str]
+    unchanged_sources: list[str]
+    removed_sources: list[str]
+
+
+def chunk_fingerprint(document: Document) -> str:
+    """Fingerprint a chunk by its source and text.
+
+    Args:
+        document: Document chunk
+
+    Returns:
+        str: Hex SHA-256 digest of the chunk
+    """
+    source = str(document.metadata.get("source", ""))
+    return hashlib.sha256(f"{source}\0{document.page_content}".encode("utf-8")).hexdigest()
+
+
+def tag_chunks(documents: list[Document]) -> dict[str, list[Document]]:
+    """Store chunk fingerprints in metadata and group chunks by source.
+
+    Args:
+        documents: Document chunks, in source order
+
+    Returns:
+        dict[str, list[Document]]: Source id mapped to its chunks
+    """
+    by_source = defaultdict(list)
+    for document in documents:
+        source = str(document.metadata.get("source", ""))
+        document.metadata["chunk_id"] = chunk_fingerprint(document)
+        document.metadata["chunk_index"] = len(by_source[source])
+        by_source[source].append(document)
+    return by_source
+
+
+def plan_ingest(
+    chunks_by_source: dict[str, list[Document]],
+    ingested: dict[str, dict],
+    prune_missing_sources: bool = True
+) -> IngestPlan:
+    """Work out which chunks to extract and which to retract.
+
+    Args:
+        chunks_by_source: Tagged chunks grouped by source, from ``tag_chunks``
+        ingested: Fingerprints already in the graph, from ``get_ingested_sources``
+        prune_missing_sources: Retract sources that are in the graph but not on disk
+
+    Returns:
+        IngestPlan: The delta to apply
+    """
+    new_chunks = []
+    removed_chunk_ids = []
+    fingerprints = {}
+    unchanged = []
+
+    for source, chunks in chunks_by_source.items():
+        chunk_ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+        fingerprint = hashlib.sha256("\n".join(chunk_ids).encode("utf-8")).hexdigest()
+        fingerprints[source] = fingerprint
+        stored = ingested.get(source)
+        if stored is not None and stored["fingerprint"] == fingerprint:
+            unchanged.append(source)
+            continue
+        stored_chunks = stored["chunks"] if stored is not None else set()
+        current = set(chunk_ids)
+        seen = set()
+        for chunk in chunks:
+            chunk_id = chunk.metadata["chunk_id"]
+            if chunk_id not in stored_chunks and chunk_id not in seen:
+                new_chunks.append(chunk)
+            seen.add(chunk_id)
+        removed_chunk_ids.extend(sorted(stored_chunks - current))
+
+    removed_sources = []
+    if prune_missing_sources:
+        removed_sources = sorted(set(ingested) - set(chunks_by_source))
+        for source in removed_sources:
+            removed_chunk_ids.extend(sorted(ingested[source]["chunks"]))
+
+    return IngestPlan(new_chunks, removed_chunk_ids, fingerprints, unchanged, removed_sources)
+
+
+@traced("ingest_incremental")
+def ingest_incrementally(
+    documents: list[Document],
+    llm,
+    graph: Neo4jGraph = None,
+    cache: ExtractionCache = None,
+    prune_missing_sources: bool = True
+) -> Neo4jGraph:
+    """Bring the graph in line with the given chunks without clearing it.
+
+    Only new or changed chunks are extracted and merged; chunks that are no
+    longer present are retracted afterwards. The existing graph keeps serving
+    queries throughout, since nothing is deleted before its replacement is in.
+
+    Args:
+        documents: All document chunks of the corpus
+        llm: LLM instance to use for extraction
+        graph: Optional Neo4j graph instance. Defaults to a new connection
+        cache: Optional extraction cache
+        prune_missing_sources: Retract sources that are in the graph but not in ``documents``
+
+    Returns:
+        Neo4jGraph: The Neo4j graph instance
+    """
+    print("Incrementally updating knowledge graph in Neo4j...")
+    if graph is None:
+        graph = create_neo4j_graph()
+    ensure_indexes(graph)
+
+    chunks_by_source = tag_chunks(documents)
+    plan = plan_ingest(chunks_by_source, get_ingested_sources(graph), prune_missing_sources)
+    print(f"  Sources unchanged: {len(plan.unchanged_sources)}, removed: {len(plan.removed_sources)}")
+    print(f"  Chunks to extract: {len(plan.new_chunks)}, to retract: {len(plan.removed_chunk_ids)}")
+
+    fingerprints = {
+        source: fingerprint for source, fingerprint in plan.source_fingerprints.items()
+        if source not in plan.unchanged_sources
+    }
+    if plan.new_chunks:
+        graph_documents = extract_graph_from_documents(plan.new_chunks, llm, cache=cache)
+        analyze_graph_documents(graph_documents)
+        if ENTITY_RESOLUTION_ENABLED:
+            graph_documents, _ = resolve_entities(graph_documents)
+        stats = bulk_write_graph_documents(graph, graph_documents)
+        if stats["failed_batches"]:
+            print("WARNING: Some writes failed; keeping the previous graph state for removed chunks")
+            bump_graph_version(graph)
+            verify_graph_storage(graph)
+            return graph
+
+        # Sources with failed chunks keep their old fingerprint so they are retried
+        extracted = {doc.source.metadata["chunk_id"] for doc in graph_documents}
+        for chunk in plan.new_chunks:
+            if chunk.metadata["chunk_id"] not in extracted:
+                fingerprints.pop(str(chunk.metadata.get("source", "")), None)
+
+    if plan.removed_chunk_ids:
+        retract_chunks(graph, plan.removed_chunk_ids)
+    update_source_fingerprints(graph, fingerprints, plan.removed_sources)
+    if plan.new_chunks or plan.removed_chunk_ids:
+        bump_graph_version(graph)
+
+    verify_graph_storage(graph)
+    return graph
+
+
+_END = object()
+
+
+def _produce(items: Iterator, out: queue.Queue, errors: list) -> None:
+    """Feed ``items`` into a bounded queue, ending with a sentinel."""
+    try:
+        for item in items:
+            out.put(item)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        out.put(_END)
+
+
+def _consume_writes(graph: Neo4jGraph, writes: queue.Queue, run_id: str, stats: dict, errors: list) -> None:
+    """Write extracted batches as they arrive and mark their chunks as seen."""
+    while True:
+        item = writes.get()
+        if item is _END:
+            return
+        if errors:
+            continue  # Drain the queue so the extraction side never blocks
+        try:
+            graph_documents = item
+            result = bulk_write_graph_documents(graph, graph_documents)
+            if result["failed_batches"]:
+                stats["failed_writes"] += result["failed_batches"]
+            else:
+                mark_chunks_seen(
+                    graph, [doc.source.metadata["chunk_id"] for doc in graph_documents], run_id
+                )
+            stats["written"] += len(graph_documents)
+        except Exception as e:
+            errors.append(e)
+
+
+@traced("ingest_streaming")
+def ingest_streaming(
+    paths: str | list[str],
+    llm,
+    graph: Neo4jGraph = None,
+    cache: ExtractionCache = None,
+    prune_missing_sources: bool = True,
+    queue_size: int = STREAM_QUEUE_SIZE,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Neo4jGraph:
+    """Incrementally ingest a corpus with loading, extraction and storage overlapped.
+    
+    A loader thread streams chunks from ``paths`` into a bounded queue, the
+    calling thread extracts them in batches, and a writer thread stores each
+    batch while the next one is extracted. Memory stays bounded by the queue
+    and batch sizes however large the corpus is.
+    
+    As in ``ingest_incrementally`` only chunks missing from the graph are
+    extracted. Chunks already present are marked as seen by this run, and
+    once the stream ends every chunk of a read source that was not seen is
+    retracted.
+    
+    Args:
+        paths: Files, directories or glob patterns to ingest
+        llm: LLM instance to use for extraction
+        graph: Optional Neo4j graph instance. Defaults to a new connection
+        cache: Optional extraction cache
+        prune_missing_sources: Retract sources that are in the graph but were not read
+        queue_size: Maximum number of chunks buffered ahead of extraction
+        batch_size: Number of chunks extracted and written per batch
+        
+    Returns:
+        Neo4jGraph: The Neo4j graph instance
+    """
+    print("Streaming knowledge graph ingestion into Neo4j...")
+    if graph is None:
+        graph = create_neo4j_graph()
+    ensure_indexes(graph)
+    
+    run_id = uuid.uuid4().hex
+    errors = []
+    stats = {"read": 0, "skipped": 0, "extracted": 0, "failed": 0, "written": 0, "failed_writes": 0}
+    chunks = queue.Queue(maxsize=queue_size)
+    writes = queue.Queue(maxsize=2)
+    loader = threading.Thread(
+        target=_produce, args=(iter_document_chunks(paths), chunks, errors), daemon=True
+    )
+    writer = threading.Thread(
+        target=_consume_writes, args=(graph, writes, run_id, stats, errors), daemon=True
+    )
+    loader.start()
+    writer.start()
+    
+    source_hashes = {}
+    failed_sources = set()
+    
+    def process(batch: list[Document]) -> None:
+        existing = mark_chunks_seen(graph, [doc.metadata["chunk_id"] for doc in batch], run_id)
+        pending = []
+        for doc in batch:
+            if doc.metadata["chunk_id"] not in existing:
+                pending.append(doc)
+        stats["skipped"] += len(batch) - len(pending)
+        if not pending:
+            return
+        results, failures = extract_graph_documents_concurrently(pending, llm, cache=cache)
+        for failure in failures:
+            failed_sources.add(str(failure.source.get("source", "")))
+        stats["failed"] += len(failures)
+        graph_documents = [doc for doc in results if doc is not None]
+        stats["extracted"] += len(graph_documents)
+        if graph_documents and ENTITY_RESOLUTION_ENABLED:
+            graph_documents, _ = resolve_entities(graph_documents)
+        if graph_documents:
+            writes.put(graph_documents)
+    
+    try:
+        batch = []
+        while not errors:
+            document = chunks.get()
+            if document is _END:
+                break
+            source = str(document.metadata.get("source", ""))
+            document.metadata["chunk_id"] = chunk_fingerprint(document)
+            hasher = source_hashes.setdefault(source, hashlib.sha256())
+            if document.metadata["chunk_index"] > 0:
+                hasher.update(b"\n")
+            hasher.update(document.metadata["chunk_id"].encode("utf-8"))
+            stats["read"] += 1
+            batch.append(document)
+            if len(batch) >= batch_size:
+                process(batch)
+                batch = []
+                print(f"  Read {stats['read']} chunks, extracted {stats['extracted']}, "
+                      f"skipped {stats['skipped']} unchanged")
+        if batch and not errors:
+            process(batch)
+    finally:
+        writes.put(_END)
+        writer.join()
+    
+    if errors:
+        raise errors[0]
+    
+    print(f"  Stream finished: {stats}")
+    if stats["failed_writes"]:
+        print("WARNING: Some writes failed; keeping the previous graph state for unseen chunks")
+        bump_graph_version(graph)
+        verify_graph_storage(graph)
+        return graph
+    
+    stale_chunks, removed_sources = get_unseen_chunks(
+        graph, list(source_hashes), run_id, prune_missing_sources
+    )
+    if stale_chunks:
+        print(f"  Retracting {len(stale_chunks)} chunks no longer in the corpus")
+        retract_chunks(graph, stale_chunks)
+    fingerprints = {
+        source: hasher.hexdigest() for source, hasher in source_hashes.items()
+        if source not in failed_sources
+    }
+    update_source_fingerprints(graph, fingerprints, removed_sources)
+    if stats["written"] or stale_chunks:
+        bump_graph_version(graph)
+    
+    verify_graph_storage(graph)
+    return graph
+
+
+def run_worker(
+    journal_path: str = INGEST_JOURNAL_PATH,
+    worker: str = None,
+    llm=None,
+    batch_size: int = INGEST_JOURNAL_BATCH_SIZE,
+    use_cache: bool = EXTRACTION_CACHE_ENABLED,
+    quota_share: int = 1
+) -> dict:
+    """Claim, extract and commit journal jobs until none are left.
+    
+    Runs in its own process, or on another host sharing the journal file.
+    Each claimed batch is extracted and committed to the journal in one
+    transaction, so a crash loses at most the batch in flight. The lease on
+    the batch is renewed after every request, so a batch that takes longer
+    than the lease is not handed to another worker meanwhile.
+    
+    Workers share one API quota but each limits its own requests, so every
+    worker gets an equal ``1 / quota_share`` of the configured request and
+    token budgets. Together they then stay within the quota even when all
+    of them are busy, at the cost of idle headroom once some have finished.
+    
+    Args:
+        journal_path: Job journal file
+        worker: Worker name. Defaults to the host name and process id
+        llm: LLM instance. Defaults to a new one from ``get_llm``
+        batch_size: Number of jobs claimed and committed at a time
+        use_cache: Reuse and fill the extraction cache
+        quota_share: Number of workers splitting the extraction rate limits
+        
+    Returns:
+        dict: The worker name and its numbers of ``done`` and ``failed`` chunks
+    """
+    if llm is None:
+        from llm_setup import get_llm
+        
+        llm = get_llm()
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    journal = JobJournal(journal_path)
+    cache = ExtractionCache() if use_cache else None
+    journal.register_worker(worker)
+    share = max(1, quota_share)
+    requests_per_minute = EXTRACTION_REQUESTS_PER_MINUTE and EXTRACTION_REQUESTS_PER_MINUTE / share
+    tokens_per_minute = EXTRACTION_TOKENS_PER_MINUTE and EXTRACTION_TOKENS_PER_MINUTE / share
+    done = failed = 0
+    try:
+        while jobs := journal.claim(worker, batch_size):
+            start = time.perf_counter()
+            documents = [Document(page_content=job["content"], metadata=job["metadata"]) for job in jobs]
+            chunk_ids = [job["chunk_id"] for job in jobs]
+            results, failures = extract_graph_documents_concurrently(
+                documents,
+                llm,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                cache=cache,
+                on_progress=lambda: journal.renew(worker, chunk_ids)
+            )
+            completed = {
+                document.metadata["chunk_id"]: graph_document_to_dict(result)
+                for document, result in zip(documents, results) if result is not None
+            }
+            errors = {documents[failure.index].metadata["chunk_id"]: failure.error for failure in failures}
+            journal.complete(worker, completed, errors, time.perf_counter() - start)
+            done += len(completed)
+            failed += len(errors)
+            print(f"  [{worker}] committed {done} chunks, {failed} failed")
+    finally:
+        journal.close()
+        if cache is not None:
+            cache.close()
+    return {"worker": worker, "done": done, "failed": failed}
+
+
+@traced("ingest_journaled")
+def ingest_with_journal(
+    documents: list[Document],
+    llm,
+    graph: Neo4jGraph = None,
+    workers: int = 1,
+    journal_path: str = INGEST_JOURNAL_PATH,
+    batch_size: int = INGEST_JOURNAL_BATCH_SIZE
+):
+    """Extract chunks through the durable job journal, then store the whole graph.
+    
+    Chunks already in the journal are not queued again, except those given up
+    by an earlier run, and claims held by exited workers of this host are
+    released, so a run that was interrupted resumes from its last committed
+    batch. With one worker the
+    jobs are extracted in this process with ``llm``; with more, each worker
+    process creates its own LLM client and a ``1 / workers`` share of the
+    extraction rate limits. Workers on other hosts can join with
+    ``run_worker`` on the same journal file, passing the total number of
+    workers as ``quota_share``. Once no job is left, the results
+    replace the graph as in a full rebuild.
+    
+    Args:
+        documents: All document chunks of the corpus
+        llm: LLM instance, used when ``workers`` is 1
+        graph: Optional Neo4j graph instance or graph store. Defaults to a new connection
+        workers: Number of worker processes
+        journal_path: Job journal file
+        batch_size: Number of jobs each worker claims and commits at a time
+        
+    Returns:
+        Neo4jGraph | GraphStore: The graph the documents were stored in, or
+        None if jobs are still unfinished or nothing was extracted
+    """
+    print(f"Journaled knowledge graph ingestion with {workers} worker(s)...")
+    journal = JobJournal(journal_path)
+    tag_chunks(documents)
+    added = journal.enqueue(documents)
+    released = journal.release_dead_claims()
+    print(f"  Jobs queued: {added}, unfinished from earlier runs: {journal.remaining() - added}, "
+          f"taken back from exited workers: {released}")
+    
+    if workers <= 1:
+        run_worker(journal_path, llm=llm, batch_size=batch_size)
+    else:
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(journal_path,),
+                kwargs={"batch_size": batch_size, "quota_share": workers}
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    
+    progress = print_progress(journal)
+    remaining = journal.remaining()
+    results = journal.results([doc.metadata["chunk_id"] for doc in documents])
+    journal.close()
+    if remaining:
+        print(f"WARNING: {remaining} jobs are unfinished; run again to resume")
+        return None
+    if progress["jobs"]["failed"]:
+        print(f"WARNING: {progress['jobs']['failed']} chunks failed every attempt and are left out")
+    
+    graph_documents = [graph_document_from_dict(result) for result in results]
+    total_nodes, total_relationships = analyze_graph_documents(graph_documents)
+    if total_nodes == 0 and total_relationships == 0:
+        return None
+    if ENTITY_RESOLUTION_ENABLED:
+        graph_documents, _ = resolve_entities(graph_documents)
+    return store_knowledge_graph(graph_documents, graph)
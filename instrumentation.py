@@ -0,0 +1,343 @@
+"""Metrics and tracing for the pipeline stages.
+
+Spans time a block of work and feed a latency histogram per span name;
+counters track tokens, retries and cache hits. Everything is kept in process
+and exported as a JSON report or in the Prometheus text format. When
+instrumentation is disabled, every call returns right after one flag check.
+"""
+import bisect
+import contextlib
+import functools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from itertools import count
+
+from langchain_core.callbacks import BaseCallbackHandler
+from config import INSTRUMENTATION_ENABLED, INSTRUMENTATION_MAX_SPANS
+
+# Histogram bucket upper bounds in seconds, as in Prometheus client defaults
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Raw samples kept per histogram for percentiles
+DEFAULT_RESERVOIR_SIZE = 1024
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with a reservoir of raw samples.
+
+    The buckets feed the Prometheus export. Percentiles come from a uniform
+    random sample of at most ``reservoir_size`` observations, so they are
+    exact until that many values were observed and a sample estimate after.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, reservoir_size: int = DEFAULT_RESERVOIR_SIZE):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.reservoir_size = reservoir_size
+        self.samples = []
+        self._random = random.Random(0)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        # Reservoir sampling keeps every value observed so far equally likely
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(value)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.samples[slot] = value
+
+    def quantile(self, q: float) -> float:
+        """Return the nearest-rank quantile of the sampled values."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Thread-safe registry of counters, histograms and recent spans.
+
+    Args:
+        enabled: Whether anything is recorded
+        max_spans: Number of finished spans kept for the report
+    """
+
+    def __init__(self, enabled: bool = INSTRUMENTATION_ENABLED, max_spans: int = INSTRUMENTATION_MAX_SPANS):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = count(1)
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop everything recorded so far."""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.spans = []
+            self.dropped_spans = 0
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add ``value`` to a counter."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record a duration in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block, nested under the span that is open in this thread.
+
+        The duration goes to the ``span_seconds`` histogram labeled with the
+        span name. The yielded dict can be filled with more attributes.
+        """
+        if not self.enabled:
+            yield attributes
+            return
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        span_id = next(self._ids)
+        parent = stack[-1] if stack else None
+        stack.append(span_id)
+        start_time = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self.observe("span_seconds", duration, span=name)
+            record = {
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start": start_time,
+                "seconds": duration,
+                "thread": threading.current_thread().name,
+                "attributes": attributes,
+            }
+            if error is not None:
+                record["error"] = error
+                self.inc("span_errors", span=name)
+            with self._lock:
+                if len(self.spans) < self.max_spans:
+                    self.spans.append(record)
+                else:
+                    self.dropped_spans += 1
+
+    def report(self) -> dict:
+        """Return everything recorded as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.summary()}
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ],
+                "spans": list(self.spans),
+                "dropped_spans": self.dropped_spans,
+            }
+
+    def to_prometheus(self, prefix: str = "graphrag_") -> str:
+        """Render counters and histograms in the Prometheus text exposition format."""
+        def labels_text(labels: tuple, extra: tuple = ()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+        def metric_name(name: str) -> str:
+            return prefix + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                full_name = metric_name(name) + "_total"
+                if full_name not in typed:
+                    lines.append(f"# TYPE {full_name} counter")
+                    typed.add(full_name)
+                lines.append(f"{full_name}{labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                full_name = metric_name(name)
+                if full_name not in typed:
+                    lines.append(f"# TYPE {full_name} histogram")
+                    typed.add(full_name)
+                cumulative = 0
+                for bound, bucket_count in zip([*histogram.buckets, "+Inf"], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full_name}_bucket{labels_text(labels, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{full_name}_sum{labels_text(labels)} {histogram.sum}")
+                lines.append(f"{full_name}_count{labels_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str = None, prometheus_path: str = None) -> None:
+        """Write the JSON report and/or the Prometheus text to files."""
+        for path, text in (
+            (json_path, lambda: json.dumps(self.report(), indent=2, default=str)),
+            (prometheus_path, self.to_prometheus),
+        ):
+            if path is None:
+                continue
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text())
+
+
+# Process-wide registry used by the pipeline modules
+metrics = Metrics()
+
+
+# Returned by ``span`` while disabled, so a disabled span costs one flag check
+_NOOP_SPAN = contextlib.nullcontext({})
+
+
+def span(name: str, **attributes):
+    """Time a block with the process-wide registry; see ``Metrics.span``."""
+    if not metrics.enabled:
+        return _NOOP_SPAN
+    return metrics.span(name, **attributes)
+
+
+def traced(name: str):
+    """Decorator that runs every call of a function in a span called ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_instrumentation_enabled(enabled: bool = True) -> None:
+    """Turn recording on or off for the process-wide registry."""
+    metrics.enabled = enabled
+
+
+def statement_name(query: str, length: int = 60) -> str:
+    """Short, low-cardinality label for a Cypher statement."""
+    return re.sub(r"\s+", " ", query).strip()[:length]
+
+
+def _usage(response) -> tuple[int, int]:
+    """Prompt and completion tokens reported for an LLM response."""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if not prompt_tokens and not completion_tokens and response.llm_output:
+        usage = response.llm_output.get("token_usage") or response.llm_output.get("usage_metadata") or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0))
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0))
+    return prompt_tokens, completion_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that times every LLM call and counts its tokens.
+
+    Args:
+        registry: Metrics registry to record into. Defaults to the process-wide one
+    """
+
+    def __init__(self, registry: Metrics = None):
+        self.registry = registry or metrics
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _start(self, serialized: dict, run_id) -> None:
+        if not self.registry.enabled:
+            return
+        kwargs = (serialized or {}).get("kwargs", {})
+        model = kwargs.get("model") or kwargs.get("model_name") or (serialized or {}).get("name", "unknown")
+        with self._lock:
+            self._calls[run_id] = (time.perf_counter(), str(model))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(serialized, run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(serialized, run_id)
+
+    def _finish(self, run_id) -> tuple:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return None, "unknown"
+        start, model = call
+        return time.perf_counter() - start, model
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        if not self.registry.enabled:
+            return
+        seconds, model = self._finish(run_id)
+        if seconds is not None:
+            self.registry.observe("llm_call_seconds", seconds, model=model)
+        prompt_tokens, completion_tokens = _usage(response)
+        self.registry.inc("llm_calls", model=model)
+        self.registry.inc("llm_prompt_tokens", prompt_tokens, model=model)
+        self.registry.inc("llm_completion_tokens", completion_tokens, model=model)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        if not self.registry.enabled:
+            return
+        _, model = self._finish(run_id)
+        self.registry.inc("llm_errors", model=model, error=type(error).__name__)
@@ -0,0 +1,333 @@
+"""Durable SQLite journal of extraction jobs shared by ingestion workers.
+
+Every chunk is one job. Workers, in one process, several processes or on
+hosts sharing the file, claim batches of pending jobs, extract them and
+commit the serialized results together with the job status in a single
+transaction. A crash loses at most the batches in flight: their claims expire
+after the lease and other workers pick them up again, and a run restarted on
+the same host takes back the claims of its exited workers right away.
+"""
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import time
+
+from config import INGEST_JOB_LEASE_SECONDS, INGEST_JOB_MAX_ATTEMPTS, INGEST_JOURNAL_PATH
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobJournal:
+    """Job table and per-worker progress kept in one SQLite file.
+
+    Each instance holds its own connection, so create one per process (or
+    thread). SQLite's WAL mode lets readers, such as a progress report, run
+    while workers write.
+
+    Args:
+        path: Journal file
+        lease_seconds: Seconds after which a claimed job may be claimed again
+        max_attempts: Claims after which a job that keeps failing is given up
+    """
+
+    def __init__(
+        self,
+        path: str = INGEST_JOURNAL_PATH,
+        lease_seconds: float = INGEST_JOB_LEASE_SECONDS,
+        max_attempts: int = INGEST_JOB_MAX_ATTEMPTS
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " chunk_id TEXT UNIQUE NOT NULL,"
+            " content TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " worker TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " claimed_at REAL,"
+            " finished_at REAL,"
+            " error TEXT,"
+            " result TEXT);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, claimed_at);"
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " worker TEXT PRIMARY KEY,"
+            " host TEXT,"
+            " pid INTEGER,"
+            " started_at REAL,"
+            " last_seen REAL,"
+            " done INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " busy_seconds REAL NOT NULL DEFAULT 0);"
+        )
+
+    def enqueue(self, documents: list) -> int:
+        """Add one job per chunk, skipping chunks already in the journal.
+
+        Jobs of these chunks that were given up after ``max_attempts`` are
+        queued again with their attempts reset, so a rerun retries them.
+
+        Args:
+            documents: Chunks tagged with a ``chunk_id`` by ``ingestion.tag_chunks``
+
+        Returns:
+            int: Number of jobs added or queued again
+        """
+        rows = [
+            (doc.metadata["chunk_id"], doc.page_content, json.dumps(doc.metadata, default=str), PENDING)
+            for doc in documents
+        ]
+        before = self._conn.total_changes
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT INTO jobs (chunk_id, content, metadata, status) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(chunk_id) DO UPDATE SET status = excluded.status, worker = NULL, "
+                "attempts = 0, claimed_at = NULL, finished_at = NULL, error = NULL "
+                "WHERE jobs.status = ?",
+                [(*row, FAILED) for row in rows]
+            )
+        return self._conn.total_changes - before
+
+    def register_worker(self, worker: str) -> None:
+        """Record a worker, resetting the counters of an earlier run under the same name."""
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO workers (worker, host, pid, started_at, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET host = excluded.host, pid = excluded.pid, "
+                "started_at = excluded.started_at, last_seen = excluded.last_seen, "
+                "done = 0, failed = 0, busy_seconds = 0",
+                (worker, socket.gethostname(), os.getpid(), now, now)
+            )
+
+    def release_dead_claims(self) -> int:
+        """Hand back jobs claimed by workers of this host whose process has exited.
+
+        A restarted run would otherwise wait ``lease_seconds`` for the claims
+        of the run that crashed. The attempts those claims used still count,
+        so a job that keeps crashing its worker is eventually given up.
+        Workers on other hosts cannot be checked and keep their leases.
+
+        Returns:
+            int: Number of jobs released
+        """
+        host = socket.gethostname()
+        with self._transaction():
+            dead = [
+                worker for worker, pid in self._conn.execute(
+                    "SELECT worker, pid FROM workers WHERE host = ?", (host,)
+                )
+                if not _process_alive(pid)
+            ]
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = CASE WHEN attempts >= ? THEN 'worker exited' ELSE error END "
+                "WHERE status = ? AND worker = ?",
+                [(self.max_attempts, FAILED, PENDING, self.max_attempts, CLAIMED, worker) for worker in dead]
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, worker: str, limit: int) -> list[dict]:
+        """Claim up to ``limit`` pending jobs, or jobs whose lease expired.
+
+        Args:
+            worker: Name of the claiming worker
+            limit: Maximum number of jobs to claim
+
+        Returns:
+            list[dict]: Jobs with ``chunk_id``, ``content`` and ``metadata``
+        """
+        now = time.time()
+        with self._transaction():
+            # Give up on jobs whose every attempt ran out of lease
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired' "
+                "WHERE status = ? AND claimed_at < ? AND attempts >= ?",
+                (FAILED, CLAIMED, now - self.lease_seconds, self.max_attempts)
+            )
+            rows = self._conn.execute(
+                "SELECT id, chunk_id, content, metadata FROM jobs "
+                "WHERE (status = ? OR (status = ? AND claimed_at < ?)) AND attempts < ? "
+                "ORDER BY id LIMIT ?",
+                (PENDING, CLAIMED, now - self.lease_seconds, self.max_attempts, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                [(CLAIMED, worker, now, row[0]) for row in rows]
+            )
+        return [
+            {"chunk_id": chunk_id, "content": content, "metadata": json.loads(metadata)}
+            for _, chunk_id, content, metadata in rows
+        ]
+
+    def renew(self, worker: str, chunk_ids: list[str]) -> int:
+        """Extend the lease of jobs the worker still holds.
+
+        A worker calls this while it works through a batch, so a batch that
+        takes longer than ``lease_seconds`` is not handed out again. Jobs
+        already taken over by another worker are left alone.
+
+        Args:
+            worker: Name of the worker holding the claims
+            chunk_ids: Chunk ids of the claimed jobs
+
+        Returns:
+            int: Number of leases extended
+        """
+        now = time.time()
+        before = self._conn.total_changes
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET claimed_at = ? WHERE chunk_id = ? AND worker = ? AND status = ?",
+                [(now, chunk_id, worker, CLAIMED) for chunk_id in chunk_ids]
+            )
+        return self._conn.total_changes - before
+
+    def complete(self, worker: str, results: dict[str, dict], errors: dict[str, str], busy_seconds: float) -> None:
+        """Commit a batch: results, failures and the worker's progress in one transaction.
+
+        Failed jobs go back to pending until they have been claimed
+        ``max_attempts`` times, after which they are marked failed.
+
+        Args:
+            worker: Name of the worker that ran the batch
+            results: Chunk id mapped to its serialized graph document
+            errors: Chunk id mapped to the error that made it fail
+            busy_seconds: Time the worker spent on the batch
+        """
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = NULL, result = ? "
+                "WHERE chunk_id = ? AND worker = ?",
+                [(DONE, now, json.dumps(result), chunk_id, worker) for chunk_id, result in results.items()]
+            )
+            self._conn.executemany(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "finished_at = ?, error = ? WHERE chunk_id = ? AND worker = ?",
+                [
+                    (self.max_attempts, FAILED, PENDING, now, error, chunk_id, worker)
+                    for chunk_id, error in errors.items()
+                ]
+            )
+            self._conn.execute(
+                "UPDATE workers SET last_seen = ?, done = done + ?, failed = failed + ?, "
+                "busy_seconds = busy_seconds + ? WHERE worker = ?",
+                (now, len(results), len(errors), busy_seconds, worker)
+            )
+
+    def results(self, chunk_ids: list[str] = None) -> list[dict]:
+        """Return the serialized results of finished jobs, in job order.
+
+        Args:
+            chunk_ids: Only return these chunks. Defaults to every finished job
+
+        Returns:
+            list[dict]: Serialized graph documents
+        """
+        rows = self._conn.execute(
+            "SELECT chunk_id, result FROM jobs WHERE status = ? ORDER BY id", (DONE,)
+        )
+        wanted = set(chunk_ids) if chunk_ids is not None else None
+        return [
+            json.loads(result) for chunk_id, result in rows
+            if wanted is None or chunk_id in wanted
+        ]
+
+    def remaining(self) -> int:
+        """Number of jobs that are neither done nor given up."""
+        return self._conn.execute(
+            "SELECT count(*) FROM jobs WHERE status IN (?, ?)", (PENDING, CLAIMED)
+        ).fetchone()[0]
+
+    def progress(self) -> dict:
+        """Return job counts by status and every worker's progress and throughput.
+
+        Returns:
+            dict: ``jobs`` maps each status to its count; ``workers`` lists each
+            worker's host, pid, jobs done and failed, seconds since it last
+            committed, and chunks per second over its run and its busy time
+        """
+        jobs = {status: 0 for status in (PENDING, CLAIMED, DONE, FAILED)}
+        for status, count in self._conn.execute("SELECT status, count(*) FROM jobs GROUP BY status"):
+            jobs[status] = count
+        now = time.time()
+        workers = []
+        for worker, host, pid, started_at, last_seen, done, failed, busy in self._conn.execute(
+            "SELECT worker, host, pid, started_at, last_seen, done, failed, busy_seconds "
+            "FROM workers ORDER BY worker"
+        ):
+            elapsed = (last_seen or now) - (started_at or now)
+            workers.append({
+                "worker": worker,
+                "host": host,
+                "pid": pid,
+                "done": done,
+                "failed": failed,
+                "idle_seconds": now - last_seen if last_seen else None,
+                "chunks_per_second": done / elapsed if elapsed > 0 else 0.0,
+                "busy_chunks_per_second": done / busy if busy > 0 else 0.0,
+            })
+        return {"jobs": jobs, "workers": workers}
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """``BEGIN IMMEDIATE`` ... ``COMMIT``, so concurrent claims never overlap."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._conn.close()
+
+
+def _process_alive(pid: int | None) -> bool:
+    """Check whether a local process exists; assume it does where that cannot be told."""
+    if not pid or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def print_progress(journal: JobJournal) -> dict:
+    """Print job counts and per-worker throughput, and return them.
+
+    Args:
+        journal: Job journal
+
+    Returns:
+        dict: The journal's ``progress()``
+    """
+    progress = journal.progress()
+    print(f"  Jobs: {progress['jobs']}")
+    for worker in progress["workers"]:
+        print(f"  Worker {worker['worker']} ({worker['host']}, pid {worker['pid']}): "
+              f"{worker['done']} done, {worker['failed']} failed, "
+              f"{worker['chunks_per_second']:.2f} chunks/s overall, "
+              f"{worker['busy_chunks_per_second']:.2f} while busy")
+    return progress
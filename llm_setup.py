@@ -1,6 +1,13 @@
 """LLM initialization and setup."""
-from langchain_google_genai import ChatGoogleGenerativeAI
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from config import LLM_MODEL, LLM_TEMPERATURE
+from instrumentation import MetricsCallbackHandler
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
 
 def get_llm() -> ChatGoogleGenerativeAI:
@@ -9,5 +16,45 @@ def get_llm() -> ChatGoogleGenerativeAI:
     Returns:
         ChatGoogleGenerativeAI: Configured Gemini LLM instance
     """
-    return ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=LLM_TEMPERATURE)
+    # Deferred so that importing estimate_tokens does not load the Gemini client
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        callbacks=[MetricsCallbackHandler()]
+    )
+
 
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token heuristic, which is close enough
+    for budgeting requests without a network round trip to the tokenizer.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+def message_text(message) -> str:
+    """Return the text of an LLM response or stream chunk.
+
+    Gemini may return content as a list of parts rather than a string.
+
+    Args:
+        message: Message or chunk with a ``content`` attribute, or the content itself
+
+    Returns:
+        str: The text parts joined together
+    """
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+    )
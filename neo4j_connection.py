@@ -0,0 +1,173 @@
+"""Process-wide pooled Neo4j connections."""
+import atexit
+import re
+import threading
+
+from langchain_neo4j import Neo4jGraph
+from config import (
+    NEO4J_URL,
+    NEO4J_USERNAME,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_CONNECTION_TIMEOUT,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_QUERY_TIMEOUT,
+    NEO4J_ROUTE_READS,
+)
+from instrumentation import span, statement_name
+
+# Statements that may change the graph, and so the schema
+_WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP)\b", re.IGNORECASE)
+
+
+class SharedNeo4jGraph(Neo4jGraph):
+    """``Neo4jGraph`` meant to be shared by the whole process.
+
+    The schema is not introspected at connect time. It is loaded the first
+    time it is asked for and reloaded only if a write ran since. Statements
+    passed to ``read_query`` are routed to read replicas when the URL points
+    to a cluster (a ``neo4j://`` scheme). Every statement runs in a metrics span.
+
+    Args:
+        url: Neo4j URL
+        username: Neo4j user
+        password: Neo4j password
+        database: Database name
+        driver_config: Options passed to the Neo4j driver, such as pool size and timeouts
+        timeout: Transaction timeout in seconds, or None for no timeout
+        route_reads: Send ``read_query`` statements to read replicas on clusters
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        database: str,
+        driver_config: dict = None,
+        timeout: float = None,
+        route_reads: bool = NEO4J_ROUTE_READS
+    ):
+        super().__init__(
+            url=url,
+            username=username,
+            password=password,
+            database=database,
+            timeout=timeout,
+            refresh_schema=False,
+            driver_config=driver_config,
+        )
+        self.url = url
+        self.database = database
+        self.route_reads = route_reads and str(url).lower().startswith("neo4j")
+        self._schema_stale = True
+        self._schema_lock = threading.Lock()
+
+    def query(self, query: str, *args, **kwargs):
+        with span("cypher_query", statement=statement_name(query)):
+            result = super().query(query, *args, **kwargs)
+        if _WRITE_CLAUSE.search(query):
+            self._schema_stale = True
+        return result
+
+    def read_query(self, query: str, params: dict = None) -> list[dict]:
+        """Run a read-only statement, on a read replica when reads are routed.
+
+        Args:
+            query: Cypher statement that does not write
+            params: Query parameters
+
+        Returns:
+            list[dict]: Result records, as ``query`` returns them
+        """
+        if not self.route_reads:
+            return self.query(query, params)
+        from neo4j import Query, RoutingControl
+
+        with span("cypher_query", statement=statement_name(query), routing="read"):
+            records, _, _ = self._driver.execute_query(
+                Query(text=query, timeout=self.timeout),
+                database_=self._database,
+                parameters_=params or {},
+                routing_=RoutingControl.READ,
+            )
+        return [record.data() for record in records]
+
+    def _ensure_schema(self) -> None:
+        with self._schema_lock:
+            if self._schema_stale:
+                self._schema_stale = False
+                self.refresh_schema()
+
+    @property
+    def get_schema(self) -> str:
+        """Returns the schema of the graph, loading it on first use."""
+        self._ensure_schema()
+        return self.schema
+
+    @property
+    def get_structured_schema(self) -> dict:
+        """Returns the structured schema of the graph, loading it on first use."""
+        self._ensure_schema()
+        return self.structured_schema
+
+
+class Neo4jConnectionManager:
+    """Hands out one shared graph, and so one driver pool, per database."""
+
+    def __init__(self):
+        self._graphs = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        url: str = NEO4J_URL,
+        username: str = NEO4J_USERNAME,
+        password: str = NEO4J_PASSWORD,
+        database: str = NEO4J_DATABASE
+    ) -> SharedNeo4jGraph:
+        """Return the shared graph for a database, connecting on first use.
+
+        Args:
+            url: Neo4j URL
+            username: Neo4j user
+            password: Neo4j password
+            database: Database name
+
+        Returns:
+            SharedNeo4jGraph: Graph backed by the shared driver pool
+        """
+        key = (url, username, database)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is None:
+                graph = self._graphs[key] = SharedNeo4jGraph(
+                    url=url,
+                    username=username,
+                    password=password,
+                    database=database,
+                    driver_config={
+                        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+                        "connection_timeout": NEO4J_CONNECTION_TIMEOUT,
+                        "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+                    },
+                    timeout=NEO4J_QUERY_TIMEOUT,
+                )
+            return graph
+
+    def close_all(self) -> None:
+        """Close every shared driver."""
+        with self._lock:
+            graphs = list(self._graphs.values())
+            self._graphs.clear()
+        for graph in graphs:
+            try:
+                graph.close()
+            except Exception:
+                pass
+
+
+# Process-wide manager used by create_neo4j_graph
+connections = Neo4jConnectionManager()
+atexit.register(connections.close_all)
@@ -0,0 +1,108 @@
+"""Retrieval and answer caches for graph queries."""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS
+from instrumentation import metrics
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(
+        self,
+        max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+        ttl: float = QUERY_CACHE_TTL_SECONDS,
+        name: str = "query"
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.inc("cache_lookups", cache=self.name, result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics.inc("cache_lookups", cache=self.name, result="hit")
+        return entry[1]
+
+    def put(self, key, value) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class QueryCache:
+    """Two-level cache for ``query_graph``.
+
+    The retrieval level maps normalized search terms to retrieved triples and
+    entities; the answer level maps a normalized question plus a hash of its
+    context to the synthesized answer. Both are emptied whenever the graph
+    version moves on, so no entry outlives the graph it was computed from.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.retrieval = TTLCache(max_entries, ttl, name="retrieval")
+        self.answers = TTLCache(max_entries, ttl, name="answers")
+        self.graph_version = None
+        self._lock = threading.Lock()
+
+    def sync_version(self, graph_version: int) -> None:
+        """Invalidate both levels if the graph changed since they were filled.
+
+        Args:
+            graph_version: Current graph version from ``get_graph_version``
+        """
+        with self._lock:
+            if graph_version != self.graph_version:
+                self.retrieval.clear()
+                self.answers.clear()
+                self.graph_version = graph_version
+
+    @staticmethod
+    def retrieval_key(terms: list[str]) -> tuple:
+        """Key retrieval results by the set of normalized search terms."""
+        return tuple(sorted({term.lower().strip() for term in terms}))
+
+    @staticmethod
+    def answer_key(question: str, graph_data: str) -> tuple:
+        """Key answers by the normalized question and a hash of its context."""
+        normalized = re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+        return normalized, hashlib.sha256(graph_data.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict:
+        """Return the counters of both levels."""
+        return {
+            "graph_version": self.graph_version,
+            "retrieval": self.retrieval.stats(),
+            "answers": self.answers.stats(),
+        }
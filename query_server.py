@@ -0,0 +1,261 @@
+"""Long-lived query server speaking JSON lines over TCP.
+
+Every line a client sends is one request, and every line the server sends
+back is one JSON object tagged with the ``id`` of the request it belongs to,
+so a client can pipeline many questions on one connection::
+
+    {"id": 1, "question": "Who won the Nobel Prize?", "stream": true}
+    {"op": "stats"}
+
+A question is answered with ``token`` messages while the answer is being
+generated (only when ``stream`` is true), then one ``answer`` message carrying
+the answer, entities, timings and context stats, or an ``error`` message. A
+stats request is answered with one ``stats`` message.
+"""
+import asyncio
+import json
+import time
+
+from config import (
+    QUERY_MIN_KEYWORD_RESULTS,
+    QUERY_SERVER_HOST,
+    QUERY_SERVER_PORT,
+    QUERY_SERVER_MAX_CONCURRENCY,
+    QUERY_SERVER_MAX_QUEUE,
+)
+from graph_query import astream_answer, retrieve_context
+from graph_storage import as_graph_store
+from instrumentation import Histogram, metrics
+from query_cache import QueryCache
+
+
+class QueryServer:
+    """Answers questions concurrently with one warm LLM client and graph.
+
+    Requests wait in a bounded queue served by ``max_concurrency`` workers.
+    When the queue is full a request is rejected right away with a ``busy``
+    error instead of piling up, and replies to a slow client wait for its
+    socket to drain. Retrieval runs in threads, because the graph stores are
+    synchronous, and synthesis is streamed from the LLM.
+
+    Args:
+        graph: Neo4j graph instance or graph store, opened once and reused
+        llm: LLM instance, reused by every request
+        max_concurrency: Number of questions answered at once
+        max_queue: Number of questions allowed to wait for a worker
+        cache: Retrieval and answer cache. Defaults to a new ``QueryCache``
+        min_keyword_results: See ``graph_query.run_query_pipeline``
+    """
+
+    def __init__(
+        self,
+        graph,
+        llm,
+        max_concurrency: int = QUERY_SERVER_MAX_CONCURRENCY,
+        max_queue: int = QUERY_SERVER_MAX_QUEUE,
+        cache: QueryCache = None,
+        min_keyword_results: int = QUERY_MIN_KEYWORD_RESULTS
+    ):
+        self.graph = as_graph_store(graph)
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.cache = cache if cache is not None else QueryCache()
+        self.min_keyword_results = min_keyword_results
+        self.started = time.time()
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.counts = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self.queue_wait = Histogram()
+        self.first_token = Histogram()
+        self.latency = Histogram()
+        self._queue = None
+        self._workers = []
+
+    async def start(self) -> None:
+        """Create the request queue and start the workers."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; questions still queued are dropped."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            *_, done = self._queue.get_nowait()
+            if done is not None:
+                done.cancel()
+
+    def submit(self, request: dict, send, done: asyncio.Future = None) -> bool:
+        """Queue a question for the workers.
+
+        Args:
+            request: Parsed request with ``question`` and optional ``id`` and ``stream``
+            send: Coroutine function that delivers one reply message
+            done: Future resolved once the last reply has been sent, or
+                cancelled if the server stops before answering
+
+        Returns:
+            bool: False if the queue was full and the request was rejected
+        """
+        try:
+            self._queue.put_nowait((request, send, time.perf_counter(), done))
+        except asyncio.QueueFull:
+            self.counts["rejected"] += 1
+            metrics.inc("server_requests", result="rejected")
+            return False
+        self.counts["accepted"] += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def stats(self) -> dict:
+        """Return queue depth, request counts and latency summaries in seconds."""
+        return {
+            "uptime": time.time() - self.started,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_capacity": self.max_queue,
+            "in_flight": self.in_flight,
+            "workers": self.max_concurrency,
+            **self.counts,
+            "queue_wait": self.queue_wait.summary(),
+            "first_token": self.first_token.summary(),
+            "latency": self.latency.summary(),
+            "cache": self.cache.stats(),
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            request, send, enqueued, done = await self._queue.get()
+            self.in_flight += 1
+            self.queue_wait.observe(time.perf_counter() - enqueued)
+            try:
+                await self._answer(request, send, enqueued)
+                self.counts["completed"] += 1
+                metrics.inc("server_requests", result="completed")
+            except Exception as e:
+                self.counts["failed"] += 1
+                metrics.inc("server_requests", result="failed")
+                await send({"id": request.get("id"), "type": "error", "error": str(e)})
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+                if done is not None and not done.done():
+                    done.set_result(None)
+
+    async def _answer(self, request: dict, send, enqueued: float) -> None:
+        request_id = request.get("id")
+        question = request.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("request needs a non-empty 'question'")
+        stream = bool(request.get("stream"))
+        timings = {"queue_wait": time.perf_counter() - enqueued}
+
+        start = time.perf_counter()
+        _, entities, context = await asyncio.to_thread(
+            retrieve_context,
+            question,
+            self.graph,
+            self.llm,
+            self.min_keyword_results,
+            self.cache,
+            timings
+        )
+        timings["retrieval"] = time.perf_counter() - start
+        graph_data = context.text
+
+        answer_key = self.cache.answer_key(question, graph_data)
+        answer = self.cache.answers.get(answer_key)
+        if answer is None:
+            start = time.perf_counter()
+            parts = []
+            async for text in astream_answer(question, graph_data, self.llm):
+                if not parts:
+                    timings["first_token"] = time.perf_counter() - enqueued
+                    self.first_token.observe(timings["first_token"])
+                parts.append(text)
+                if stream:
+                    await send({"id": request_id, "type": "token", "text": text})
+            answer = "".join(parts)
+            timings["synthesis"] = time.perf_counter() - start
+            self.cache.answers.put(answer_key, answer)
+        elif stream:
+            await send({"id": request_id, "type": "token", "text": answer})
+
+        timings["total"] = time.perf_counter() - enqueued
+        self.latency.observe(timings["total"])
+        metrics.observe("server_request_seconds", timings["total"])
+        await send({
+            "id": request_id,
+            "type": "answer",
+            "answer": answer,
+            "entities": entities,
+            "timings": timings,
+            "context": context.stats,
+        })
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one client connection until it closes.
+
+        A client may half-close its end right after sending its questions, so
+        the connection is only closed once every question it submitted has
+        been answered.
+        """
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def send(message: dict) -> None:
+            async with lock:
+                if writer.is_closing():
+                    return
+                writer.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    await send({"id": None, "type": "error", "error": f"invalid request: {e}"})
+                    continue
+                if request.get("op") == "stats":
+                    await send({"id": request.get("id"), "type": "stats", **self.stats()})
+                else:
+                    done = asyncio.get_running_loop().create_future()
+                    if self.submit(request, send, done):
+                        pending.add(done)
+                        done.add_done_callback(pending.discard)
+                    else:
+                        await send({"id": request.get("id"), "type": "error", "error": "busy"})
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def serve(self, host: str = QUERY_SERVER_HOST, port: int = QUERY_SERVER_PORT) -> None:
+        """Start the workers and serve clients until cancelled.
+
+        Args:
+            host: Interface to listen on
+            port: TCP port to listen on
+        """
+        await self.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Query server listening on {host}:{port} "
+              f"({self.max_concurrency} workers, queue of {self.max_queue})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
@@ -0,0 +1,125 @@
+"""Request/token rate limiting and backoff for LLM calls."""
+import random
+import threading
+import time
+
+
+RATE_LIMIT_MARKERS = (
+    "429",
+    "quota",
+    "rate limit",
+    "ratelimit",
+    "resource exhausted",
+    "resourceexhausted",
+    "too many requests",
+)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an exception signals a 429/quota response.
+
+    Args:
+        error: Exception raised by the LLM client
+
+    Returns:
+        bool: True if the error looks like a rate limit or quota error
+    """
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Compute an exponential backoff delay with full jitter.
+
+    Args:
+        attempt: Zero-based retry attempt number
+        base: Delay for the first retry in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        float: Number of seconds to sleep before retrying
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """Thread-safe token-bucket limiter for requests and tokens per minute.
+
+    The effective rate is scaled by an adaptive factor: ``penalize`` halves it
+    after a 429/quota error and ``reward`` slowly restores it on success.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = None,
+        tokens_per_minute: float = None,
+        min_rate_factor: float = 0.1
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_rate_factor = min_rate_factor
+        self._factor = 1.0
+        self._lock = threading.Lock()
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+
+    @property
+    def rate_factor(self) -> float:
+        """Current fraction of the configured budget being used."""
+        return self._factor
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            capacity = self.requests_per_minute * self._factor
+            self._request_allowance = min(
+                capacity, self._request_allowance + elapsed * capacity / 60.0
+            )
+        if self.tokens_per_minute:
+            capacity = self.tokens_per_minute * self._factor
+            self._token_allowance = min(
+                capacity, self._token_allowance + elapsed * capacity / 60.0
+            )
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request costing ``tokens`` fits in the budget.
+
+        Args:
+            tokens: Estimated number of tokens the request will consume
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute:
+                    rate = self.requests_per_minute * self._factor / 60.0
+                    if self._request_allowance < 1:
+                        wait = max(wait, (1 - self._request_allowance) / rate)
+                if self.tokens_per_minute and tokens:
+                    capacity = self.tokens_per_minute * self._factor
+                    # Requests larger than the whole bucket wait for a full bucket
+                    needed = min(tokens, capacity)
+                    rate = capacity / 60.0
+                    if self._token_allowance < needed:
+                        wait = max(wait, (needed - self._token_allowance) / rate)
+                if wait == 0.0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute and tokens:
+                        self._token_allowance -= tokens
+                    return
+            time.sleep(wait)
+
+    def penalize(self) -> None:
+        """Halve the effective rate after a rate limit error."""
+        with self._lock:
+            self._factor = max(self.min_rate_factor, self._factor * 0.5)
+            self._request_allowance = min(self._request_allowance, 0.0)
+
+    def reward(self) -> None:
+        """Gradually restore the effective rate after a successful call."""
+        with self._lock:
+            self._factor = min(1.0, self._factor + 0.05)
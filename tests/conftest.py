@@ -0,0 +1,33 @@
+"""Shared fixtures. Every test runs offline, against the fakes in ``fakes.py``."""
+import pytest
+from langchain_core.documents import Document
+
+from benchmark import FakeChatModel
+from graph_store import InMemoryGraphStore
+
+from fakes import scientist_documents
+
+
+@pytest.fixture
+def fake_llm():
+    return FakeChatModel()
+
+
+@pytest.fixture
+def chunks():
+    """Chunks naming a few people, places and prizes, from two sources."""
+    texts = [
+        ("a.txt", "Albert Einstein was born in Ulm. Albert Einstein won the Nobel Prize."),
+        ("a.txt", "Marie Curie worked at Sorbonne University with Pierre Curie."),
+        ("b.txt", "Niels Bohr lived in Copenhagen and developed Quantum Theory."),
+    ]
+    return [Document(page_content=text, metadata={"source": source}) for source, text in texts]
+
+
+@pytest.fixture
+def store():
+    """In-memory store holding ``fakes.SCIENTISTS``."""
+    graph = InMemoryGraphStore()
+    graph.upsert(scientist_documents())
+    graph.bump_version()
+    return graph
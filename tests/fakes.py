@@ -0,0 +1,108 @@
+"""Offline stand-ins for the chat model and ``Neo4jGraph``."""
+import json
+import re
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from pydantic import Field
+
+from benchmark import FakeChatModel
+
+
+class FlakyChatModel(FakeChatModel):
+    """``FakeChatModel`` that fails on chosen prompts.
+
+    Prompts containing ``fail_marker`` raise ``ValueError``. The first
+    ``rate_limited_calls`` calls raise a 429-style error instead. Batch
+    responses leave out the chunks whose ids are in ``dropped_chunks``. With
+    ``content_parts``, content comes as a list of text parts, as Gemini may
+    return it.
+    """
+
+    fail_marker: str = ""
+    rate_limited_calls: int = 0
+    dropped_chunks: list = Field(default_factory=list)
+    content_parts: bool = False
+    calls: int = 0
+
+    def _respond(self, text: str) -> str:
+        response = super()._respond(text)
+        if self.dropped_chunks and "from each of the following texts" in text:
+            parsed = json.loads(response)
+            parsed["chunks"] = [chunk for chunk in parsed["chunks"] if chunk["id"] not in self.dropped_chunks]
+            response = json.dumps(parsed)
+        return response
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls <= self.rate_limited_calls:
+            raise RuntimeError("429 Resource exhausted: quota exceeded")
+        if self.fail_marker and self.fail_marker in str(messages[-1].content):
+            raise ValueError("model refused the chunk")
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        if self.content_parts:
+            message = result.generations[0].message
+            text = message.content
+            message.content = [{"type": "text", "text": text[:len(text) // 2]},
+                               {"type": "text", "text": text[len(text) // 2:]}]
+        return result
+
+
+class FakeNeo4jGraph:
+    """Records every statement and answers it with the first matching script entry.
+
+    Args:
+        script: (regex, response) pairs; a response is a list of records or a
+            callable taking the parameters and returning one
+    """
+
+    def __init__(self, script: list = ()):
+        self.script = list(script)
+        self.queries = []
+
+    def query(self, query: str, params: dict = None) -> list[dict]:
+        self.queries.append((query, params or {}))
+        for pattern, response in self.script:
+            if re.search(pattern, query):
+                return response(params or {}) if callable(response) else response
+        return []
+
+
+def make_graph_document(triples: list, chunk_id: str = None, source: str = "a.txt") -> GraphDocument:
+    """Graph document of (head, head type, relationship, tail, tail type) triples."""
+    nodes = {}
+    relationships = []
+    for head, head_type, rel_type, tail, tail_type in triples:
+        source_node = nodes.setdefault((head, head_type), Node(id=head, type=head_type))
+        target_node = nodes.setdefault((tail, tail_type), Node(id=tail, type=tail_type))
+        relationships.append(Relationship(source=source_node, target=target_node, type=rel_type))
+    metadata = {"source": source}
+    if chunk_id is not None:
+        metadata["chunk_id"] = chunk_id
+    return GraphDocument(
+        nodes=list(nodes.values()),
+        relationships=relationships,
+        source=Document(page_content=" ".join(str(part) for triple in triples for part in triple), metadata=metadata),
+    )
+
+
+SCIENTISTS = [
+    ("c1", "a.txt", [
+        ("Albert Einstein", "Person", "BORN_IN", "Ulm", "Location"),
+        ("Albert Einstein", "Person", "WON", "Nobel Prize", "Event"),
+    ]),
+    ("c2", "a.txt", [
+        ("Marie Curie", "Person", "WORKS_AT", "Sorbonne University", "Organization"),
+        ("Pierre Curie", "Person", "WORKS_AT", "Sorbonne University", "Organization"),
+    ]),
+    ("c3", "b.txt", [
+        ("Niels Bohr", "Person", "LIVES_IN", "Copenhagen", "Location"),
+        ("Niels Bohr", "Person", "DEVELOPED", "Quantum Theory", "Theory"),
+    ]),
+]
+
+
+def scientist_documents() -> list[GraphDocument]:
+    """Graph documents of a few scientists, three chunks from two sources."""
+    return [make_graph_document(triples, chunk_id, source) for chunk_id, source, triples in SCIENTISTS]
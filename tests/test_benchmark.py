@@ -0,0 +1,44 @@
+"""Offline benchmark harness."""
+import json
+
+from benchmark import FakeChatModel, make_synthetic_corpus, run_benchmark
+from document_loader import load_and_split_documents
+
+
+def test_synthetic_corpus_is_reproducible(tmp_path):
+    names = make_synthetic_corpus(30, str(tmp_path / "one.txt"), seed=7)
+    same = make_synthetic_corpus(30, str(tmp_path / "two.txt"), seed=7)
+    make_synthetic_corpus(30, str(tmp_path / "three.txt"), seed=8)
+
+    assert names == same
+    assert (tmp_path / "one.txt").read_text() == (tmp_path / "two.txt").read_text()
+    assert (tmp_path / "one.txt").read_text() != (tmp_path / "three.txt").read_text()
+    assert len(load_and_split_documents(str(tmp_path / "one.txt"), chunking_mode="characters")) == 30
+
+
+def test_fake_model_extracts_relationships_between_names(fake_llm):
+    prompt = "Extract entities and relationships from the following text\n\nMarie Curie worked at Sorbonne University."
+
+    first = fake_llm.invoke(prompt).content
+    second = FakeChatModel().invoke(prompt).content
+
+    assert first == second
+    relationships = json.loads(first)
+    assert {rel["head"] for rel in relationships} == {"Marie Curie", "Sorbonne University"}
+    assert len(fake_llm.call_latencies) == 1
+
+
+def test_fake_model_answers_entity_prompts_with_question_names(fake_llm):
+    response = fake_llm.invoke("List the key entities (one per line):\nQuestion: Where did Niels Bohr live?")
+
+    assert response.content.splitlines() == ["Where", "Niels Bohr"]
+
+
+def test_benchmark_reports_every_stage():
+    report = run_benchmark(20, num_questions=3, trace_memory=False, seed=1)
+
+    assert set(report["stages"]) == {"load", "extract", "resolve", "store", "communities", "entity_index", "query"}
+    assert report["stages"]["load"]["items"] == 20
+    assert report["stages"]["extract"]["latency_ms"]["count"] == 20
+    assert report["stages"]["query"]["items"] == 3
+    assert report["graph"]["nodes"] > 0
@@ -0,0 +1,82 @@
+"""Community detection and summaries."""
+import graph_query
+from communities import _parse_summary, community_id, detect_communities, update_communities
+from graph_query import run_query_pipeline
+
+from fakes import FlakyChatModel, make_graph_document
+
+
+def _triangle(a: str, b: str, c: str) -> list:
+    return [(a, "RELATED_TO", b), (b, "RELATED_TO", c), (c, "RELATED_TO", a)]
+
+
+def test_densely_connected_groups_become_communities():
+    edges = [*_triangle("A", "B", "C"), *_triangle("D", "E", "F"), ("C", "RELATED_TO", "D"), ("G", "RELATED_TO", "H")]
+
+    communities = detect_communities(edges)
+
+    assert communities == [["A", "B", "C"], ["D", "E", "F"], ["G", "H"]]
+    assert detect_communities(list(reversed(edges))) == communities
+
+
+def test_community_id_depends_only_on_members():
+    assert community_id(["b", "a", "c"]) == community_id(["a", "b", "c"])
+    assert community_id(["a", "b"]) != community_id(["a", "b", "c"])
+
+
+def test_summary_title_is_taken_from_the_first_line():
+    assert _parse_summary("## Title: Physics\nBohr and Einstein.", ["Niels Bohr"]) == ("Physics", "Bohr and Einstein.")
+    assert _parse_summary("", ["Niels Bohr", "Copenhagen"]) == ("Niels Bohr, Copenhagen", "")
+
+
+def test_only_changed_communities_are_summarized_again(store, fake_llm):
+    first = update_communities(store, fake_llm)
+    calls = len(fake_llm.call_latencies)
+
+    again = update_communities(store, fake_llm)
+    store.clear(source="b.txt")
+    store.upsert([make_graph_document([
+        ("Max Planck", "Person", "WORKS_AT", "Berlin University", "Organization"),
+        ("Max Planck", "Person", "BORN_IN", "Kiel", "Location"),
+    ], "c4", "c.txt")])
+    changed = update_communities(store, fake_llm)
+
+    assert (first["communities"], first["summarized"]) == (3, 3)
+    assert (again["summarized"], again["reused"]) == (0, 3)
+    assert (changed["summarized"], changed["reused"], changed["removed"]) == (1, 2, 1)
+    assert len(fake_llm.call_latencies) == calls + 1
+    assert any("Max Planck" in community["members"] for community in store.get_communities().values())
+
+
+def test_failed_summaries_are_counted_and_retried_next_time(store):
+    failed = update_communities(store, FlakyChatModel(fail_marker="Niels Bohr"))
+    retried = update_communities(store, FlakyChatModel())
+
+    assert (failed["summarized"], failed["failed"]) == (2, 1)
+    assert (retried["summarized"], retried["reused"]) == (1, 2)
+
+
+def test_broad_questions_are_answered_from_summaries(store, fake_llm, monkeypatch):
+    monkeypatch.setattr(graph_query, "COMMUNITY_SUMMARIES_ENABLED", True)
+    update_communities(store, fake_llm)
+
+    result = run_query_pipeline("What are the main themes about Bohr?", store, fake_llm)
+
+    assert "summary" in result.results[0]
+    assert "Niels Bohr" in result.results[0]["members"]
+
+
+def test_summaries_are_not_used_while_disabled(store, fake_llm, monkeypatch):
+    monkeypatch.setattr(graph_query, "COMMUNITY_SUMMARIES_ENABLED", False)
+    update_communities(store, fake_llm)
+
+    result = run_query_pipeline("What are the main themes about Bohr?", store, fake_llm)
+
+    assert all("summary" not in record for record in result.results)
+
+
+def test_summaries_given_as_content_parts_are_joined(store):
+    update_communities(store, FlakyChatModel(content_parts=True))
+
+    assert all(isinstance(community["summary"], str) and community["title"]
+               for community in store.get_communities().values())
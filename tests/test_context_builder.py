@@ -0,0 +1,78 @@
+"""Token-budgeted answer context."""
+from context_builder import EMPTY_CONTEXT, build_context
+from llm_setup import estimate_tokens
+
+
+def _record(head: str, rel: str, tail: str, hits: int = 1) -> dict:
+    n, m = {"id": head}, {"id": tail}
+    return {"n": n, "r": (n, rel, m), "m": m, "hits": hits}
+
+
+def test_triples_are_rendered_compactly():
+    context = build_context([_record("Albert Einstein", "BORN_IN", "Ulm")])
+
+    assert context.text == "Albert Einstein -[BORN_IN]-> Ulm"
+    assert context.stats["tokens"] == estimate_tokens(context.text)
+    assert context.stats["tokens_saved"] > 0
+
+
+def test_repeated_triples_are_kept_once_with_hits_summed():
+    results = [
+        _record("Marie Curie", "WORKS_AT", "Sorbonne University"),
+        _record("Niels Bohr", "LIVES_IN", "Copenhagen", hits=2),
+        _record("Marie Curie", "WORKS_AT", "Sorbonne University", hits=2),
+    ]
+
+    context = build_context(results)
+
+    assert context.text.splitlines() == [
+        "Marie Curie -[WORKS_AT]-> Sorbonne University",
+        "Niels Bohr -[LIVES_IN]-> Copenhagen",
+    ]
+    assert (context.stats["triples"], context.stats["unique_triples"], context.stats["used_triples"]) == (3, 2, 2)
+
+
+def test_triples_mentioning_more_terms_rank_first():
+    results = [
+        _record("Niels Bohr", "LIVES_IN", "Copenhagen", hits=5),
+        _record("Albert Einstein", "WON", "Nobel Prize"),
+        _record("Albert Einstein", "BORN_IN", "Ulm"),
+    ]
+
+    context = build_context(results, terms=["Einstein", "born", "?"])
+
+    assert context.text.splitlines() == [
+        "Albert Einstein -[BORN_IN]-> Ulm",
+        "Albert Einstein -[WON]-> Nobel Prize",
+        "Niels Bohr -[LIVES_IN]-> Copenhagen",
+    ]
+
+
+def test_context_stops_at_the_token_budget():
+    results = [_record(f"Scientist {i}", "WORKS_AT", f"University {i}") for i in range(100)]
+    line_tokens = estimate_tokens("Scientist 10 -[WORKS_AT]-> University 10\n")
+
+    context = build_context(results, max_tokens=5 * line_tokens)
+
+    assert context.stats["used_triples"] == 5
+    assert context.stats["tokens"] <= 5 * line_tokens
+    assert build_context(results, max_tokens=None).stats["used_triples"] == 100
+
+
+def test_top_triple_is_kept_even_over_budget():
+    context = build_context([_record("Albert Einstein", "BORN_IN", "Ulm")], max_tokens=1)
+
+    assert context.stats["used_triples"] == 1
+
+
+def test_community_summaries_become_one_line():
+    context = build_context([{"id": "c-1", "title": "Physics", "summary": "Bohr and Einstein debated."}])
+
+    assert context.text == "Community summary: Physics: Bohr and Einstein debated."
+
+
+def test_empty_results_fall_back_to_the_placeholder():
+    context = build_context([])
+
+    assert context.text == EMPTY_CONTEXT
+    assert context.stats["used_triples"] == 0
@@ -0,0 +1,125 @@
+"""Corpus loading and chunking."""
+from document_loader import (
+    iter_document_chunks,
+    iter_source_files,
+    load_and_split_documents,
+    split_text_by_tokens,
+)
+from llm_setup import estimate_tokens
+
+
+def _paragraphs(count: int) -> str:
+    return "\n\n".join(f"Paragraph {i} talks about Albert Einstein and Ulm." for i in range(count))
+
+
+def test_source_files_are_expanded_in_sorted_order(tmp_path):
+    (tmp_path / "nested").mkdir()
+    for name in ("b.txt", "a.md", "skip.csv", "nested/c.txt"):
+        (tmp_path / name).write_text("text")
+
+    assert list(iter_source_files(str(tmp_path))) == [
+        str(tmp_path / "a.md"), str(tmp_path / "b.txt"), str(tmp_path / "nested" / "c.txt")
+    ]
+    assert list(iter_source_files(str(tmp_path / "*.txt"))) == [str(tmp_path / "b.txt")]
+    assert list(iter_source_files([str(tmp_path / "b.txt"), str(tmp_path / "a.md")])) == [
+        str(tmp_path / "b.txt"), str(tmp_path / "a.md")
+    ]
+
+
+def test_streamed_chunks_match_the_whole_file_loader(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text(_paragraphs(3000))
+
+    streamed = list(iter_document_chunks(str(path)))
+    loaded = load_and_split_documents(str(path))
+
+    assert [chunk.page_content for chunk in streamed] == [chunk.page_content for chunk in loaded]
+    assert [chunk.metadata for chunk in streamed] == [chunk.metadata for chunk in loaded]
+
+
+def test_chunk_offsets_point_into_the_file(tmp_path):
+    path = tmp_path / "input.txt"
+    text = _paragraphs(40)
+    path.write_text(text)
+
+    chunks = list(iter_document_chunks(str(path), read_size=100))
+
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert text[start:start + len(chunk.page_content)] == chunk.page_content
+
+
+def test_text_without_paragraph_breaks_is_still_cut(tmp_path):
+    path = tmp_path / "input.txt"
+    text = " ".join(["word"] * 500)
+    path.write_text(text)
+
+    chunks = list(iter_document_chunks(str(path), read_size=64))
+
+    assert len(chunks) > 1
+    assert all(len(chunk.page_content) < 5 * 64 for chunk in chunks)
+    assert "".join(chunk.page_content for chunk in chunks).replace(" ", "") == text.replace(" ", "")
+
+
+# Each sentence is 40 characters, 10 estimated tokens
+SENTENCE = "Albert Einstein was born in Ulm in 1879."
+
+
+def _text(count: int) -> str:
+    return " ".join([SENTENCE] * count)
+
+
+def test_chunks_stay_within_the_budget_and_end_on_sentences():
+    text = _text(20)
+
+    chunks = split_text_by_tokens(text, token_budget=50, overlap_tokens=0)
+
+    # Sentences are budgeted by their own tokens, the spaces between them are free
+    assert len(chunks) == 4
+    for start, chunk in chunks:
+        assert chunk == _text(5)
+        assert chunk.startswith("Albert") and chunk.endswith(".")
+        assert text[start:start + len(chunk)] == chunk
+
+
+def test_sentences_are_packed_rather_than_split_one_per_chunk():
+    chunks = split_text_by_tokens(_text(10), token_budget=1000, overlap_tokens=100)
+
+    assert chunks == [(0, _text(10))]
+
+
+def test_trailing_sentences_overlap_into_the_next_chunk():
+    chunks = split_text_by_tokens(_text(20), token_budget=50, overlap_tokens=20)
+
+    for (start, chunk), (next_start, next_chunk) in zip(chunks, chunks[1:]):
+        assert next_start < start + len(chunk)
+        overlap = chunk[next_start - start:]
+        assert overlap == _text(2)
+        assert next_chunk.startswith(overlap)
+
+
+def test_overlap_never_repeats_a_whole_chunk():
+    chunks = split_text_by_tokens(_text(6), token_budget=10, overlap_tokens=10)
+
+    assert [start for start, _ in chunks] == sorted({start for start, _ in chunks})
+    assert len(chunks) == 6
+
+
+def test_sentences_longer_than_the_budget_are_split_at_whitespace():
+    text = " ".join(["word"] * 100)
+
+    chunks = split_text_by_tokens(text, token_budget=20, overlap_tokens=0)
+
+    assert all(estimate_tokens(chunk) <= 20 for _, chunk in chunks)
+    assert " ".join(chunk for _, chunk in chunks).split() == text.split()
+
+
+def test_token_mode_packs_paragraphs_into_fewer_chunks(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("\n\n".join([SENTENCE] * 50))
+
+    by_characters = list(iter_document_chunks(str(path), chunking_mode="characters"))
+    by_tokens = list(iter_document_chunks(str(path), chunking_mode="tokens"))
+
+    assert len(by_tokens) < len(by_characters)
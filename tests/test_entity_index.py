@@ -0,0 +1,97 @@
+"""Fuzzy linking of question terms to node ids."""
+import pytest
+
+import entity_index
+from entity_index import EntityIndex, _index_path, vectorize
+from graph_storage import Neo4jGraphStore
+from graph_store import InMemoryGraphStore
+
+from fakes import FakeNeo4jGraph, make_graph_document
+
+
+def _linked(index: EntityIndex, term: str) -> list[str]:
+    return [node_id for node_id, _ in index.link([term])[term]]
+
+
+@pytest.fixture
+def index(store):
+    index = EntityIndex()
+    index.refresh(store)
+    return index
+
+
+def test_vectors_are_unit_length():
+    vectors = vectorize(["Albert Einstein", "Ulm", ""])
+
+    assert vectors.shape == (3, entity_index.ENTITY_INDEX_DIMENSIONS)
+    assert vectors[0] @ vectors[0] == pytest.approx(1.0)
+    assert not vectors[2].any()
+
+
+def test_misspelled_and_partial_names_are_linked(index):
+    assert _linked(index, "Einstien")[0] == "Albert Einstein"
+    assert _linked(index, "sorbone")[0] == "Sorbonne University"
+    assert _linked(index, "copenhagen")[0] == "Copenhagen"
+    assert _linked(index, "xylophone") == []
+
+
+def test_each_node_is_linked_once_per_term(index):
+    assert _linked(index, "Curie") in (["Marie Curie", "Pierre Curie"], ["Pierre Curie", "Marie Curie"])
+
+
+def test_refresh_vectorizes_only_changed_nodes(store, index):
+    unchanged = index.refresh(store)
+    store.upsert([make_graph_document([("Max Planck", "Person", "BORN_IN", "Kiel", "Location")], "c4", "c.txt")])
+    added = index.refresh(store)
+    store.clear(source="b.txt")
+    removed = index.refresh(store)
+
+    assert (unchanged["added"], unchanged["removed"]) == (0, 0)
+    assert (added["added"], added["nodes"]) == (2, 11)
+    assert (removed["removed"], removed["nodes"]) == (3, 8)
+    assert _linked(index, "Planck") == ["Max Planck"]
+    assert _linked(index, "Bohr") == []
+    assert _linked(index, "Einstein")[0] == "Albert Einstein"
+
+
+def test_saved_index_reopens_with_the_same_links(store, tmp_path):
+    path = str(tmp_path / "entities.npy")
+    EntityIndex(path).refresh(store)
+
+    reopened = EntityIndex(path)
+
+    assert len(reopened) == 9
+    assert reopened.version == store.get_version()
+    assert _linked(reopened, "Einstien")[0] == "Albert Einstein"
+    assert len(EntityIndex(path, dimensions=64)) == 0
+
+
+def test_queries_reload_a_newer_saved_index_without_reading_nodes(store, tmp_path, monkeypatch):
+    path = str(tmp_path / "entities.npy")
+    EntityIndex(path).refresh(store)
+    query_side = EntityIndex(path)
+    store.upsert([make_graph_document([("Max Planck", "Person", "BORN_IN", "Kiel", "Location")], "c4", "c.txt")])
+    store.bump_version()
+    EntityIndex(path).refresh(store)
+
+    monkeypatch.setattr(entity_index, "ENTITY_INDEX_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(store, "node_keys", lambda: pytest.fail("queries must not read the node keys"))
+
+    assert query_side.reload(store)
+    assert _linked(query_side, "Planck") == ["Max Planck"]
+    assert not query_side.reload(store)
+
+
+def test_index_files_are_kept_per_store():
+    def neo4j_store(url, database):
+        graph = FakeNeo4jGraph()
+        graph.url, graph.database = url, database
+        return Neo4jGraphStore(graph)
+
+    assert _index_path(InMemoryGraphStore("data/graph.bin")) == "data/graph.entities.npy"
+    assert _index_path(InMemoryGraphStore()) is None
+    first = _index_path(neo4j_store("bolt://a:7687", "neo4j"))
+    assert first == _index_path(neo4j_store("bolt://a:7687", "neo4j"))
+    assert first != _index_path(neo4j_store("bolt://b:7687", "neo4j"))
+    assert first != _index_path(neo4j_store("bolt://a:7687", "movies"))
+    assert "/" not in _index_path(neo4j_store("bolt://a:7687", "../x")).rsplit("entity_index", 1)[1]
@@ -0,0 +1,101 @@
+"""Merging name variants of the same entity."""
+from entity_resolution import normalize_entity_name, resolve_entities
+
+from fakes import make_graph_document
+
+
+def _ids(documents) -> set:
+    return {(node.id, node.type) for doc in documents for node in doc.nodes}
+
+
+def test_names_are_normalized():
+    assert normalize_entity_name("Albert Einstein's") == "albert einstein"
+    assert normalize_entity_name("  The  Sorbonne ") == "sorbonne"
+    assert normalize_entity_name("Zürich") == "zurich"
+
+
+def test_variants_merge_into_the_most_specific_name():
+    documents = [
+        make_graph_document([("Albert Einstein", "Person", "BORN_IN", "Ulm", "Location")], "c1"),
+        make_graph_document([("Einstein", "Person", "WON", "Nobel Prize", "Event")], "c2"),
+        make_graph_document([("albert einstein's", "Person", "LIVES_IN", "Zürich", "Location")], "c3"),
+        make_graph_document([("Einstein, Albert", "Person", "LIVES_IN", "Zurich", "Location")], "c4"),
+    ]
+
+    resolved, stats = resolve_entities(documents)
+
+    assert _ids(resolved) == {
+        ("Albert Einstein", "Person"), ("Ulm", "Location"), ("Nobel Prize", "Event"), ("Zürich", "Location")
+    }
+    assert stats["entities_before"] == 8
+    assert stats["entities_after"] == 4
+    assert [rel.source.id for doc in resolved for rel in doc.relationships] == ["Albert Einstein"] * 4
+
+
+def test_ambiguous_single_word_names_are_not_merged():
+    documents = [make_graph_document([
+        ("Marie Curie", "Person", "WORKS_AT", "Sorbonne University", "Organization"),
+        ("Pierre Curie", "Person", "WORKS_AT", "Sorbonne University", "Organization"),
+        ("Curie", "Person", "WON", "Nobel Prize", "Event"),
+    ], "c1")]
+
+    resolved, stats = resolve_entities(documents)
+
+    assert {"Marie Curie", "Pierre Curie", "Curie"} <= {node.id for node in resolved[0].nodes}
+    assert stats["entities_merged"] == 0
+
+
+def test_names_only_merge_within_a_type():
+    documents = [make_graph_document([
+        ("Washington", "Person", "LIVES_IN", "Washington", "Location"),
+    ], "c1")]
+
+    resolved, _ = resolve_entities(documents)
+
+    assert _ids(resolved) == {("Washington", "Person"), ("Washington", "Location")}
+    assert len(resolved[0].relationships) == 1
+
+
+def test_duplicate_and_self_loop_relationships_are_dropped():
+    documents = [make_graph_document([
+        ("Albert Einstein", "Person", "BORN_IN", "Ulm", "Location"),
+        ("Einstein, Albert", "Person", "BORN_IN", "Ulm", "Location"),
+        ("Albert Einstein", "Person", "RELATED_TO", "Einstein, Albert", "Person"),
+    ], "c1")]
+
+    resolved, stats = resolve_entities(documents)
+
+    assert [(rel.source.id, rel.type, rel.target.id) for rel in resolved[0].relationships] == [
+        ("Albert Einstein", "BORN_IN", "Ulm")
+    ]
+    assert stats["relationships_dropped"] == 2
+    assert resolved[0].source.metadata["chunk_id"] == "c1"
+
+
+def test_tokens_in_too_many_names_are_not_compared():
+    names = [f"Sorbonne {suffix}" for suffix in ("Universitys", "Universitiy", "Universiti")]
+    documents = [make_graph_document([(name, "Organization", "RELATED_TO", "Paris", "Location") for name in names], "c1")]
+
+    _, blocked = resolve_entities(documents, max_block_size=2)
+    _, compared = resolve_entities(documents, max_block_size=10)
+
+    assert blocked["comparisons"] == 0
+    assert compared["comparisons"] == 3
+
+
+def test_names_differing_in_a_year_or_ordinal_are_not_merged():
+    documents = [make_graph_document([
+        ("Albert Einstein", "Person", "WON", "Nobel Prize In Physics 1921", "Event"),
+        ("Niels Bohr", "Person", "WON", "Nobel Prize In Physics 1922", "Event"),
+        ("Niels Bohr", "Person", "INVOLVED_IN", "5th Solvay Conference", "Event"),
+        ("Albert Einstein", "Person", "INVOLVED_IN", "6th Solvay Conference", "Event"),
+        ("Marie Curie", "Person", "INVOLVED_IN", "6th Solvay Conference.", "Event"),
+    ], "c1")]
+
+    resolved, stats = resolve_entities(documents)
+
+    assert {node.id for node in resolved[0].nodes if node.type == "Event"} == {
+        "Nobel Prize In Physics 1921", "Nobel Prize In Physics 1922",
+        "5th Solvay Conference", "6th Solvay Conference",
+    }
+    assert stats["entities_merged"] == 1
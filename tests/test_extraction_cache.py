@@ -0,0 +1,79 @@
+"""Content-addressed extraction cache with LRU eviction."""
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from extraction_cache import ExtractionCache, make_extraction_key
+from graph_extraction import create_batch_extraction_prompt, create_extraction_prompt, extract_graph_documents_concurrently
+
+
+def _graph_document(name: str) -> GraphDocument:
+    person, place = Node(id=name, type="Person"), Node(id="Ulm", type="Location")
+    return GraphDocument(
+        nodes=[person, place],
+        relationships=[Relationship(source=person, target=place, type="BORN_IN")],
+        source=Document(page_content=f"{name} was born in Ulm."),
+    )
+
+
+def test_key_covers_text_prompt_model_and_schema():
+    prompt = create_extraction_prompt()
+    key = make_extraction_key("text", prompt, "model", 0)
+
+    assert key == make_extraction_key("text", prompt, "model", 0)
+    assert key != make_extraction_key("other text", prompt, "model", 0)
+    assert key != make_extraction_key("text", create_batch_extraction_prompt(), "model", 0)
+    assert key != make_extraction_key("text", prompt, "other model", 0)
+    assert key != make_extraction_key("text", prompt, "model", 0.5)
+    assert key != make_extraction_key("text", prompt, "model", 0, allowed_nodes=["Person"])
+
+
+def test_round_trip_attaches_the_given_source(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    cache.put("k", _graph_document("Albert Einstein"))
+    chunk = Document(page_content="Albert Einstein was born in Ulm.", metadata={"source": "a.txt"})
+
+    cached = cache.get("k", source=chunk)
+
+    assert [node.id for node in cached.nodes] == ["Albert Einstein", "Ulm"]
+    assert cached.relationships[0].type == "BORN_IN"
+    assert cached.source is chunk
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("extraction_cache.time.time", lambda: next(clock))
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", _graph_document("A"))
+    cache.put("b", _graph_document("B"))
+    cache.get("a")
+
+    cache.put("c", _graph_document("C"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_cap_holds_across_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = ExtractionCache(path, max_entries=3), ExtractionCache(path, max_entries=3)
+
+    for i in range(8):
+        (first if i % 2 else second).put(f"k{i}", _graph_document(str(i)))
+
+    assert first.stats()["entries"] == 3
+    assert second.stats()["entries"] == 3
+
+
+def test_cache_hits_skip_the_llm(tmp_path, fake_llm, chunks):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    extract_graph_documents_concurrently(chunks, fake_llm, requests_per_minute=None, cache=cache)
+    calls = len(fake_llm.call_latencies)
+
+    results, failures = extract_graph_documents_concurrently(chunks, fake_llm, requests_per_minute=None, cache=cache)
+
+    assert len(fake_llm.call_latencies) == calls
+    assert failures == []
+    assert [result.source.page_content for result in results] == [chunk.page_content for chunk in chunks]
@@ -0,0 +1,171 @@
+"""Concurrent, rate-limited extraction of chunks into graph documents."""
+import json
+
+import pytest
+
+import graph_extraction
+from graph_extraction import (
+    _parse_batch_response,
+    extract_graph_documents_concurrently,
+    extract_graph_from_documents,
+)
+from extraction_cache import ExtractionCache
+
+from fakes import FlakyChatModel
+
+
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(graph_extraction, "backoff_delay", lambda attempt: 0)
+
+
+def test_results_keep_chunk_order(fake_llm, chunks):
+    results, failures = extract_graph_documents_concurrently(
+        chunks, fake_llm, max_concurrency=3, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert failures == []
+    assert [result.source.page_content for result in results] == [chunk.page_content for chunk in chunks]
+    assert {node.id for node in results[0].nodes} >= {"Albert Einstein", "Ulm"}
+
+
+def test_failed_chunk_is_reported_and_others_are_kept(chunks):
+    llm = FlakyChatModel(fail_marker="Marie Curie")
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks, llm, max_concurrency=2, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert [failure.index for failure in failures] == [1]
+    assert failures[0].source == {"source": "a.txt"}
+    assert "ValueError" in failures[0].error
+    assert results[1] is None
+    assert results[0] is not None and results[2] is not None
+
+
+def test_rate_limit_errors_are_retried(monkeypatch, chunks):
+    _no_backoff(monkeypatch)
+    llm = FlakyChatModel(rate_limited_calls=2)
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks[:1], llm, max_concurrency=1, max_retries=3,
+        requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert failures == []
+    assert results[0] is not None
+    assert llm.calls == 3
+
+
+def test_rate_limit_errors_fail_the_chunk_once_retries_run_out(monkeypatch, chunks):
+    _no_backoff(monkeypatch)
+    llm = FlakyChatModel(rate_limited_calls=10)
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks[:1], llm, max_concurrency=1, max_retries=2,
+        requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert results == [None]
+    assert "429" in failures[0].error
+    assert llm.calls == 3
+
+
+def test_extract_graph_from_documents_skips_failures(chunks):
+    llm = FlakyChatModel(fail_marker="Niels Bohr")
+
+    graph_documents = extract_graph_from_documents(
+        chunks, llm, max_concurrency=2, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert [doc.source.page_content for doc in graph_documents] == [chunk.page_content for chunk in chunks[:2]]
+
+
+def test_batch_response_is_split_per_chunk(chunks):
+    response = json.dumps({"chunks": [
+        {"id": "c2", "relationships": [
+            {"head": "niels bohr", "head_type": "person", "relation": "lives in",
+             "tail": "copenhagen", "tail_type": "LOCATION"},
+        ]},
+        {"id": "c0", "relationships": [
+            {"head": "Albert Einstein", "head_type": "Person", "relation": "BORN_IN",
+             "tail": "Ulm", "tail_type": "Location"},
+            {"head": "Albert Einstein", "head_type": "Alien", "relation": "BORN_IN",
+             "tail": "Mars", "tail_type": "Location"},
+        ]},
+        {"id": "c7", "relationships": []},
+        {"id": "c1", "relationships": "none"},
+    ]})
+
+    parsed = _parse_batch_response(f"```json\n{response}\n```", chunks)
+
+    assert sorted(parsed) == [0, 2]
+    assert parsed[0].source is chunks[0]
+    assert [(rel.source.id, rel.type, rel.target.id) for rel in parsed[0].relationships] == [
+        ("Albert Einstein", "BORN_IN", "Ulm")
+    ]
+    assert [(rel.source.id, rel.source.type, rel.type, rel.target.id, rel.target.type)
+            for rel in parsed[2].relationships] == [
+        ("Niels Bohr", "Person", "LIVES_IN", "Copenhagen", "Location")
+    ]
+
+
+def test_unparseable_batch_response_raises(chunks):
+    with pytest.raises(ValueError):
+        _parse_batch_response("no JSON here", chunks)
+
+
+def test_chunks_are_packed_into_one_request(chunks):
+    llm = FlakyChatModel()
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks, llm, chunks_per_request=3, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert failures == []
+    assert llm.calls == 1
+    assert [result.source.page_content for result in results] == [chunk.page_content for chunk in chunks]
+    assert {node.id for node in results[2].nodes} >= {"Niels Bohr", "Copenhagen"}
+
+
+def test_chunks_missing_from_a_batch_response_are_extracted_alone(chunks):
+    llm = FlakyChatModel(dropped_chunks=["c1"])
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks, llm, chunks_per_request=3, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert failures == []
+    assert llm.calls == 2
+    assert results[1].source is chunks[1]
+    assert {node.id for node in results[1].nodes} >= {"Marie Curie", "Pierre Curie"}
+
+
+def test_chunks_extracted_alone_are_cached_under_the_single_chunk_prompt(tmp_path, chunks):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    extract_graph_documents_concurrently(
+        chunks, FlakyChatModel(dropped_chunks=["c1"]), chunks_per_request=3,
+        requests_per_minute=None, tokens_per_minute=None, cache=cache
+    )
+    llm = FlakyChatModel()
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks, llm, chunks_per_request=1, requests_per_minute=None, tokens_per_minute=None, cache=cache
+    )
+
+    assert failures == []
+    assert llm.calls == 2
+    assert {node.id for node in results[1].nodes} >= {"Marie Curie", "Pierre Curie"}
+
+
+def test_rate_limited_batch_fails_every_chunk_without_falling_back(monkeypatch, chunks):
+    _no_backoff(monkeypatch)
+    llm = FlakyChatModel(rate_limited_calls=10)
+
+    results, failures = extract_graph_documents_concurrently(
+        chunks, llm, chunks_per_request=3, max_retries=1, requests_per_minute=None, tokens_per_minute=None
+    )
+
+    assert results == [None, None, None]
+    assert [failure.index for failure in failures] == [0, 1, 2]
+    assert all("429" in failure.error for failure in failures)
+    assert llm.calls == 2
@@ -0,0 +1,153 @@
+"""Retrieval and answering over a graph store."""
+import graph_query
+from graph_query import (
+    _extract_search_terms,
+    _merge_results,
+    _search_each_term,
+    _search_terms,
+    query_graph_batch,
+    run_query_pipeline,
+)
+from graph_storage import Neo4jGraphStore
+
+from fakes import FakeNeo4jGraph, FlakyChatModel
+
+
+def _triple(head: str, rel_type: str, tail: str, hits: int = 1) -> dict:
+    return {"n": {"id": head}, "r": (head, rel_type, tail), "m": {"id": tail}, "hits": hits}
+
+
+def test_search_terms_are_the_longer_distinct_lowercased_words():
+    assert _extract_search_terms("Where was Albert Einstein born? Where, Albert?") == [
+        "where", "albert", "einstein", "born"
+    ]
+    assert len(_extract_search_terms("alpha bravo charlie delta echoes foxtrot", max_terms=3)) == 3
+
+
+def test_all_terms_are_searched_in_one_round_trip():
+    graph = FakeNeo4jGraph([(r"queryNodes", [_triple("Ada", "LIVES_IN", "London")])])
+
+    results = _search_terms(["Ada", "London", "ada", "?!"], Neo4jGraphStore(graph))
+
+    assert results == [_triple("Ada", "LIVES_IN", "London")]
+    (query, params), = graph.queries
+    assert [term["term"] for term in params["terms"]] == ["ada", "london"]
+
+
+def test_no_searchable_terms_means_no_query():
+    graph = FakeNeo4jGraph()
+
+    assert _search_terms(["?", ""], Neo4jGraphStore(graph)) == []
+    assert graph.queries == []
+
+
+def test_each_term_gets_its_own_triples_from_one_round_trip():
+    records = [
+        {"term": "ada", **_triple("Ada", "LIVES_IN", "London")},
+        {"term": "paris", **_triple("Bob", "BORN_IN", "Paris")},
+    ]
+    graph = FakeNeo4jGraph([(r"queryNodes", records)])
+
+    per_term = _search_each_term(["Ada", "Paris", "Rome"], Neo4jGraphStore(graph))
+
+    assert len(graph.queries) == 1
+    assert [r["r"] for r in per_term["ada"]] == [("Ada", "LIVES_IN", "London")]
+    assert [r["r"] for r in per_term["paris"]] == [("Bob", "BORN_IN", "Paris")]
+    assert per_term["rome"] == []
+
+
+def test_merge_results_sums_hits_and_ranks_by_them():
+    first = [_triple("Ada", "LIVES_IN", "London"), _triple("Bob", "BORN_IN", "Paris")]
+    second = [_triple("Bob", "BORN_IN", "Paris", hits=2)]
+
+    merged = _merge_results(first, second)
+
+    assert [record["r"] for record in merged] == [("Bob", "BORN_IN", "Paris"), ("Ada", "LIVES_IN", "London")]
+    assert merged[0]["hits"] == 3
+    assert len(_merge_results(first, second, limit=1)) == 1
+
+
+def test_entity_extraction_is_skipped_when_keywords_find_enough(store, fake_llm):
+    result = run_query_pipeline("Where was Einstein born?", store, fake_llm, min_keyword_results=1)
+
+    assert "entity_extraction" not in result.timings
+    assert result.entities == []
+    assert len(fake_llm.call_latencies) == 1
+    assert any(record["m"]["id"] == "Ulm" for record in result.results)
+
+
+def test_entity_extraction_overlaps_the_keyword_search_by_default(store, fake_llm):
+    result = run_query_pipeline("Where did Marie Curie work?", store, fake_llm, min_keyword_results=None)
+
+    assert "entity_extraction" in result.timings
+    assert "Marie Curie" in result.entities
+    assert len(fake_llm.call_latencies) == 2
+    assert any(record["m"]["id"] == "Sorbonne University" for record in result.results)
+
+
+def test_entity_extraction_runs_when_keywords_find_too_little(store, fake_llm):
+    result = run_query_pipeline("Where was Einstein born?", store, fake_llm, min_keyword_results=10)
+
+    assert "entity_extraction" in result.timings
+    assert len(fake_llm.call_latencies) == 2
+
+
+def test_batch_answers_each_question_in_order(store, fake_llm):
+    questions = ["Where was Einstein born?", "Where did Marie Curie work?", "Where did Niels Bohr live?"]
+
+    results = query_graph_batch(questions, store, fake_llm)
+
+    expected = ["Ulm", "Sorbonne University", "Copenhagen"]
+    assert len(results) == 3
+    for result, name in zip(results, expected):
+        assert result.answer
+        assert any(record["m"]["id"] == name for record in result.results)
+    # One entity extraction and one answer per question
+    assert len(fake_llm.call_latencies) == 6
+
+
+def test_batch_looks_up_shared_terms_once(store, fake_llm, monkeypatch):
+    lookups = []
+    search_each_term = store.search_each_term
+
+    def spy(terms, *args):
+        lookups.append(list(terms))
+        return search_each_term(terms, *args)
+
+    monkeypatch.setattr(store, "search_each_term", spy)
+
+    query_graph_batch(["Where was Einstein born?", "Where was Bohr born?"], store, fake_llm)
+
+    keyword_terms = lookups[0]
+    assert len(keyword_terms) == len(set(keyword_terms))
+    assert {"where", "einstein", "bohr", "born"} <= set(keyword_terms)
+    for terms in lookups[1:]:
+        assert not set(terms) & set(keyword_terms)
+
+
+def test_answers_given_as_content_parts_are_joined(store):
+    llm = FlakyChatModel(content_parts=True)
+
+    single = run_query_pipeline("Where did Marie Curie work?", store, llm, min_keyword_results=None)
+    batch = query_graph_batch(["Where did Marie Curie work?"], store, llm)
+
+    for result in (single, batch[0]):
+        assert isinstance(result.answer, str) and result.answer
+        assert "Marie Curie" in result.entities
+
+
+def test_unreadable_entity_response_falls_back_to_keywords(store, fake_llm, monkeypatch):
+    parse_entities = graph_query._parse_entities
+
+    def parse(text):
+        if "Bohr" in text:
+            raise ValueError("unreadable response")
+        return parse_entities(text)
+
+    monkeypatch.setattr(graph_query, "_parse_entities", parse)
+
+    results = query_graph_batch(["Where did Niels Bohr live?", "Where was Einstein born?"], store, fake_llm)
+
+    assert results[0].entities == []
+    assert any(record["m"]["id"] == "Copenhagen" for record in results[0].results)
+    assert "Einstein" in results[1].entities
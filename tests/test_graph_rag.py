@@ -0,0 +1,76 @@
+"""Command line subcommands and their lazy imports."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import graph_rag
+from graph_store import InMemoryGraphStore
+
+# Modules only the ingest and query paths need
+HEAVY_MODULES = (
+    "langchain_google_genai", "langchain_experimental", "langchain_neo4j",
+    "langchain_community", "neo4j", "numpy", "graph_extraction", "graph_query",
+)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def saved_store(store, tmp_path, monkeypatch):
+    """Point the CLI at a saved in-memory store."""
+    path = str(tmp_path / "graph_store.bin")
+    store.save(path)
+    monkeypatch.setattr(graph_rag, "GRAPH_STORE", "memory")
+    monkeypatch.setattr(graph_rag, "GRAPH_STORE_PATH", path)
+    return path
+
+
+def test_stats_starts_without_the_extraction_stack(tmp_path):
+    script = (
+        "import sys, config\n"
+        "config.GRAPH_STORE = 'memory'\n"
+        f"config.GRAPH_STORE_PATH = {str(tmp_path / 'graph_store.bin')!r}\n"
+        "import graph_rag\n"
+        "graph_rag.main(['stats'])\n"
+        f"print(sorted(m for m in sys.modules if m.split('.')[0] in {HEAVY_MODULES!r}))\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    assert "Startup (stats)" in result.stdout
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_stats_prints_counts_per_label(saved_store, capsys):
+    assert graph_rag.main(["stats"]) == 0
+
+    output = capsys.readouterr().out
+    assert "Nodes: 9" in output
+    assert "  Person: 4" in output
+    assert "  WORKS_AT: 2" in output
+    assert "Version: 1" in output
+
+
+def test_clear_of_a_source_is_saved(saved_store, capsys):
+    assert graph_rag.main(["clear", "--source", "b.txt"]) == 0
+
+    reopened = InMemoryGraphStore(saved_store)
+    assert reopened.count() == {"nodes": 6, "relationships": 4}
+    assert reopened.get_version() == 2
+    assert "Nodes: 6" in capsys.readouterr().out
+
+
+def test_jobs_reports_an_empty_journal(tmp_path, capsys):
+    journal = str(tmp_path / "journal.sqlite")
+
+    assert graph_rag.main(["jobs", "--journal", journal]) == 0
+
+    assert f"Job journal: {journal}" in capsys.readouterr().out
+
+
+def test_unknown_subcommand_is_rejected():
+    with pytest.raises(SystemExit):
+        graph_rag.main(["ingestt"])
@@ -0,0 +1,235 @@
+"""Cypher-level storage helpers, run against a scripted stand-in for Neo4j."""
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+import graph_storage
+from graph_storage import (
+    BOOKKEEPING_LABELS,
+    BOOKKEEPING_RELATIONSHIPS,
+    CLEAR_NODES_QUERY,
+    CLEAR_RELATIONSHIPS_QUERY,
+    ENTITY_INDEX_NAME,
+    Neo4jGraphStore,
+    _escape_lucene,
+    _group_rows,
+    _lucene_query,
+    _make_batches,
+    bulk_write_graph_documents,
+    clear_graph,
+    ensure_indexes,
+)
+
+from fakes import FakeNeo4jGraph
+
+
+def _graph_document(chunk_id: str, *triples) -> GraphDocument:
+    relationships = [
+        Relationship(source=Node(id=head, type="Person"), target=Node(id=tail, type="Location"), type=rel_type)
+        for head, rel_type, tail in triples
+    ]
+    nodes = {(n.id, n.type): n for rel in relationships for n in (rel.source, rel.target)}
+    return GraphDocument(
+        nodes=list(nodes.values()),
+        relationships=relationships,
+        source=Document(page_content="", metadata={"chunk_id": chunk_id, "source": "a.txt", "chunk_index": 0}),
+    )
+
+
+def _rows_by_statement(graph: FakeNeo4jGraph, fragment: str) -> list[list[dict]]:
+    return [params["rows"] for query, params in graph.queries if fragment in query]
+
+
+def test_group_rows_merges_repeated_nodes_per_chunk():
+    doc = _graph_document("c1", ("Ada", "LIVES_IN", "London"), ("Ada", "BORN_IN", "London"))
+
+    chunk_rows, node_rows, rel_rows = _group_rows([doc])
+
+    assert chunk_rows == [{"chunk": "c1", "source": "a.txt", "index": 0}]
+    assert sorted(row["id"] for row in node_rows["Person"]) == ["Ada"]
+    assert sorted(rel_rows) == [("Person", "BORN_IN", "Location"), ("Person", "LIVES_IN", "Location")]
+
+
+def test_make_batches_keeps_rows_of_one_key_together():
+    rows = [{"id": key} for key in "aabbbc"]
+
+    batches = _make_batches("Q", rows, lambda row: row["id"], batch_size=3)
+
+    assert [[row["id"] for row in batch] for _, batch in batches] == [["a", "a"], ["b", "b", "b"], ["c"]]
+
+
+def test_bulk_write_batches_rows_and_writes_nodes_before_relationships():
+    graph = FakeNeo4jGraph()
+    docs = [_graph_document(f"c{i}", (f"P{i}", "LIVES_IN", f"L{i}")) for i in range(5)]
+
+    stats = bulk_write_graph_documents(graph, docs, batch_size=2)
+
+    node_batches = _rows_by_statement(graph, "MERGE (n:`Person`")
+    rel_batches = _rows_by_statement(graph, "MERGE (s)-[r:`LIVES_IN`]")
+    assert [len(rows) for rows in node_batches] == [2, 2, 1]
+    assert [len(rows) for rows in rel_batches] == [2, 2, 1]
+    order = [query for query, _ in graph.queries]
+    first_relationship = next(i for i, query in enumerate(order) if "MERGE (s)-[r:" in query)
+    assert all("MERGE (s)-[r:" not in query for query in order[:first_relationship])
+    assert stats["failed_batches"] == 0
+    # 5 chunks, 10 nodes and 5 relationships
+    assert stats["rows"] == 20
+
+
+def test_failing_batch_is_retried_and_reported_alone(monkeypatch):
+    monkeypatch.setattr(graph_storage, "backoff_delay", lambda *args, **kwargs: 0)
+
+    def fail(params):
+        raise RuntimeError("deadlock")
+
+    graph = FakeNeo4jGraph([(r"MERGE \(n:`Location`", fail)])
+    docs = [_graph_document("c1", ("Ada", "LIVES_IN", "London"))]
+
+    stats = bulk_write_graph_documents(graph, docs, max_retries=2)
+
+    assert len(_rows_by_statement(graph, "MERGE (n:`Location`")) == 3
+    assert stats["failed_batches"] == 1
+    assert stats["failed_rows"] == 1
+    assert _rows_by_statement(graph, "MERGE (n:`Person`")
+
+
+@pytest.mark.parametrize("parallelism", [1, 3])
+def test_parallel_writes_cover_every_row(parallelism):
+    graph = FakeNeo4jGraph()
+    docs = [_graph_document(f"c{i}", (f"P{i}", "LIVES_IN", "Paris")) for i in range(7)]
+
+    bulk_write_graph_documents(graph, docs, batch_size=2, parallelism=parallelism)
+
+    written = sorted(row["source"] for rows in _rows_by_statement(graph, "MERGE (s)-[r:") for row in rows)
+    assert written == [f"P{i}" for i in range(7)]
+
+
+def test_ensure_indexes_creates_constraints_and_the_fulltext_index():
+    graph = FakeNeo4jGraph()
+
+    ensure_indexes(graph, labels=["Person", "Location"])
+
+    statements = [query for query, _ in graph.queries]
+    assert any("CONSTRAINT unique_person_id" in query for query in statements)
+    assert any("CONSTRAINT unique___chunk___id" in query for query in statements)
+    created = [query for query in statements if f"CREATE FULLTEXT INDEX {ENTITY_INDEX_NAME}" in query]
+    assert len(created) == 1
+    assert "`Person`|`Location`" in created[0] and "n.id, n.name" in created[0]
+
+
+def test_ensure_indexes_recreates_the_fulltext_index_when_labels_change():
+    existing = [{"labelsOrTypes": ["Person"], "properties": ["id", "name"]}]
+    graph = FakeNeo4jGraph([(r"SHOW FULLTEXT INDEXES", existing)])
+
+    ensure_indexes(graph, labels=["Person", "Location"])
+
+    statements = [query for query, _ in graph.queries]
+    assert f"DROP INDEX {ENTITY_INDEX_NAME} IF EXISTS" in statements
+    assert any(f"CREATE FULLTEXT INDEX {ENTITY_INDEX_NAME}" in query for query in statements)
+
+
+def test_ensure_indexes_keeps_an_index_with_the_same_labels():
+    existing = [{"labelsOrTypes": ["Person"], "properties": ["id", "name"]}]
+    graph = FakeNeo4jGraph([(r"SHOW FULLTEXT INDEXES", existing)])
+
+    ensure_indexes(graph, labels=["Person"])
+
+    assert not any(f"INDEX {ENTITY_INDEX_NAME}" in query and "SHOW" not in query for query, _ in graph.queries)
+
+
+def test_lucene_query_requires_every_word_as_an_escaped_prefix():
+    assert _lucene_query("Albert Einstein") == "albert* AND einstein*"
+    assert _lucene_query("c++") == "c*"
+    assert _lucene_query("") == ""
+    assert _escape_lucene('a:b "c"') == 'a\\:b \\"c\\"'
+
+
+def test_search_terms_seeds_from_the_fulltext_index():
+    triple = {"n": {"id": "Ada"}, "r": ("Ada", "LIVES_IN", "London"), "m": {"id": "London"}, "hits": 1}
+    graph = FakeNeo4jGraph([(r"db\.index\.fulltext\.queryNodes", [triple])])
+
+    results = Neo4jGraphStore(graph).search_terms(["ada lovelace"])
+
+    assert results == [triple]
+    (query, params), = graph.queries
+    assert params["index"] == ENTITY_INDEX_NAME
+    assert params["terms"] == [{"term": "ada lovelace", "query": "ada* AND lovelace*"}]
+
+
+def test_search_terms_falls_back_to_a_scan_without_the_index():
+    def missing_index(params):
+        raise RuntimeError("There is no such fulltext schema index: entity_names")
+
+    triple = {"n": {"id": "Ada"}, "r": ("Ada", "LIVES_IN", "London"), "m": {"id": "London"}, "hits": 1}
+    graph = FakeNeo4jGraph([(r"db\.index\.fulltext", missing_index), (r"CONTAINS term", [triple])])
+
+    assert Neo4jGraphStore(graph).search_terms(["ada"]) == [triple]
+    assert graph.queries[-1][1] == {"terms": ["ada"], "limit": 50}
+
+
+def _deleting(*batches):
+    """Response deleting ``batches`` in turn, then nothing."""
+    remaining = list(batches)
+    return lambda params: [{"deleted": remaining.pop(0) if remaining else 0}]
+
+
+def test_clear_deletes_relationships_then_nodes_in_bounded_batches():
+    graph = FakeNeo4jGraph([
+        (r"DELETE r\b", _deleting(100, 100, 30)),
+        (r"DETACH DELETE n", _deleting(100, 20)),
+    ])
+
+    stats = clear_graph(graph, batch_size=100)
+
+    assert (stats["relationships"], stats["nodes"]) == (230, 120)
+    statements = [query for query, _ in graph.queries]
+    assert statements == [CLEAR_RELATIONSHIPS_QUERY] * 4 + [CLEAR_NODES_QUERY] * 3
+    assert all(params == {"batch_size": 100} for _, params in graph.queries)
+
+
+def test_failed_clear_is_reported_and_raised(capsys):
+    def fail(params):
+        raise RuntimeError("transaction timed out")
+
+    graph = FakeNeo4jGraph([(r"DELETE r\b", _deleting(100)), (r"DETACH DELETE n", fail)])
+
+    with pytest.raises(RuntimeError):
+        clear_graph(graph, batch_size=100)
+
+    assert "partly cleared" in capsys.readouterr().out
+
+
+def test_clearing_a_source_retracts_its_chunks_in_batches():
+    chunk_ids = [f"c{i}" for i in range(25)]
+    graph = FakeNeo4jGraph([(r"RETURN c\.id AS id", [{"id": chunk_id} for chunk_id in chunk_ids])])
+
+    stats = clear_graph(graph, source="a.txt", batch_size=200)
+
+    retracted = [params["chunk_ids"] for query, params in graph.queries if "chunk_ids" in params]
+    assert [len(batch) for batch in retracted] == [10, 10, 5]
+    assert [chunk_id for batch in retracted for chunk_id in batch] == chunk_ids
+    assert stats["chunks"] == 25
+    assert not any(query in (CLEAR_RELATIONSHIPS_QUERY, CLEAR_NODES_QUERY) for query, _ in graph.queries)
+
+
+def test_count_subtracts_bookkeeping_in_one_statement():
+    def totals(params):
+        return [
+            {"kind": "nodes", "sign": 1, "total": 20},
+            *({"kind": "nodes", "sign": -1, "total": 2} for _ in BOOKKEEPING_LABELS),
+            {"kind": "relationships", "sign": 1, "total": 30},
+            *({"kind": "relationships", "sign": -1, "total": 5} for _ in BOOKKEEPING_RELATIONSHIPS),
+        ]
+
+    graph = FakeNeo4jGraph([(r"UNION ALL", totals)])
+
+    counts = Neo4jGraphStore(graph).count()
+
+    assert counts == {
+        "nodes": 20 - 2 * len(BOOKKEEPING_LABELS),
+        "relationships": 30 - 5 * len(BOOKKEEPING_RELATIONSHIPS),
+    }
+    assert len(graph.queries) == 1
+    query = graph.queries[0][0]
+    assert all(f"(n:{label})" in query for label in BOOKKEEPING_LABELS)
+    assert all(f"[r:{rel_type}]" in query for rel_type in BOOKKEEPING_RELATIONSHIPS)
@@ -0,0 +1,122 @@
+"""Compact in-process graph store."""
+import pytest
+from langchain_community.graphs.graph_document import Node
+
+from graph_store import InMemoryGraphStore
+
+from fakes import make_graph_document, scientist_documents
+
+
+def _edges(store) -> set:
+    return set(store.edge_list())
+
+
+def test_counts_are_kept_per_label_and_type(store):
+    assert store.count() == {"nodes": 9, "relationships": 6}
+    assert store.count_by_label() == {
+        "labels": {"Person": 4, "Location": 2, "Event": 1, "Organization": 1, "Theory": 1},
+        "types": {"BORN_IN": 1, "WON": 1, "WORKS_AT": 2, "LIVES_IN": 1, "DEVELOPED": 1},
+    }
+
+
+def test_writing_the_same_documents_again_adds_nothing(store):
+    store.upsert(scientist_documents())
+
+    assert store.count() == {"nodes": 9, "relationships": 6}
+
+
+def test_terms_match_word_prefixes(store):
+    assert {triple["n"]["id"] for triple in store.search_terms(["einst"])} == {"Albert Einstein"}
+    assert {triple["n"]["id"] for triple in store.search_terms(["curie"])} == {"Marie Curie", "Pierre Curie"}
+    assert {triple["n"]["id"] for triple in store.search_terms(["marie cur"])} == {"Marie Curie"}
+    assert store.search_terms(["darwin"]) == []
+
+
+def test_triples_hit_by_more_terms_rank_first(store):
+    results = store.search_terms(["einstein", "ulm"])
+
+    assert results[0]["r"][1] == "BORN_IN"
+    assert results[0]["hits"] == 2
+    assert [triple["hits"] for triple in results] == [2, 1]
+
+
+def test_saved_store_reopens_with_the_same_graph(store, tmp_path):
+    path = str(tmp_path / "graph.bin")
+    store.save_communities([{"id": "c-1", "title": "Physics", "members": ["Niels Bohr"]}])
+    store.save(path)
+
+    reopened = InMemoryGraphStore(path)
+
+    assert _edges(reopened) == _edges(store)
+    assert reopened.count_by_label() == store.count_by_label()
+    assert reopened.get_version() == store.get_version()
+    assert reopened.get_communities() == store.get_communities()
+    assert reopened.search_terms(["bohr"]) == store.search_terms(["bohr"])
+
+
+def test_reopened_store_accepts_writes(store, tmp_path):
+    path = str(tmp_path / "graph.bin")
+    store.save(path)
+    reopened = InMemoryGraphStore(path)
+
+    reopened.upsert([make_graph_document([("Niels Bohr", "Person", "WON", "Nobel Prize", "Event")], "c4", "b.txt")])
+
+    assert reopened.count() == {"nodes": 9, "relationships": 7}
+    assert {triple["m"]["id"] for triple in reopened.search_terms(["bohr"])} == {
+        "Copenhagen", "Quantum Theory", "Nobel Prize"
+    }
+
+
+def test_opening_another_file_fails(tmp_path):
+    path = tmp_path / "graph.bin"
+    path.write_bytes(b"not a graph store")
+
+    with pytest.raises(ValueError):
+        InMemoryGraphStore(str(path))
+
+
+def test_clearing_a_source_keeps_what_other_sources_produced(store):
+    store.upsert([make_graph_document([
+        ("Marie Curie", "Person", "WORKS_AT", "Sorbonne University", "Organization"),
+        ("Marie Curie", "Person", "WON", "Nobel Prize", "Event"),
+    ], "c4", "b.txt")])
+
+    store.clear(source="a.txt")
+
+    assert _edges(store) == {
+        ("Niels Bohr", "LIVES_IN", "Copenhagen"),
+        ("Niels Bohr", "DEVELOPED", "Quantum Theory"),
+        ("Marie Curie", "WORKS_AT", "Sorbonne University"),
+        ("Marie Curie", "WON", "Nobel Prize"),
+    }
+    assert store.count_by_label()["labels"] == {
+        "Person": 2, "Location": 1, "Theory": 1, "Organization": 1, "Event": 1
+    }
+    assert store.search_terms(["einstein"]) == []
+
+
+def test_clearing_a_source_drops_its_isolated_nodes(store, tmp_path):
+    isolated = make_graph_document([], "c4", "a.txt")
+    isolated.nodes = [Node(id="Max Planck", type="Person")]
+    shared = make_graph_document([], "c5", "b.txt")
+    shared.nodes = [Node(id="Max Planck", type="Person"), Node(id="Lise Meitner", type="Person")]
+    store.upsert([isolated])
+    store.save(str(tmp_path / "graph.bin"))
+    store = InMemoryGraphStore(str(tmp_path / "graph.bin"))
+
+    store.clear(source="a.txt")
+    assert ("Person", "Max Planck") not in store.node_keys()
+
+    store.upsert([isolated, shared])
+    store.clear(source="a.txt")
+    assert {("Person", "Max Planck"), ("Person", "Lise Meitner")} <= set(store.node_keys())
+
+
+def test_clearing_everything_keeps_the_version(store):
+    version = store.get_version()
+
+    store.clear()
+
+    assert store.count() == {"nodes": 0, "relationships": 0}
+    assert store.count_by_label() == {"labels": {}, "types": {}}
+    assert store.get_version() == version
@@ -0,0 +1,86 @@
+"""Planning incremental ingestion from chunk fingerprints."""
+from langchain_core.documents import Document
+
+from ingestion import chunk_fingerprint, plan_ingest, tag_chunks
+
+
+def _chunks(source: str, *texts: str) -> list[Document]:
+    return [Document(page_content=text, metadata={"source": source}) for text in texts]
+
+
+def _ingested(chunks_by_source: dict) -> dict:
+    """What the graph records after ingesting these chunks in full."""
+    plan = plan_ingest(chunks_by_source, {})
+    return {
+        source: {
+            "fingerprint": plan.source_fingerprints[source],
+            "chunks": {chunk.metadata["chunk_id"] for chunk in chunks},
+        }
+        for source, chunks in chunks_by_source.items()
+    }
+
+
+def test_fingerprint_depends_on_source_and_text():
+    chunk = Document(page_content="text", metadata={"source": "a.txt"})
+
+    assert chunk_fingerprint(chunk) == chunk_fingerprint(Document(page_content="text", metadata={"source": "a.txt"}))
+    assert chunk_fingerprint(chunk) != chunk_fingerprint(Document(page_content="text", metadata={"source": "b.txt"}))
+    assert chunk_fingerprint(chunk) != chunk_fingerprint(Document(page_content="text!", metadata={"source": "a.txt"}))
+
+
+def test_tag_chunks_groups_by_source_and_numbers_chunks():
+    documents = _chunks("a.txt", "one", "two") + _chunks("b.txt", "three")
+
+    by_source = tag_chunks(documents)
+
+    assert list(by_source) == ["a.txt", "b.txt"]
+    assert [doc.metadata["chunk_index"] for doc in by_source["a.txt"]] == [0, 1]
+    assert by_source["b.txt"][0].metadata["chunk_index"] == 0
+    assert all(doc.metadata["chunk_id"] == chunk_fingerprint(doc) for doc in documents)
+
+
+def test_first_ingest_extracts_every_chunk():
+    plan = plan_ingest(tag_chunks(_chunks("a.txt", "one", "two")), {})
+
+    assert [chunk.page_content for chunk in plan.new_chunks] == ["one", "two"]
+    assert plan.removed_chunk_ids == []
+    assert plan.unchanged_sources == []
+
+
+def test_unchanged_source_is_skipped():
+    ingested = _ingested(tag_chunks(_chunks("a.txt", "one", "two")))
+
+    plan = plan_ingest(tag_chunks(_chunks("a.txt", "one", "two")), ingested)
+
+    assert plan.new_chunks == []
+    assert plan.removed_chunk_ids == []
+    assert plan.unchanged_sources == ["a.txt"]
+
+
+def test_edited_chunk_is_extracted_and_its_old_version_retracted():
+    old = tag_chunks(_chunks("a.txt", "one", "two"))
+    ingested = _ingested(old)
+
+    plan = plan_ingest(tag_chunks(_chunks("a.txt", "one", "two, edited")), ingested)
+
+    assert [chunk.page_content for chunk in plan.new_chunks] == ["two, edited"]
+    assert plan.removed_chunk_ids == [old["a.txt"][1].metadata["chunk_id"]]
+
+
+def test_repeated_chunk_is_extracted_once():
+    plan = plan_ingest(tag_chunks(_chunks("a.txt", "same", "same")), {})
+
+    assert [chunk.page_content for chunk in plan.new_chunks] == ["same"]
+
+
+def test_missing_source_is_retracted_only_when_pruning():
+    old = tag_chunks(_chunks("a.txt", "one") + _chunks("b.txt", "two"))
+    ingested = _ingested(old)
+    current = tag_chunks(_chunks("a.txt", "one"))
+
+    pruned = plan_ingest(current, ingested)
+    kept = plan_ingest(current, ingested, prune_missing_sources=False)
+
+    assert pruned.removed_sources == ["b.txt"]
+    assert pruned.removed_chunk_ids == [old["b.txt"][0].metadata["chunk_id"]]
+    assert kept.removed_sources == [] and kept.removed_chunk_ids == []
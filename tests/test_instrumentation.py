@@ -0,0 +1,103 @@
+"""Counters, histograms, spans and their export."""
+import pytest
+
+from instrumentation import Histogram, Metrics, MetricsCallbackHandler
+
+
+def test_quantiles_are_exact_below_the_reservoir_size():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value / 1000)
+
+    assert histogram.quantile(0.50) == 0.050
+    assert histogram.quantile(0.95) == 0.095
+    assert histogram.quantile(0.99) == 0.099
+    assert histogram.quantile(1.0) == 0.100
+
+
+def test_single_sample_is_its_own_percentile():
+    histogram = Histogram()
+    histogram.observe(4.999)
+
+    summary = histogram.summary()
+
+    assert summary["p50"] == summary["p99"] == summary["max"] == 4.999
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_reservoir_stays_bounded_and_representative():
+    histogram = Histogram(reservoir_size=100)
+    for value in range(10000):
+        histogram.observe(value)
+
+    assert len(histogram.samples) == 100
+    assert histogram.count == 10000
+    assert 3000 < histogram.quantile(0.5) < 7000
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+    registry.inc("llm_calls")
+    registry.observe("llm_call_seconds", 0.1)
+    with registry.span("extract"):
+        pass
+
+    assert registry.report() == {"counters": [], "histograms": [], "spans": [], "dropped_spans": 0}
+
+
+def test_spans_nest_and_record_errors():
+    registry = Metrics(enabled=True)
+    with registry.span("ingest"):
+        with pytest.raises(KeyError):
+            with registry.span("extract", chunks=3):
+                raise KeyError("chunk")
+
+    inner, outer = registry.report()["spans"]
+    assert (outer["name"], outer["parent"]) == ("ingest", None)
+    assert (inner["name"], inner["parent"]) == ("extract", outer["id"])
+    assert inner["error"] == "KeyError"
+    assert inner["attributes"] == {"chunks": 3}
+    assert {"name": "span_errors", "labels": {"span": "extract"}, "value": 1} in registry.report()["counters"]
+
+
+def test_spans_beyond_the_limit_are_counted_not_kept():
+    registry = Metrics(enabled=True, max_spans=2)
+    for _ in range(5):
+        with registry.span("query"):
+            pass
+
+    report = registry.report()
+    assert len(report["spans"]) == 2
+    assert report["dropped_spans"] == 3
+    assert report["histograms"][0]["count"] == 5
+
+
+def test_prometheus_export_has_cumulative_buckets():
+    registry = Metrics(enabled=True)
+    registry.inc("cache_lookups", cache="answers", result="hit")
+    registry.inc("cache_lookups", 2, cache="answers", result="miss")
+    registry.observe("llm_call_seconds", 0.003, model="fake")
+    registry.observe("llm_call_seconds", 2.0, model="fake")
+
+    lines = registry.to_prometheus().splitlines()
+
+    assert lines.count("# TYPE graphrag_cache_lookups_total counter") == 1
+    assert 'graphrag_cache_lookups_total{cache="answers",result="miss"} 2' in lines
+    assert 'graphrag_llm_call_seconds_bucket{model="fake",le="0.001"} 0' in lines
+    assert 'graphrag_llm_call_seconds_bucket{model="fake",le="0.005"} 1' in lines
+    assert 'graphrag_llm_call_seconds_bucket{model="fake",le="2.5"} 2' in lines
+    assert 'graphrag_llm_call_seconds_bucket{model="fake",le="+Inf"} 2' in lines
+    assert 'graphrag_llm_call_seconds_count{model="fake"} 2' in lines
+
+
+def test_callback_counts_llm_calls_and_tokens(fake_llm):
+    registry = Metrics(enabled=True)
+    fake_llm.callbacks = [MetricsCallbackHandler(registry)]
+
+    fake_llm.invoke("List the key entities (one per line):\nQuestion: Where did Niels Bohr live?")
+
+    counters = {entry["name"]: entry["value"] for entry in registry.report()["counters"]}
+    assert counters["llm_calls"] == 1
+    assert counters["llm_prompt_tokens"] > 0
+    assert counters["llm_completion_tokens"] > 0
+    assert registry.report()["histograms"][0]["name"] == "llm_call_seconds"
@@ -0,0 +1,145 @@
+"""Resumable job journal shared by ingestion workers."""
+import functools
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import ingestion
+import job_journal
+from ingestion import run_worker, tag_chunks
+from job_journal import CLAIMED, DONE, FAILED, PENDING, JobJournal
+
+
+@pytest.fixture
+def tagged(chunks):
+    tag_chunks(chunks)
+    return chunks
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite"), lease_seconds=60, max_attempts=2)
+    yield journal
+    journal.close()
+
+
+def _status(journal: JobJournal) -> dict:
+    return journal.progress()["jobs"]
+
+
+def test_enqueue_skips_chunks_already_queued(journal, tagged):
+    assert journal.enqueue(tagged) == 3
+    assert journal.enqueue(tagged) == 0
+    assert _status(journal)[PENDING] == 3
+
+
+def test_workers_claim_disjoint_batches(journal, tagged):
+    journal.enqueue(tagged)
+    other = JobJournal(journal.path)
+
+    first = journal.claim("w1", 2)
+    second = other.claim("w2", 2)
+    other.close()
+
+    assert [job["chunk_id"] for job in first] == [doc.metadata["chunk_id"] for doc in tagged[:2]]
+    assert [job["chunk_id"] for job in second] == [tagged[2].metadata["chunk_id"]]
+    assert first[0]["metadata"]["source"] == "a.txt"
+    assert journal.claim("w3", 2) == []
+
+
+def test_completed_results_are_returned_in_job_order(journal, tagged):
+    journal.enqueue(tagged)
+    journal.register_worker("w1")
+    ids = [job["chunk_id"] for job in journal.claim("w1", 3)]
+
+    journal.complete("w1", {ids[2]: {"n": 2}, ids[0]: {"n": 0}}, {ids[1]: "ValueError: bad"}, 1.5)
+
+    assert journal.results() == [{"n": 0}, {"n": 2}]
+    assert journal.results([ids[2]]) == [{"n": 2}]
+    assert _status(journal) == {PENDING: 1, CLAIMED: 0, DONE: 2, FAILED: 0}
+    worker = journal.progress()["workers"][0]
+    assert (worker["done"], worker["failed"]) == (2, 1)
+
+
+def test_failing_job_is_given_up_and_requeued_by_a_rerun(journal, tagged):
+    journal.enqueue(tagged[:1])
+    for _ in range(2):
+        job = journal.claim("w1", 1)[0]
+        journal.complete("w1", {}, {job["chunk_id"]: "ValueError: bad"}, 0.1)
+
+    assert _status(journal)[FAILED] == 1
+    assert journal.claim("w1", 1) == []
+    assert journal.remaining() == 0
+
+    assert journal.enqueue(tagged[:1]) == 1
+    assert [job["chunk_id"] for job in journal.claim("w1", 1)] == [tagged[0].metadata["chunk_id"]]
+
+
+def test_expired_claims_are_handed_out_again(journal, tagged, monkeypatch):
+    journal.enqueue(tagged[:1])
+    journal.claim("w1", 1)
+    now = job_journal.time.time()
+
+    monkeypatch.setattr(job_journal.time, "time", lambda: now + 61)
+    reclaimed = journal.claim("w2", 1)
+    monkeypatch.setattr(job_journal.time, "time", lambda: now + 122)
+    given_up = journal.claim("w3", 1)
+
+    assert len(reclaimed) == 1
+    assert given_up == []
+    assert _status(journal)[FAILED] == 1
+
+
+def test_claims_of_exited_workers_are_released(journal, tagged):
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    journal.enqueue(tagged)
+    for worker in ("alive", "exited"):
+        journal.register_worker(worker)
+        journal.claim(worker, 1)
+    journal._conn.execute("UPDATE workers SET pid = ? WHERE worker = 'exited'", (int(exited.stdout),))
+
+    assert journal.release_dead_claims() == 1
+    assert _status(journal) == {PENDING: 2, CLAIMED: 1, DONE: 0, FAILED: 0}
+
+
+def test_worker_extracts_every_job(journal, tagged, fake_llm):
+    journal.enqueue(tagged)
+
+    report = run_worker(journal.path, "w1", llm=fake_llm, batch_size=2, use_cache=False)
+
+    assert report == {"worker": "w1", "done": 3, "failed": 0}
+    assert journal.remaining() == 0
+    assert len(journal.results()) == 3
+    assert len(fake_llm.call_latencies) == 3
+
+
+def test_worker_renews_the_lease_of_a_batch_slower_than_the_lease(journal, tagged, fake_llm, monkeypatch):
+    journal.enqueue(tagged)
+    clock = [job_journal.time.time()]
+    monkeypatch.setattr(job_journal, "time", SimpleNamespace(time=lambda: clock[0]))
+    monkeypatch.setattr(ingestion, "JobJournal", functools.partial(JobJournal, lease_seconds=60))
+    monkeypatch.setattr(
+        ingestion,
+        "extract_graph_documents_concurrently",
+        functools.partial(ingestion.extract_graph_documents_concurrently, max_concurrency=1)
+    )
+    stolen = []
+    generate = type(fake_llm)._generate
+
+    def slow_generate(self, *args, **kwargs):
+        # Each request takes 40s of a 60s lease while another worker keeps claiming
+        clock[0] += 40
+        rival = JobJournal(journal.path, lease_seconds=60)
+        stolen.extend(rival.claim("w2", 3))
+        rival.close()
+        return generate(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(fake_llm), "_generate", slow_generate)
+
+    report = run_worker(journal.path, "w1", llm=fake_llm, batch_size=3, use_cache=False)
+
+    assert stolen == []
+    assert report == {"worker": "w1", "done": 3, "failed": 0}
+    assert _status(journal)[DONE] == 3
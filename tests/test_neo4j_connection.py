@@ -0,0 +1,81 @@
+"""Shared Neo4j connections with a lazily loaded schema."""
+import neo4j
+import pytest
+from langchain_neo4j import Neo4jGraph
+
+import neo4j_connection
+from neo4j_connection import Neo4jConnectionManager, SharedNeo4jGraph
+
+
+@pytest.fixture
+def offline_neo4j(monkeypatch):
+    """Connect without a server; statements are recorded and schema loads counted."""
+    calls = {"queries": [], "schema_loads": 0}
+
+    def query(self, query, params=None, session_params=None):
+        calls["queries"].append(query)
+        return []
+
+    def refresh_schema(self):
+        calls["schema_loads"] += 1
+        self.schema = f"schema {calls['schema_loads']}"
+
+    monkeypatch.setattr(neo4j.Driver, "verify_connectivity", lambda self, **kwargs: None)
+    monkeypatch.setattr(Neo4jGraph, "query", query)
+    monkeypatch.setattr(Neo4jGraph, "refresh_schema", refresh_schema)
+    return calls
+
+
+def _graph(url: str = "bolt://localhost:7687") -> SharedNeo4jGraph:
+    return SharedNeo4jGraph(url=url, username="neo4j", password="secret", database="neo4j")
+
+
+def test_schema_is_loaded_on_first_use_only(offline_neo4j):
+    graph = _graph()
+    assert offline_neo4j["schema_loads"] == 0
+
+    assert graph.get_schema == "schema 1"
+    graph.query("MATCH (n) RETURN count(n) AS created_nodes")
+    assert graph.get_schema == "schema 1"
+    assert offline_neo4j["schema_loads"] == 1
+
+
+def test_writes_reload_the_schema(offline_neo4j):
+    graph = _graph()
+    graph.get_schema
+
+    graph.query("MERGE (n:Person {id: $id})", {"id": "Albert Einstein"})
+
+    assert graph.get_schema == "schema 2"
+    assert offline_neo4j["queries"] == ["MERGE (n:Person {id: $id})"]
+
+
+def test_reads_are_routed_only_on_clusters(offline_neo4j):
+    assert not _graph("bolt://localhost:7687").route_reads
+    assert _graph("neo4j://cluster:7687").route_reads
+
+    _graph("bolt://localhost:7687").read_query("MATCH (n) RETURN n")
+
+    assert offline_neo4j["queries"] == ["MATCH (n) RETURN n"]
+
+
+def test_manager_shares_one_graph_per_database(offline_neo4j, monkeypatch):
+    closed = []
+    monkeypatch.setattr(SharedNeo4jGraph, "close", lambda self: closed.append(self.database))
+    manager = Neo4jConnectionManager()
+
+    first = manager.get("bolt://localhost:7687", "neo4j", "secret", "neo4j")
+    again = manager.get("bolt://localhost:7687", "neo4j", "secret", "neo4j")
+    other = manager.get("bolt://localhost:7687", "neo4j", "secret", "movies")
+    manager.close_all()
+
+    assert first is again
+    assert other is not first
+    assert sorted(closed) == ["movies", "neo4j"]
+    assert manager.get("bolt://localhost:7687", "neo4j", "secret", "neo4j") is not first
+
+
+def test_write_clauses_are_recognized():
+    assert neo4j_connection._WRITE_CLAUSE.search("UNWIND $rows AS row MERGE (n {id: row.id})")
+    assert neo4j_connection._WRITE_CLAUSE.search("match (n) detach delete n")
+    assert not neo4j_connection._WRITE_CLAUSE.search("MATCH (n) RETURN n.created_at, n.settings")
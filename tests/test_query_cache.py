@@ -0,0 +1,73 @@
+"""Retrieval and answer caches."""
+import query_cache
+from graph_query import run_query_pipeline
+from query_cache import QueryCache, TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl=5)
+    cache.put("key", "value")
+
+    now[0] += 4
+    assert cache.get("key") == "value"
+    now[0] += 2
+    assert cache.get("key") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_new_graph_version_empties_both_levels():
+    cache = QueryCache(ttl=None)
+    cache.sync_version(1)
+    cache.retrieval.put(("einstein",), ([], []))
+    cache.answers.put(("who", "hash"), "answer")
+
+    cache.sync_version(1)
+    assert cache.retrieval.get(("einstein",)) is not None
+
+    cache.sync_version(2)
+    assert cache.retrieval.get(("einstein",)) is None
+    assert cache.answers.get(("who", "hash")) is None
+    assert cache.graph_version == 2
+
+
+def test_keys_are_normalized():
+    assert QueryCache.retrieval_key(["Einstein ", "born", "einstein"]) == ("born", "einstein")
+    assert QueryCache.answer_key("Who  is Einstein?", "data") == QueryCache.answer_key("who is einstein", "data")
+    assert QueryCache.answer_key("Who is Einstein?", "a") != QueryCache.answer_key("Who is Einstein?", "b")
+
+
+def test_repeated_question_is_answered_from_the_cache(store, fake_llm):
+    cache = QueryCache(ttl=None)
+    first = run_query_pipeline("Where was Einstein born?", store, fake_llm, min_keyword_results=1, cache=cache)
+    calls = len(fake_llm.call_latencies)
+
+    second = run_query_pipeline("where was einstein born", store, fake_llm, min_keyword_results=1, cache=cache)
+
+    assert second.answer == first.answer
+    assert len(fake_llm.call_latencies) == calls
+    assert cache.answers.stats()["hits"] == 1
+
+
+def test_graph_change_invalidates_cached_answers(store, fake_llm):
+    cache = QueryCache(ttl=None)
+    run_query_pipeline("Where was Einstein born?", store, fake_llm, min_keyword_results=1, cache=cache)
+    calls = len(fake_llm.call_latencies)
+
+    store.bump_version()
+    run_query_pipeline("Where was Einstein born?", store, fake_llm, min_keyword_results=1, cache=cache)
+
+    assert len(fake_llm.call_latencies) > calls
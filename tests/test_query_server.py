@@ -0,0 +1,94 @@
+"""JSON-lines query server."""
+import asyncio
+import json
+
+from query_server import QueryServer
+
+
+async def _exchange(server: QueryServer, requests: list) -> list[dict]:
+    """Send requests on one connection, half-close it and read every reply."""
+    await server.start()
+    listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for request in requests:
+            writer.write((request if isinstance(request, str) else json.dumps(request)).encode("utf-8") + b"\n")
+        await writer.drain()
+        writer.write_eof()
+        replies = [json.loads(line) async for line in reader]
+        writer.close()
+        return replies
+    finally:
+        listener.close()
+        await listener.wait_closed()
+        await server.stop()
+
+
+def _by_type(replies: list[dict], kind: str) -> dict:
+    return {reply["id"]: reply for reply in replies if reply["type"] == kind}
+
+
+def test_pipelined_questions_are_all_answered_after_half_close(store, fake_llm):
+    server = QueryServer(store, fake_llm, max_concurrency=2)
+
+    replies = asyncio.run(_exchange(server, [
+        {"id": 1, "question": "Where was Einstein born?"},
+        {"id": 2, "question": "Where did Marie Curie work?", "stream": True},
+    ]))
+
+    answers = _by_type(replies, "answer")
+    assert sorted(answers) == [1, 2]
+    assert "Marie Curie" in answers[2]["entities"]
+    streamed = "".join(reply["text"] for reply in replies if reply["type"] == "token")
+    assert streamed == answers[2]["answer"]
+    assert not any(reply["type"] == "token" and reply["id"] == 1 for reply in replies)
+    assert server.counts == {"accepted": 2, "rejected": 0, "completed": 2, "failed": 0}
+
+
+def test_bad_requests_get_errors_and_stats_are_served(store, fake_llm):
+    server = QueryServer(store, fake_llm, max_concurrency=1)
+
+    replies = asyncio.run(_exchange(server, [
+        "not json",
+        {"id": 3, "question": " "},
+        {"id": 4, "op": "stats"},
+    ]))
+
+    errors = _by_type(replies, "error")
+    assert errors[None]["error"].startswith("invalid request")
+    assert "question" in errors[3]["error"]
+    stats = _by_type(replies, "stats")[4]
+    assert stats["workers"] == 1
+    assert stats["queue_capacity"] == server.max_queue
+
+
+def test_repeated_question_is_answered_from_the_cache(store, fake_llm):
+    server = QueryServer(store, fake_llm, max_concurrency=1, min_keyword_results=1)
+
+    asyncio.run(_exchange(server, [{"id": 1, "question": "Where was Einstein born?"}]))
+    calls = len(fake_llm.call_latencies)
+    replies = asyncio.run(_exchange(server, [{"id": 2, "question": "Where was Einstein born?"}]))
+
+    assert _by_type(replies, "answer")[2]["answer"]
+    assert len(fake_llm.call_latencies) == calls
+    assert server.cache.stats()["answers"]["hits"] == 1
+
+
+def test_full_queue_rejects_requests_and_stop_cancels_waiting_ones(store, fake_llm):
+    server = QueryServer(store, fake_llm, max_concurrency=0, max_queue=1)
+
+    async def scenario():
+        await server.start()
+        done = asyncio.get_running_loop().create_future()
+        accepted = server.submit({"id": 1, "question": "Who?"}, None, done)
+        rejected = server.submit({"id": 2, "question": "Who?"}, None)
+        await server.stop()
+        return accepted, rejected, done
+
+    accepted, rejected, done = asyncio.run(scenario())
+
+    assert accepted and not rejected
+    assert done.cancelled()
+    assert server.counts["rejected"] == 1
+    assert server.stats()["max_queue_depth"] == 1
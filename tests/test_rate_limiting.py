@@ -0,0 +1,51 @@
+"""Request and token budgets and backoff for LLM calls."""
+import time
+
+import pytest
+
+from rate_limiting import RateLimiter, backoff_delay, is_rate_limit_error
+
+
+@pytest.mark.parametrize("error, expected", [
+    (RuntimeError("429 Too Many Requests"), True),
+    (RuntimeError("Resource exhausted"), True),
+    (RuntimeError("You exceeded your current quota"), True),
+    (ValueError("invalid JSON"), False),
+])
+def test_is_rate_limit_error(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+def test_backoff_delay_is_capped_exponential_jitter():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=1.0, cap=8.0)
+        assert 0 <= delay <= min(8.0, 2 ** attempt)
+
+
+def test_acquire_within_budget_does_not_wait():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire(tokens=100)
+    assert time.monotonic() - start < 0.5
+
+
+def test_acquire_waits_once_the_request_budget_is_spent():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter._request_allowance = 0.0
+    start = time.monotonic()
+    limiter.acquire()
+    # 600 requests per minute refill one request every 0.1 s
+    assert time.monotonic() - start >= 0.05
+
+
+def test_penalize_halves_the_rate_and_reward_restores_it():
+    limiter = RateLimiter(requests_per_minute=60, min_rate_factor=0.2)
+    limiter.penalize()
+    assert limiter.rate_factor == 0.5
+    limiter.penalize()
+    limiter.penalize()
+    assert limiter.rate_factor == 0.2
+    for _ in range(100):
+        limiter.reward()
+    assert limiter.rate_factor == 1.0